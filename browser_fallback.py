@@ -0,0 +1,59 @@
+import threading
+
+
+class BrowserFallback:
+    """
+    One Chromium for the HTTP scrapers, started only when a page turns out to be rendered
+    client-side (or a file is refused over plain HTTP). The calls block; from asyncio code
+    run them with asyncio.to_thread(). Pages are loaded one at a time.
+
+        BROWSER = browser_fallback.BrowserFallback()
+        html = await asyncio.to_thread(BROWSER.html, url, "#openProtocol")
+        ...
+        BROWSER.close()
+    """
+
+    def __init__(self):
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        # Selenium is imported on first use, so scrapers that never need a browser never load it
+        import browser_pool
+
+        with self._lock:
+            if self._pool is None:
+                print("   > Starting browser fallback...")
+                self._pool = browser_pool.BrowserPool(size=1)
+            return self._pool
+
+    def html(self, url, css_selector, timeout=10):
+        """The rendered page source of url, once css_selector is present (or after timeout)."""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+
+        with self._get_pool().lease() as driver:
+            driver.get(url)
+            try:
+                WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.CSS_SELECTOR, css_selector)))
+            except Exception:
+                pass
+            return driver.page_source
+
+    def download(self, url, download_dir, timeout=60):
+        """Lets Chrome download url into download_dir. Returns the file or None."""
+        import download_tracker
+
+        with self._get_pool().lease(download_dir) as driver:
+            # Chrome tells us when the file is done (CDP download events)
+            tracker = download_tracker.tracker_for(driver, download_dir)
+            token = tracker.expect()
+            driver.get(url)
+            return tracker.wait(token, url=url, timeout=timeout)
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = None
@@ -0,0 +1,258 @@
+import os
+import json
+import threading
+from contextlib import contextmanager
+
+# --- UTILS ---
+import scraper_utils
+import network_rules
+
+# --- LIBRARIES ---
+try:
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+except ImportError:
+    print("Error: Selenium library not found. Run: pip install selenium")
+    exit()
+
+# --- CONFIGURATION ---
+IS_RENDER = os.environ.get('RENDER') == 'true'
+CHROMIUM_BINARY = "/usr/bin/chromium"
+# How many warm browsers a single scraper process may keep around
+# (run_scrapers.py reserves 10 DevTools ports per browser script)
+BROWSER_POOL_SIZE = min(10, max(1, int(os.environ.get("BROWSER_POOL_SIZE", "1") or 1)))
+
+
+def build_chrome_options(download_dir=None, print_dir=None, user_agent=None, headless=True, debug_port=None):
+    """
+    The Chromium flags every scraper used to copy-paste into its own get_driver().
+    download_dir: configure Chrome to save downloads (PDFs) there instead of opening them.
+    print_dir: 'Save as PDF' print preview prefs (used by the print-to-PDF scrapers).
+    """
+    chrome_options = Options()
+
+    # 1. BASIC STABILITY OPTIONS
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument(f"--remote-debugging-port={debug_port or scraper_utils.CHROME_DEBUG_PORT}")
+
+    # 2. USER AGENT (Cloudflare Bypassing)
+    if user_agent:
+        chrome_options.add_argument(f"user-agent={user_agent}")
+
+    # 3. RENDER SPECIFIC
+    if IS_RENDER:
+        chrome_options.add_argument("--headless=new")
+        chrome_options.binary_location = CHROMIUM_BINARY
+    elif headless:
+        chrome_options.add_argument("--headless=new")
+
+    # 4. PREFS
+    prefs = {}
+    if download_dir:
+        prefs.update({
+            "download.default_directory": download_dir,
+            "download.prompt_for_download": False,
+            "download.directory_upgrade": True,
+            "plugins.always_open_pdf_externally": True
+        })
+    if print_dir:
+        settings = {
+            "recentDestinations": [{"id": "Save as PDF", "origin": "local", "account": ""}],
+            "selectedDestinationId": "Save as PDF",
+            "version": 2
+        }
+        prefs.update({
+            'printing.print_preview_sticky_settings.appState': json.dumps(settings),
+            'savefile.default_directory': print_dir
+        })
+    if prefs:
+        chrome_options.add_experimental_option("prefs", prefs)
+
+    return chrome_options
+
+
+def create_driver(download_dir=None, print_dir=None, user_agent=None, headless=True, debug_port=None, block_rules=None):
+    """
+    Launches one Chromium. Returns None if Chrome could not be started.
+    block_rules: a network_rules.SITE_RULES key; trackers, consent banners etc. are then never loaded.
+    """
+    chrome_options = build_chrome_options(download_dir, print_dir, user_agent, headless, debug_port)
+
+    if IS_RENDER:
+        print(f"   Binary: {CHROMIUM_BINARY}")
+
+    try:
+        # Locally we prefer a chromedriver.exe next to the scripts; otherwise
+        # Selenium Manager finds the driver (on Render it is installed via apt).
+        driver_path = os.path.join(os.getcwd(), 'chromedriver.exe')
+        if not IS_RENDER and os.path.exists(driver_path):
+            driver = webdriver.Chrome(service=Service(executable_path=driver_path), options=chrome_options)
+        else:
+            driver = webdriver.Chrome(options=chrome_options)
+    except Exception as e:
+        print(f"Error starting Chrome: {e}")
+        return None
+
+    if block_rules:
+        network_rules.apply(driver, block_rules)
+    return driver
+
+
+def set_download_dir(driver, download_dir):
+    """Points an already running browser at a new download folder (no relaunch needed)."""
+    os.makedirs(download_dir, exist_ok=True)
+    try:
+        driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+            "behavior": "allow",
+            "downloadPath": download_dir,
+            "eventsEnabled": True
+        })
+    except Exception:
+        # Older chromedriver builds only route the Page domain through execute_cdp_cmd
+        driver.execute_cdp_cmd("Page.setDownloadBehavior", {
+            "behavior": "allow",
+            "downloadPath": download_dir
+        })
+
+
+def session_from_driver(driver, pool_size=8):
+    """
+    Copies the browser's cookies and User-Agent into a pooled requests.Session, so files the
+    browser found can be downloaded directly over HTTP (no page load, no Chrome download).
+    The browser must already have visited the site whose cookies we want.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    session.headers['User-Agent'] = driver.execute_script("return navigator.userAgent")
+    for cookie in driver.get_cookies():
+        session.cookies.set(
+            cookie['name'], cookie['value'],
+            domain=cookie.get('domain'), path=cookie.get('path', '/')
+        )
+    return session
+
+
+def is_alive(driver):
+    try:
+        driver.execute_script("return 1")
+        return True
+    except Exception:
+        return False
+
+
+class BrowserPool:
+    """
+    Keeps up to `size` headless Chromium instances warm and lends them out per task.
+
+        with BrowserPool(size=2) as pool:
+            with pool.lease(download_dir) as driver:
+                driver.get(...)
+
+    Browsers are launched lazily, reused across tasks, and replaced if one crashes.
+    The download folder is switched per lease through CDP instead of a new launch.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, **driver_kwargs):
+        self.size = max(1, size)
+        self.driver_kwargs = driver_kwargs
+        self._idle = []
+        # Each browser occupies a slot, which also decides its DevTools port (base port + slot)
+        self._free_slots = list(range(self.size))
+        self._slot_of = {}
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def _launch(self, slot):
+        port = int(self.driver_kwargs.get('debug_port') or scraper_utils.CHROME_DEBUG_PORT) + slot
+        print(f"   > Starting pooled browser #{slot + 1}...")
+        return create_driver(**dict(self.driver_kwargs, debug_port=port))
+
+    def _acquire(self):
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("BrowserPool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._free_slots:
+                    slot = self._free_slots.pop(0)
+                    break
+                self._cond.wait()
+
+        # Launch outside the lock; Chrome startup takes seconds
+        driver = self._launch(slot)
+
+        with self._cond:
+            if driver is None:
+                self._free_slots.append(slot)
+                self._cond.notify()
+                raise RuntimeError("Could not start a pooled browser")
+            self._slot_of[driver] = slot
+        return driver
+
+    def _release(self, driver):
+        healthy = is_alive(driver)
+        if healthy:
+            try:
+                # Leave the previous municipality's page so nothing keeps loading in the background
+                driver.get("about:blank")
+            except Exception:
+                healthy = False
+
+        with self._cond:
+            keep = healthy and not self._closed
+            if keep:
+                self._idle.append(driver)
+            else:
+                slot = self._slot_of.pop(driver, None)
+                if slot is not None:
+                    self._free_slots.append(slot)
+            self._cond.notify()
+
+        if not keep:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    @contextmanager
+    def lease(self, download_dir=None):
+        driver = self._acquire()
+        try:
+            if download_dir:
+                set_download_dir(driver, download_dir)
+            yield driver
+        finally:
+            self._release(driver)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            # Leased browsers are quit by _release() when their task finishes
+            drivers = list(self._idle)
+            for driver in drivers:
+                self._slot_of.pop(driver, None)
+            self._idle.clear()
+            self._cond.notify_all()
+
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,130 @@
+import json
+import threading
+import requests
+
+# --- LIBRARIES ---
+try:
+    # websocket-client ships as a Selenium dependency
+    import websocket
+except ImportError:
+    websocket = None
+
+
+class CdpError(Exception):
+    pass
+
+
+class CdpConnection:
+    """
+    A raw Chrome DevTools Protocol connection to a browser that Selenium already started.
+
+    execute_cdp_cmd() can only send commands; it never delivers events. This opens the
+    browser-level DevTools websocket next to chromedriver so we can listen to events
+    (downloads, network activity) and talk to extra targets (tabs).
+
+        conn = CdpConnection.for_driver(driver)
+        conn.on(lambda method, params, session_id: ...)
+        conn.send("Browser.getVersion")
+    """
+
+    def __init__(self, ws_url, timeout=30):
+        if websocket is None:
+            raise CdpError("websocket-client is not installed")
+
+        self.timeout = timeout
+        # Chrome refuses websocket clients that send an Origin header unless --remote-allow-origins is set
+        self.ws = websocket.create_connection(ws_url, timeout=timeout, suppress_origin=True)
+        self.ws.settimeout(None)
+
+        self._next_id = 0
+        self._pending = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._closed = False
+
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    @classmethod
+    def for_driver(cls, driver, timeout=30):
+        """Connects to the browser endpoint of a running Selenium Chrome driver."""
+        address = driver.capabilities.get('goog:chromeOptions', {}).get('debuggerAddress')
+        if not address:
+            raise CdpError("Driver does not expose a debuggerAddress")
+
+        version = requests.get(f"http://{address}/json/version", timeout=timeout).json()
+        return cls(version['webSocketDebuggerUrl'], timeout=timeout)
+
+    def _read_loop(self):
+        while not self._closed:
+            try:
+                message = json.loads(self.ws.recv())
+            except Exception:
+                break
+
+            if 'id' in message:
+                with self._lock:
+                    waiter = self._pending.pop(message['id'], None)
+                if waiter:
+                    waiter['message'] = message
+                    waiter['event'].set()
+            else:
+                for listener in list(self._listeners):
+                    try:
+                        listener(message.get('method'), message.get('params', {}), message.get('sessionId'))
+                    except Exception as e:
+                        print(f"   > CDP listener error: {e}")
+
+        # Connection gone: wake everybody still waiting for a reply
+        self._closed = True
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for waiter in pending:
+            waiter['event'].set()
+
+    def on(self, listener):
+        """Registers listener(method, params, session_id) for every CDP event."""
+        self._listeners.append(listener)
+
+    def off(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def send(self, method, params=None, session_id=None, timeout=None):
+        """Sends a command and blocks for its result. Raises CdpError on protocol errors."""
+        if self._closed:
+            raise CdpError("CDP connection is closed")
+
+        waiter = {'event': threading.Event(), 'message': None}
+        with self._lock:
+            self._next_id += 1
+            message_id = self._next_id
+            self._pending[message_id] = waiter
+
+        payload = {'id': message_id, 'method': method, 'params': params or {}}
+        if session_id:
+            payload['sessionId'] = session_id
+
+        with self._send_lock:
+            self.ws.send(json.dumps(payload))
+
+        if not waiter['event'].wait(timeout or self.timeout):
+            with self._lock:
+                self._pending.pop(message_id, None)
+            raise CdpError(f"Timeout waiting for {method}")
+
+        message = waiter['message']
+        if message is None:
+            raise CdpError(f"Connection closed while waiting for {method}")
+        if 'error' in message:
+            raise CdpError(f"{method}: {message['error'].get('message')}")
+        return message.get('result', {})
+
+    def close(self):
+        self._closed = True
+        try:
+            self.ws.close()
+        except Exception:
+            pass
@@ -0,0 +1,78 @@
+import os
+import re
+import hashlib
+from io import BytesIO
+
+import weasy_pool
+
+# --- CONFIGURATION ---
+# One WeasyPrint worker process per core (capped)
+CONVERT_WORKERS = int(os.environ.get("DOCX_CONVERT_WORKERS", "0") or 0) or min(4, os.cpu_count() or 1)
+# DOCX -> HTML results by content hash of the Word file (same agenda re-published = no mammoth run)
+HTML_CACHE_DIR = os.environ.get("DOCX_HTML_CACHE", ".docx_cache")
+
+STYLESHEET = """
+body { font-family: sans-serif; margin: 2cm; line-height: 1.5; }
+table { border-collapse: collapse; width: 100%; }
+td, th { border: 1px solid #ccc; padding: 8px; }
+img { max-width: 100%; height: auto; }
+"""
+
+# WMF/EMF images make WeasyPrint/Pillow crash on Linux (no loader), so drop them
+UNSUPPORTED_IMAGE = re.compile(r'<img[^>]+src="data:image/(wmf|emf)[^"]+"[^>]*>', re.IGNORECASE)
+
+
+# --- WORKER PROCESS ---
+def _docx_to_html(docx_path):
+    """Mammoth's HTML for a Word file, from the cache if the same bytes were converted before."""
+    import mammoth
+
+    with open(docx_path, "rb") as docx_file:
+        content = docx_file.read()
+    cache_path = None
+    if HTML_CACHE_DIR:
+        cache_path = os.path.join(HTML_CACHE_DIR, hashlib.sha256(content).hexdigest() + ".html")
+        if os.path.exists(cache_path):
+            with open(cache_path, encoding="utf-8") as f:
+                return f.read()
+
+    html_content = mammoth.convert_to_html(BytesIO(content), ignore_empty_paragraphs=False).value
+    html_content = UNSUPPORTED_IMAGE.sub('<!-- [Complex Image Removed] -->', html_content)
+
+    if cache_path:
+        os.makedirs(HTML_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(html_content)
+        os.replace(tmp_path, cache_path)
+    return html_content
+
+
+def _convert(docx_path, pdf_path):
+    html_content = _docx_to_html(docx_path)
+    document = f"<html><head><meta charset=\"utf-8\"></head><body>{html_content}</body></html>"
+    weasy_pool.write_pdf(document, pdf_path, STYLESHEET)
+
+
+# --- POOL ---
+# Started on first use: sites without Word files never start it
+_pool = weasy_pool.WorkerPool(CONVERT_WORKERS)
+
+
+async def convert_docx_to_pdf(docx_path, pdf_path):
+    """
+    Converts DOCX to PDF using Mammoth (to HTML) and WeasyPrint (to PDF) in a worker process.
+    This avoids needing LibreOffice installed. Returns True on success.
+    """
+    print(f"   > Converting {os.path.basename(docx_path)} to PDF...")
+    try:
+        await _pool.run(_convert, docx_path, pdf_path)
+        print("   > Conversion successful!")
+        return True
+    except Exception as e:
+        print(f"   > Conversion Failed: {e}")
+        return False
+
+
+def shutdown():
+    _pool.shutdown()
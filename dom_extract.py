@@ -0,0 +1,53 @@
+# Pulls fields out of many DOM nodes with ONE execute_script call.
+#
+# Looping over find_elements() and calling get_attribute()/.text on every element costs one
+# chromedriver round-trip per call; a listing with hundreds of rows becomes thousands of calls.
+#
+#     rows = dom_extract.extract(driver, "#list a.item", {
+#         "href": "href",                     # DOM property (resolved, absolute URL)
+#         "raw_href": "@href",                # attribute exactly as written in the HTML
+#         "text": "text",                     # textContent, whitespace-trimmed
+#         "date": (".date", "text"),          # field of the first matching descendant
+#     })
+#     -> [{"href": "...", "raw_href": "...", "text": "...", "date": "..."}, ...]
+
+EXTRACT_JS = """
+var selector = arguments[0], fields = arguments[1];
+var root = arguments[2] || document;
+
+function read(node, what) {
+    if (!node) return null;
+    if (what === 'text') return (node.textContent || '').trim();
+    if (what === 'innerText') return (node.innerText || '').trim();
+    if (what === 'html') return node.outerHTML;
+    if (what.charAt(0) === '@') return node.getAttribute(what.slice(1));
+    var value = node[what];
+    return value === undefined ? null : value;
+}
+
+return Array.from(root.querySelectorAll(selector)).map(function (el) {
+    var out = {};
+    Object.keys(fields).forEach(function (name) {
+        var spec = fields[name];
+        out[name] = Array.isArray(spec) ? read(el.querySelector(spec[0]), spec[1]) : read(el, spec);
+    });
+    return out;
+});
+"""
+
+
+def extract(driver, selector, fields, root=None):
+    """
+    Returns one dict per node matching the CSS selector, with the requested fields.
+    fields: {name: spec}; spec is 'text', 'innerText', 'html', '@attribute', a DOM property
+    name (e.g. 'href', 'value'), or a (descendant_selector, spec) pair.
+    root: optional WebElement to search inside instead of the whole document.
+    """
+    fields = {name: list(spec) if isinstance(spec, tuple) else spec for name, spec in fields.items()}
+    return driver.execute_script(EXTRACT_JS, selector, fields, root) or []
+
+
+def hrefs(driver, selector, raw=False):
+    """The href of every node matching selector (resolved URLs unless raw=True), in document order."""
+    rows = extract(driver, selector, {"href": "@href" if raw else "href"})
+    return [row["href"] for row in rows if row["href"]]
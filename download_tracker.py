@@ -0,0 +1,153 @@
+import os
+import time
+import threading
+import weakref
+from glob import glob
+
+from cdp_client import CdpConnection
+
+
+class DownloadTracker:
+    """
+    Tells us the moment Chrome finishes a download, instead of globbing the folder.
+
+    It listens to the CDP Browser.downloadWillBegin / Browser.downloadProgress events.
+    Downloads are saved under their CDP guid ('allowAndName'), so several downloads
+    (or several browsers) can share one folder without picking up each other's files.
+
+        token = tracker.expect()
+        driver.get(pdf_url)
+        path = tracker.wait(token, timeout=60)
+
+    If the DevTools websocket is unavailable it falls back to polling the folder.
+    """
+
+    def __init__(self, driver, download_dir):
+        self.download_dir = download_dir
+        self._downloads = {}  # guid -> {'url', 'state', 'order'}
+        self._claimed = set()
+        self._counter = 0
+        self._cond = threading.Condition()
+        self.conn = None
+
+        try:
+            self.conn = CdpConnection.for_driver(driver)
+            self.conn.on(self._on_event)
+            self.set_download_dir(download_dir)
+        except Exception as e:
+            print(f"   > Download events unavailable ({e}). Falling back to folder polling.")
+            if self.conn:
+                self.conn.close()
+            self.conn = None
+
+    def set_download_dir(self, download_dir):
+        os.makedirs(download_dir, exist_ok=True)
+        self.download_dir = download_dir
+        if self.conn:
+            self.conn.send("Browser.setDownloadBehavior", {
+                "behavior": "allowAndName",
+                "downloadPath": download_dir,
+                "eventsEnabled": True
+            })
+
+    def _on_event(self, method, params, session_id):
+        if method == "Browser.downloadWillBegin":
+            with self._cond:
+                self._counter += 1
+                self._downloads[params['guid']] = {
+                    'url': params.get('url'),
+                    'state': 'inProgress',
+                    'order': self._counter,
+                    'dir': self.download_dir
+                }
+                self._cond.notify_all()
+        elif method == "Browser.downloadProgress":
+            with self._cond:
+                download = self._downloads.setdefault(params['guid'], {
+                    'url': None, 'state': 'inProgress', 'order': 0, 'dir': self.download_dir
+                })
+                download['state'] = params.get('state', download['state'])
+                self._cond.notify_all()
+
+    def expect(self):
+        """Call right before triggering a download. Returns a token for wait()."""
+        if self.conn:
+            with self._cond:
+                return self._counter
+        return set(glob(os.path.join(self.download_dir, "*.pdf")))
+
+    def wait(self, token, url=None, timeout=60):
+        """
+        Blocks until a download started after expect() has completed and returns its path.
+        If url is given, a download for that exact URL is preferred. Returns None on
+        timeout or when the download was canceled.
+        """
+        if not self.conn:
+            return self._poll(token, timeout)
+
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                guid = self._pick(token, url)
+                if guid:
+                    download = self._downloads[guid]
+                    if download['state'] == 'completed':
+                        self._claimed.add(guid)
+                        return os.path.join(download['dir'], guid)
+                    if download['state'] == 'canceled':
+                        self._claimed.add(guid)
+                        return None
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def _pick(self, token, url):
+        candidates = [
+            (d['order'], guid) for guid, d in self._downloads.items()
+            if d['order'] > token and guid not in self._claimed
+        ]
+        if url:
+            exact = [c for c in candidates if self._downloads[c[1]]['url'] == url]
+            # Redirects can change the URL Chrome reports, so only prefer exact matches
+            candidates = exact or candidates
+        return min(candidates)[1] if candidates else None
+
+    def _poll(self, files_before, timeout):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            new_files = set(glob(os.path.join(self.download_dir, "*.pdf"))) - files_before
+            with self._cond:
+                new_files -= self._claimed
+                if new_files:
+                    # Chrome only renames .crdownload to .pdf once the file is closed
+                    downloaded = sorted(new_files)[0]
+                    self._claimed.add(downloaded)
+                    return downloaded
+            time.sleep(0.2)
+        return None
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+_trackers = weakref.WeakKeyDictionary()
+_trackers_lock = threading.Lock()
+
+
+def tracker_for(driver, download_dir):
+    """Returns the (cached) DownloadTracker of a driver, pointed at download_dir."""
+    with _trackers_lock:
+        tracker = _trackers.get(driver)
+        if tracker is None:
+            tracker = DownloadTracker(driver, download_dir)
+            _trackers[driver] = tracker
+            return tracker
+
+    # Always re-apply: BrowserPool.lease() resets the download behaviour on every lease
+    tracker.set_download_dir(download_dir)
+    return tracker
+
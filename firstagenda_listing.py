@@ -0,0 +1,301 @@
+import re
+import json
+import datetime
+import time
+from urllib.parse import urljoin, urlparse, parse_qs, parse_qsl, urlunparse
+
+import dom_extract
+import page_waits
+
+# --- CONFIGURATION ---
+# Query/body fields FirstAgenda-style list endpoints use for paging
+PAGING_KEYS = ("skip", "offset", "start", "page", "pageNumber", "pageIndex", "side")
+PAGE_SIZE_KEYS = ("take", "limit", "pageSize", "count", "antal")
+MAX_PAGES = 500
+# Never a page cursor: jQuery's cache-buster, and anything this large is a timestamp (epoch seconds or ms)
+IGNORED_PARAMS = ("_",)
+TIMESTAMP_MIN = 10 ** 9
+XHR_HEADERS = {"X-Requested-With": "XMLHttpRequest"}
+
+LINK_PATTERN = re.compile(r"/vis\?Referat-[^\"'\s<>\\]+")
+
+# Records every XHR/fetch the page makes from now on, so we can see how it loads more meetings
+INSTALL_HOOK_JS = """
+if (!window.__listingRequests) {
+    window.__listingRequests = [];
+    var origOpen = XMLHttpRequest.prototype.open;
+    var origSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.open = function (method, url) {
+        this.__listing = {method: method, url: String(url)};
+        return origOpen.apply(this, arguments);
+    };
+    XMLHttpRequest.prototype.send = function (body) {
+        if (this.__listing) {
+            this.__listing.body = (typeof body === 'string') ? body : null;
+            window.__listingRequests.push(this.__listing);
+        }
+        return origSend.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var origFetch = window.fetch;
+        window.fetch = function (input, init) {
+            window.__listingRequests.push({
+                method: (init && init.method) || 'GET',
+                url: String((input && input.url) || input),
+                body: (init && typeof init.body === 'string') ? init.body : null
+            });
+            return origFetch.apply(this, arguments);
+        };
+    }
+}
+"""
+
+LINK_SELECTOR = "a[href^='/vis?Referat-']"
+
+
+def full_link(base_url, href):
+    return base_url.rstrip('/') + href if href.startswith('/') else base_url + '/' + href
+
+
+def collect_dom_links(driver, base_url):
+    """Meeting links currently in the DOM, read in one script call (no page_source re-parse)."""
+    return [full_link(base_url, href) for href in dom_extract.hrefs(driver, LINK_SELECTOR, raw=True)]
+
+
+def extract_links(text, base_url):
+    """Meeting links from an endpoint response (HTML fragment or JSON)."""
+    text = text.replace("\\u0026", "&").replace("\\/", "/")
+    return [full_link(base_url, href.replace("&amp;", "&")) for href in LINK_PATTERN.findall(text)]
+
+
+def _date(match):
+    if not match:
+        return None
+    day, month, year = match.groups()
+    try:
+        return datetime.date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def parse_meeting_link(url, start_url=None):
+    """Splits a meeting URL into its id, date (datetime.date) and the committee id of the listing."""
+    uuid_match = re.search(r"id=([a-f0-9\-]{36})", url)
+    date_match = re.search(r"d\.(\d{2})-(\d{2})-(\d{4})", url)
+    committee = None
+    if start_url:
+        committee = parse_qs(urlparse(start_url).query).get('request.kriterie.udvalgId', [None])[0]
+    return {
+        'url': url,
+        'id': uuid_match.group(1) if uuid_match else None,
+        'date': _date(date_match),
+        'committee': committee
+    }
+
+
+# --- ENDPOINT DISCOVERY ---
+
+def _request_params(request):
+    """Query parameters merged with a form or JSON body. Returns (params, body_kind)."""
+    params = dict(parse_qsl(urlparse(request['url']).query, keep_blank_values=True))
+    body = request.get('body')
+    if not body:
+        return params, None
+    try:
+        data = json.loads(body)
+        if isinstance(data, dict):
+            params.update(data)
+            return params, 'json'
+    except ValueError:
+        pass
+    params.update(dict(parse_qsl(body, keep_blank_values=True)))
+    return params, 'form'
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _cursor_candidates(params):
+    """Parameter names that may be a page cursor, known paging keys first."""
+    names = [name for name in params
+             if name not in IGNORED_PARAMS and (_as_int(params[name]) or 0) < TIMESTAMP_MIN]
+    return [n for n in PAGING_KEYS if n in names] + [n for n in names if n not in PAGING_KEYS]
+
+
+def find_paging(requests_seen, links_per_page):
+    """
+    Works out how the list endpoint pages from the requests the scroll triggered.
+    Returns a template dict for fetch_page(), or None if nothing looks like paging.
+    """
+    groups = {}
+    for request in requests_seen:
+        parsed = urlparse(request['url'])
+        key = (request.get('method', 'GET').upper(), parsed.scheme, parsed.netloc, parsed.path)
+        groups.setdefault(key, []).append(request)
+
+    for (method, scheme, netloc, path), group in groups.items():
+        decoded = [_request_params(r) for r in group]
+        first_params, body_kind = decoded[0]
+
+        paging_key, step = None, None
+        if len(decoded) >= 2:
+            # Two scrolls: the field that grew between them is the page cursor
+            second_params = decoded[1][0]
+            for name in _cursor_candidates(first_params):
+                a, b = _as_int(first_params[name]), _as_int(second_params.get(name))
+                if a is not None and b is not None and b > a:
+                    paging_key, step = name, b - a
+                    break
+        if not paging_key:
+            for name in PAGING_KEYS:
+                if _as_int(first_params.get(name)) is not None:
+                    paging_key = name
+                    size = next((_as_int(first_params.get(k)) for k in PAGE_SIZE_KEYS
+                                 if _as_int(first_params.get(k))), None)
+                    # 'skip'/'offset' count items, 'page' counts pages
+                    step = 1 if 'page' in name.lower() or name == 'side' else (size or links_per_page)
+                    break
+        if not paging_key or not step:
+            continue
+
+        values = [_as_int(p[0].get(paging_key)) for p in decoded]
+        return {
+            'method': method,
+            'url': urlunparse((scheme, netloc, path, '', '', '')),
+            'body_kind': body_kind,
+            'paging_key': paging_key,
+            'step': step,
+            'first': values[0],
+            'last': max(v for v in values if v is not None),
+            'sample': group[0]
+        }
+    return None
+
+
+def fetch_page(session, template, value, timeout=30):
+    """Replays the recorded listing request with the page cursor set to value."""
+    sample = template['sample']
+    key = template['paging_key']
+    query = dict(parse_qsl(urlparse(sample['url']).query, keep_blank_values=True))
+
+    if template['body_kind'] == 'json':
+        body = json.loads(sample['body'])
+        if key in body:
+            body[key] = value
+        else:
+            query[key] = str(value)
+        response = session.request(template['method'], template['url'], params=query, json=body, headers=XHR_HEADERS, timeout=timeout)
+    elif template['body_kind'] == 'form':
+        body = dict(parse_qsl(sample['body'], keep_blank_values=True))
+        if key in body:
+            body[key] = str(value)
+        else:
+            query[key] = str(value)
+        response = session.request(template['method'], template['url'], params=query, data=body, headers=XHR_HEADERS, timeout=timeout)
+    else:
+        query[key] = str(value)
+        response = session.request(template['method'], template['url'], params=query, headers=XHR_HEADERS, timeout=timeout)
+
+    response.raise_for_status()
+    return response.text
+
+
+def discover_endpoint(driver, base_url, scrolls=2, wait=4.0):
+    """Scrolls the listing a couple of times and records which requests load more meetings."""
+    driver.execute_script(INSTALL_HOOK_JS)
+    links_before = len(collect_dom_links(driver, base_url))
+
+    for _ in range(scrolls):
+        seen = driver.execute_script("return window.__listingRequests.length")
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        deadline = time.time() + wait
+        while time.time() < deadline:
+            if driver.execute_script("return window.__listingRequests.length") > seen:
+                break
+            time.sleep(0.2)
+
+    page_url = driver.current_url
+    requests_seen = [
+        dict(r, url=urljoin(page_url, r['url']))
+        for r in (driver.execute_script("return window.__listingRequests") or [])
+    ]
+    # Only same-site requests can be listing calls (skip analytics, fonts, ...)
+    host = urlparse(base_url).netloc
+    requests_seen = [r for r in requests_seen if urlparse(r['url']).netloc == host]
+    return find_paging(requests_seen, links_per_page=max(1, links_before))
+
+
+def scroll_pages(driver, base_url, seen_links, wait=2.5):
+    """Fallback: scrolls the listing and yields the links each scroll added, until nothing new loads."""
+    while True:
+        dom_links = collect_dom_links(driver, base_url)
+        new_links = [link for link in dict.fromkeys(dom_links) if link not in seen_links]
+        seen_links.update(new_links)
+        yield new_links
+
+        print(f"   > Found {len(seen_links)} unique links so far...")
+        if not new_links:
+            print("   > No new links loaded. Finished scrolling.")
+            return
+
+        # Scroll down, then wait until more links show up (at most `wait`, like the old fixed sleep)
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        page_waits.wait_for_count_above(driver, LINK_SELECTOR, len(dom_links), timeout=wait)
+
+
+def iter_link_pages(driver, session, base_url):
+    """
+    Yields meeting links page by page (only links not seen before). The browser must be on
+    the listing page. The first page is whatever the page rendered; further pages come from
+    the portal's own paging endpoint over HTTP, or from scrolling if no usable endpoint is found.
+    Nothing beyond the first page is loaded until the caller asks for it.
+    """
+    seen_links = set()
+
+    def fresh(links):
+        new_links = [link for link in dict.fromkeys(links) if link not in seen_links]
+        seen_links.update(new_links)
+        return new_links
+
+    yield fresh(collect_dom_links(driver, base_url))
+
+    try:
+        template = discover_endpoint(driver, base_url)
+    except Exception as e:
+        print(f"   > Listing endpoint discovery failed: {e}")
+        template = None
+
+    # Whatever the discovery scrolls loaded
+    yield fresh(collect_dom_links(driver, base_url))
+
+    if template:
+        try:
+            # Validate: replaying the recorded request must give back links the page already shows
+            replayed = extract_links(fetch_page(session, template, template['first']), base_url)
+            if not replayed or not set(replayed) & seen_links:
+                print("   > Listing endpoint did not return meeting links. Falling back to scrolling.")
+            else:
+                print(f"   > Using listing endpoint {template['url']} ({template['paging_key']} += {template['step']})")
+                value = template['last']
+                for page in range(MAX_PAGES):
+                    value += template['step']
+                    page_links = fresh(extract_links(fetch_page(session, template, value), base_url))
+                    if not page_links:
+                        if page == 0:
+                            # The "next" page repeats what we have: the cursor guess was wrong
+                            print(f"   > Listing endpoint returned nothing new for {template['paging_key']}={value}. "
+                                  f"Falling back to scrolling.")
+                            break
+                        return
+                    print(f"   > Found {len(seen_links)} unique links so far...")
+                    yield page_links
+                else:
+                    return
+        except Exception as e:
+            print(f"   > Listing endpoint failed ({e}). Falling back to scrolling.")
+
+    yield from scroll_pages(driver, base_url, seen_links)
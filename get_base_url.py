@@ -1,5 +1,15 @@
-import requests
-import concurrent.futures
+import os
+import socket
+import asyncio
+
+# --- LIBRARIES ---
+try:
+    import aiohttp
+except ImportError:
+    print("Error: aiohttp library not found. Run: pip install aiohttp")
+    exit()
+
+from http_engine import HttpEngine
 
 # --- CONFIGURATION ---
 # We pretend to be a real browser to avoid being blocked by firewalls
@@ -11,6 +21,14 @@ HEADERS = {
     'Upgrade-Insecure-Requests': '1',
 }
 
+# All candidates are checked at once; this caps the open connections (and DNS lookups) overall
+SCAN_CONCURRENCY = int(os.environ.get("PORTAL_SCAN_CONCURRENCY", "40") or 40)
+CHECK_TIMEOUT = 5
+DNS_TIMEOUT = 3
+
+PREFIXES = ["dagsordener", "dagsordner", "dagsorden"]  # Catch spelling errors
+SUFFIXES = [".dk", "kommune.dk"]
+
 # --- BASE NAMES OF MUNICIPALITIES ---
 MUNICIPALITIES_STEMS = [
     "aabenraa", "aalborg", "aarhus", "aeroe", "albertslund", "alleroed",
@@ -33,7 +51,28 @@ MUNICIPALITIES_STEMS = [
 ]
 
 
-def check_url(url):
+def candidate_hosts(name):
+    """The hostname variations for a municipality name (every prefix x suffix)."""
+    return [f"{prefix}.{name}{suffix}" for prefix in PREFIXES for suffix in SUFFIXES]
+
+
+async def resolves(host, dns_limit):
+    """
+    True if the hostname exists. Most variations don't, and without this each of them
+    would hold a connection slot until its timeout.
+    """
+    async with dns_limit:
+        try:
+            await asyncio.wait_for(
+                asyncio.get_running_loop().getaddrinfo(host, 443, type=socket.SOCK_STREAM),
+                DNS_TIMEOUT
+            )
+            return True
+        except (OSError, asyncio.TimeoutError):
+            return False
+
+
+async def check_url(http, url):
     """
     Checks a single URL with proper headers.
     Retries with GET if HEAD fails.
@@ -41,73 +80,63 @@ def check_url(url):
     try:
         # Attempt 1: HEAD request (Fast)
         # Allow redirects is key because dagsordener.x often redirects to www.dagsordener.x
-        response = requests.head(url, headers=HEADERS, timeout=5, allow_redirects=True)
-
-        if response.status_code < 400:
-            return response.url.rstrip('/')
+        async with http.session.head(url, allow_redirects=True) as response:
+            if response.status < 400:
+                return str(response.url).rstrip('/')
+            status = response.status
 
         # Attempt 2: If HEAD returns 404 or 405 (Method Not Allowed), try GET (Slower but safer)
-        if response.status_code in [404, 405, 403]:
+        if status in [404, 405, 403]:
             # Only retry if it's a "soft" fail.
             # Sometimes 403 (Forbidden) is just blocking HEAD.
-            response = requests.get(url, headers=HEADERS, timeout=5)
-            if response.status_code < 400:
-                return response.url.rstrip('/')
+            async with http.session.get(url) as response:
+                if response.status < 400:
+                    return str(response.url).rstrip('/')
 
-    except requests.exceptions.RequestException:
+    except (aiohttp.ClientError, asyncio.TimeoutError):
         pass
     return None
 
 
-def scan_municipality_variations(name):
-    """
-    Generates 4 variations for a municipality name and checks them.
-    """
-    variations = []
-    prefixes = ["dagsordener", "dagsordner", "dagsorden"]  # Catch spelling errors
-    suffixes = [".dk", "kommune.dk"]
+async def scan_host(http, dns_limit, name, host):
+    if not await resolves(host, dns_limit):
+        return name, None
+    return name, await check_url(http, f"https://{host}")
 
-    for prefix in prefixes:
-        for suffix in suffixes:
-            variations.append(f"https://{prefix}.{name}{suffix}")
 
-    found_urls = set()
+async def scan_all(names):
+    """Checks every variation of every name concurrently over one pooled session."""
+    dns_limit = asyncio.Semaphore(SCAN_CONCURRENCY)
+    unique_final_portals = set()
 
-    for url in variations:
-        valid_url = check_url(url)
-        if valid_url:
-            found_urls.add(valid_url)
+    # One connector for the whole scan: redirects to www.* reuse its keep-alive connections
+    async with HttpEngine(headers=HEADERS, total_limit=SCAN_CONCURRENCY, per_host_limit=2,
+                          timeout=CHECK_TIMEOUT, retries=0) as http:
+        tasks = [
+            asyncio.ensure_future(scan_host(http, dns_limit, name, host))
+            for name in names
+            for host in candidate_hosts(name)
+        ]
+        for future in asyncio.as_completed(tasks):
+            try:
+                name, url = await future
+            except Exception as exc:
+                print(f"Error during scan: {exc}")
+                continue
+            if url:
+                # Clean up the URL to ensure uniqueness
+                clean_url = url.rstrip('/')
+                if clean_url not in unique_final_portals:
+                    print(f"[MATCH] {name.ljust(15)} -> {clean_url}")
+                    unique_final_portals.add(clean_url)
 
-    return list(found_urls)
+    return sorted(unique_final_portals)
 
 
 def find_all_portals():
-    unique_final_portals = set()
     print(f"--- Starting Comprehensive Scan (With Headers) ---")
-    print(f"Checking {len(MUNICIPALITIES_STEMS)} names with 4 variations each...")
-
-    # Slightly slower workers to avoid triggering rate limits on shared hostings
-    with concurrent.futures.ThreadPoolExecutor(max_workers=15) as executor:
-        future_to_name = {
-            executor.submit(scan_municipality_variations, name): name
-            for name in MUNICIPALITIES_STEMS
-        }
-
-        for future in concurrent.futures.as_completed(future_to_name):
-            name = future_to_name[future]
-            try:
-                results = future.result()
-                if results:
-                    for url in results:
-                        # Clean up the URL to ensure uniqueness
-                        clean_url = url.rstrip('/')
-                        if clean_url not in unique_final_portals:
-                            print(f"[MATCH] {name.ljust(15)} -> {clean_url}")
-                            unique_final_portals.add(clean_url)
-            except Exception as exc:
-                print(f"Error checking {name}: {exc}")
-
-    return sorted(list(unique_final_portals))
+    print(f"Checking {len(MUNICIPALITIES_STEMS)} names with {len(PREFIXES) * len(SUFFIXES)} variations each...")
+    return asyncio.run(scan_all(MUNICIPALITIES_STEMS))
 
 
 if __name__ == "__main__":
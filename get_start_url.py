@@ -1,7 +1,12 @@
 import os
-import time
+import re
 import csv
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse, parse_qs
+from bs4 import BeautifulSoup
+
+import http_engine
+import page_waits
+from scraper import COMMITTEE_CONFIGS
 
 # Import Selenium
 try:
@@ -11,14 +16,41 @@ try:
     from selenium.webdriver.common.by import By
     from selenium.webdriver.support.ui import WebDriverWait
     from selenium.webdriver.support import expected_conditions as EC
-    from selenium.common.exceptions import TimeoutException, NoSuchElementException
+    from selenium.common.exceptions import TimeoutException
 except ImportError:
     print("Error: Selenium library not found. Run: pip install selenium")
     exit()
 
 # --- CONFIGURATION ---
 INPUT_FILE = "all_municipality_urls.txt"
-OUTPUT_FILE = "found_start_urls.csv"
+# Every committee found on every portal (name -> udvalgId), next to the per-source CSVs of COMMITTEE_CONFIGS
+COMMITTEES_FILE = "found_committees.csv"
+
+# DISCOVERY_OVERWRITE=on replaces the found_start_urls*.csv files; by default rows already in them
+# (often fixed by hand) are kept and only portals they don't have yet are added
+DISCOVERY_OVERWRITE = os.environ.get("DISCOVERY_OVERWRITE", "off").lower() in ("on", "1", "true", "yes")
+
+# How a committee name is recognised per scraper source, most specific first. Patterns are anchored
+# at the start of the name and end on a word boundary, so "Økonomi- og Planudvalget" is Økonomi (not
+# Plan) and "Miljøudvalget" is not ØU.
+COMMITTEE_PATTERNS = {
+    'Oekonomi': [r"^Økonomiudvalg(et)?\b", r"^Økonomi\b", r"^ØU\b"],
+    'Teknik': [r"^Teknik-? og Miljø(udvalg(et)?)?\b", r"^Teknikudvalg(et)?\b", r"^Teknik\b", r"^Miljøudvalg(et)?\b"],
+    'Byraad': [r"^Byråd(et)?\b", r"^Kommunalbestyrelse(n)?\b", r"^Regionsråd(et)?\b"],
+    'Plan': [r"^Planudvalg(et)?\b", r"^Plan-? og \w+"],
+}
+COMMITTEE_PATTERNS = {
+    source: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    for source, patterns in COMMITTEE_PATTERNS.items()
+}
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'da,en;q=0.5',
+}
+
+UUID_PATTERN = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
 
 
 def read_urls_from_file(filepath):
@@ -50,121 +82,203 @@ def get_driver():
     return driver
 
 
-def find_committee_url_interactive(driver, base_url):
+def committee_start_url(base_url, udvalg_id):
+    return f"{base_url.rstrip('/')}/?request.kriterie.udvalgId={udvalg_id}"
+
+
+def parse_committees(html, base_url):
+    """
+    Every committee a portal page lists, in page order: [{'name', 'id', 'url'}].
+    The committee filter is a dropdown whose entries carry the udvalgId in data-value
+    (hidden or not); some portals link committees directly instead.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    committees = []
+    seen = set()
+
+    def add(name, udvalg_id, url):
+        if name and url not in seen:
+            seen.add(url)
+            committees.append({'name': name, 'id': udvalg_id, 'url': url})
+
+    # --- STRATEGY 1: data-value entries ---
+    for el in soup.find_all(attrs={"data-value": UUID_PATTERN}):
+        udvalg_id = el["data-value"]
+        add(el.get_text(" ", strip=True), udvalg_id, committee_start_url(base_url, udvalg_id))
+
+    # --- STRATEGY 2: Direct links ---
+    for a in soup.find_all('a', href=True):
+        href = a['href']
+        if "udvalgId" in href or "committeeId" in href:
+            params = parse_qs(urlparse(href).query)
+            udvalg_id = next((values[0] for key, values in params.items()
+                              if key.endswith("udvalgId") or key.endswith("committeeId")), None)
+            add(a.get_text(" ", strip=True), udvalg_id, urljoin(base_url, href))
+        elif "/udvalg/" in href:
+            add(a.get_text(" ", strip=True), None, urljoin(base_url, href))
+
+    return committees
+
+
+def classify_all(committees, sources):
+    """
+    {source: committee} for every source the portal has a committee for. Each committee goes
+    to one source at most: patterns are tried most specific first across all sources, and a
+    committee claimed by an earlier (more specific) match is not handed out again.
+    """
+    matches = {}
+    claimed = set()
+    depth = max((len(patterns) for patterns in COMMITTEE_PATTERNS.values()), default=0)
+    for level in range(depth):
+        for source, patterns in COMMITTEE_PATTERNS.items():
+            if source in matches or level >= len(patterns):
+                continue
+            for committee in committees:
+                if committee['url'] not in claimed and patterns[level].search(committee['name']):
+                    matches[source] = committee
+                    claimed.add(committee['url'])
+                    break
+    # Every source takes part in the claiming (so a Plan-only run still leaves Økonomi's committee alone)
+    return {source: committee for source, committee in matches.items() if source in sources}
+
+
+async def fetch_committees_http(http, base_url):
+    """The committee list from the landing page as served, without a browser."""
+    try:
+        html = await http.get_text(base_url)
+    except Exception as e:
+        print(f"Scanning: {base_url} ... HTTP error: {e}")
+        return []
+
+    committees = parse_committees(html, base_url)
+    if committees:
+        print(f"Scanning: {base_url} ... {len(committees)} committees (HTTP)")
+    return committees
+
+
+async def discover_over_http(base_urls):
+    """All landing pages at once over one pooled session. Returns {base_url: committees}."""
+    async with http_engine.HttpEngine(headers=HEADERS) as http:
+        results = await http.gather([fetch_committees_http(http, base_url) for base_url in base_urls])
+    return {
+        base_url: ([] if isinstance(result, Exception) else result)
+        for base_url, result in zip(base_urls, results)
+    }
+
+
+def fetch_committees_with_browser(driver, base_url):
+    """Fallback for portals that build the committee list with JavaScript: parse the rendered DOM."""
     print(f"Scanning: {base_url} ... ", end="", flush=True)
 
     try:
         driver.get(base_url)
         wait = WebDriverWait(driver, 15)  # Increased timeout to 15s
 
-        # --- THE FIX: WAIT FOR TEXT TO APPEAR ---
-        # Instead of just waiting for 'body', we wait for the word "Økonomi"
-        # to appear ANYWHERE in the DOM (even if hidden).
+        # Wait until the committee dropdown is in the DOM (even if hidden)
         try:
-            wait.until(EC.presence_of_element_located(
-                (By.XPATH, "//*[contains(text(), 'Økonomi')]")
-            ))
+            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "[data-value]")))
         except TimeoutException:
-            # If "Økonomi" doesn't appear after 15s, the page might use a different term
-            # or is very slow. We proceed anyway to try other strategies.
+            # Slow page or no dropdown. We proceed anyway and look for direct links.
             pass
 
         # Optional: Scroll to bottom to trigger any lazy loading
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(1)
-
-        # Keywords to look for
-        keywords = ["Økonomiudvalg", "Økonomiudvalget", "Økonomi", "ØU"]
-
-        # --- STRATEGY 1: The "Data-Value" Extraction (Deep Search) ---
-        for keyword in keywords:
-            try:
-                # Find ALL elements containing the text, regardless of visibility
-                xpath = f"//*[contains(text(), '{keyword}')]"
-                elements = driver.find_elements(By.XPATH, xpath)
-
-                for el in elements:
-                    # Check parent hierarchy (sometimes the data-value is on the <a>, but text is in a span)
-                    # We check the element itself and its immediate parent
-
-                    # 1. Check element itself
-                    val = el.get_attribute("data-value")
-                    if val:
-                        final_url = f"{base_url.rstrip('/')}/?request.kriterie.udvalgId={val}"
-                        print("FOUND (via data-value)!")
-                        return final_url
-
-                    # 2. Check Parent (common in these nested dropdowns)
-                    try:
-                        parent = el.find_element(By.XPATH, "..")
-                        val_p = parent.get_attribute("data-value")
-                        if val_p:
-                            final_url = f"{base_url.rstrip('/')}/?request.kriterie.udvalgId={val_p}"
-                            print("FOUND (via parent data-value)!")
-                            return final_url
-                    except:
-                        pass
-
-                    # 3. Check for direct href
-                    href = el.get_attribute("href")
-                    if href and ("udvalgId" in href or "committeeId" in href):
-                        print("FOUND (via href)!")
-                        return urljoin(base_url, href)
-
-            except Exception:
-                continue
-
-        # --- STRATEGY 2: Direct Link Check (Fallback) ---
-        for keyword in keywords:
-            try:
-                xpath = f"//a[contains(., '{keyword}')]"
-                elements = driver.find_elements(By.XPATH, xpath)
-                for el in elements:
-                    href = el.get_attribute('href')
-                    if href and ("/udvalg/" in href or "id=" in href):
-                        print("FOUND (Direct Link)!")
-                        return urljoin(base_url, href)
-            except:
-                continue
+        page_waits.wait_for_network_idle(driver, timeout=3)
 
-        print("Not Found.")
-        return None
+        committees = parse_committees(driver.page_source, base_url)
+        print(f"{len(committees)} committees (browser)" if committees else "Not Found.")
+        return committees
 
     except Exception as e:
         print(f"Error: {e}")
-        return None
+        return []
 
 
 # --- MAIN ORCHESTRATOR ---
+def read_start_urls(input_file):
+    if not os.path.exists(input_file):
+        return []
+    with open(input_file, 'r', encoding='utf-8') as f:
+        return [[row['Base URL'].strip(), row['Start URL'].strip()] for row in csv.DictReader(f)]
+
+
+def write_start_urls(output_file, rows):
+    """
+    Writes one source's CSV. Unless DISCOVERY_OVERWRITE is set, an existing file keeps its
+    rows and only gains portals it has no row for yet; disagreements are reported, not applied.
+    """
+    existing = read_start_urls(output_file)
+    if existing and not DISCOVERY_OVERWRITE:
+        known = {base_url for base_url, _ in existing}
+        changed = [row for row in rows if row[0] in known and row not in existing]
+        added = [row for row in rows if row[0] not in known]
+        if changed:
+            print(f"   > {output_file}: {len(changed)} portals differ from the file; kept the file's rows "
+                  f"(DISCOVERY_OVERWRITE=on replaces them).")
+        if not added:
+            return len(existing)
+        rows = existing + added
+
+    with open(output_file, mode='w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Base URL', 'Start URL'])
+        writer.writerows(rows)
+    return len(rows)
+
+
 def run_discovery():
     base_urls = read_urls_from_file(INPUT_FILE)
+    base_urls = [url for url in base_urls if url and not url.startswith("#")]
     if not base_urls:
         print("No URLs found. Exiting.")
         return
 
-    driver = get_driver()
-
-    with open(OUTPUT_FILE, mode='w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(['Base URL', 'Start URL'])
-
-        print(f"--- Starting Discovery on {len(base_urls)} Municipalities ---")
-
-        for i, base_url in enumerate(base_urls):
-            if not base_url or base_url.startswith("#"): continue
+    # Same COMMITTEE_SOURCE switch as scraper.py; by default every source is written
+    env_source = os.environ.get('COMMITTEE_SOURCE')
+    if env_source and env_source not in COMMITTEE_CONFIGS:
+        print(f"Warning: Unknown COMMITTEE_SOURCE '{env_source}'. Valid: {list(COMMITTEE_CONFIGS.keys())}")
+        return
+    sources = [env_source] if env_source else list(COMMITTEE_CONFIGS)
 
-            specific_url = find_committee_url_interactive(driver, base_url)
+    print(f"--- Starting Discovery on {len(base_urls)} Municipalities ---")
+    print(f"Sources: {sources}")
 
-            if specific_url:
-                writer.writerow([base_url, specific_url])
-                f.flush()
+    # Pass 1: plain HTTP, every portal at once
+    found = http_engine.run(discover_over_http(base_urls))
 
-            time.sleep(0.5)
+    # Pass 2: a browser only for the portals whose HTML had no committee list
+    missing = [url for url in base_urls if not found.get(url)]
+    if missing:
+        print(f"--- {len(missing)} portals need a browser ---")
+        driver = get_driver()
+        try:
+            for base_url in missing:
+                found[base_url] = fetch_committees_with_browser(driver, base_url)
+        finally:
+            driver.quit()
+        page_waits.print_stats()
+
+    # One visit per portal feeds every source
+    rows_by_source = {source: [] for source in sources}
+    with open(COMMITTEES_FILE, mode='w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Base URL', 'Committee', 'udvalgId', 'Start URL', 'Sources'])
+        for base_url in base_urls:
+            committees = found.get(base_url) or []
+            matches = classify_all(committees, sources)
+            for source, committee in matches.items():
+                rows_by_source[source].append([base_url, committee['url']])
+            for committee in committees:
+                matched = [source for source, match in matches.items() if match is committee]
+                writer.writerow([base_url, committee['name'], committee['id'] or "", committee['url'], " ".join(matched)])
+
+    for source, rows in rows_by_source.items():
+        written = write_start_urls(COMMITTEE_CONFIGS[source], rows)
+        print(f"{source}: {len(rows)} found, {written} municipalities in '{COMMITTEE_CONFIGS[source]}'")
 
-    driver.quit()
     print("\n--- Discovery Complete! ---")
-    print(f"Results saved to '{OUTPUT_FILE}'")
+    print(f"All committees saved to '{COMMITTEES_FILE}'")
 
 
 if __name__ == "__main__":
-    run_discovery()
\ No newline at end of file
+    run_discovery()
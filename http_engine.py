@@ -0,0 +1,125 @@
+import os
+import asyncio
+
+# --- LIBRARIES ---
+try:
+    import aiohttp
+except ImportError:
+    print("Error: aiohttp library not found. Run: pip install aiohttp")
+    exit()
+
+# --- CONFIGURATION ---
+HTTP_TOTAL_LIMIT = int(os.environ.get("HTTP_TOTAL_LIMIT", "32") or 32)
+# Municipal sites are small; a handful of parallel requests per host is plenty
+HTTP_PER_HOST_LIMIT = int(os.environ.get("HTTP_PER_HOST_LIMIT", "6") or 6)
+HTTP_TIMEOUT = int(os.environ.get("HTTP_TIMEOUT", "60") or 60)
+HTTP_RETRIES = 2
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+
+
+class HttpEngine:
+    """
+    Shared asyncio HTTP client for the requests-only scrapers.
+
+        async with HttpEngine(headers=HEADERS) as http:
+            pages = await http.gather([http.get_text(url) for url in urls])
+
+    One aiohttp session with keep-alive connection pooling, a global and a per-host
+    concurrency limit, timeouts and a small retry on connection errors / 5xx.
+    """
+
+    def __init__(self, headers=None, cookies=None, total_limit=HTTP_TOTAL_LIMIT,
+                 per_host_limit=HTTP_PER_HOST_LIMIT, timeout=HTTP_TIMEOUT, retries=HTTP_RETRIES):
+        self.headers = headers or DEFAULT_HEADERS
+        self.cookies = cookies
+        self.total_limit = total_limit
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.retries = retries
+        self.session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.total_limit,
+            limit_per_host=self.per_host_limit,
+            keepalive_timeout=30,
+            ttl_dns_cache=300
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            cookies=self.cookies,
+            timeout=aiohttp.ClientTimeout(total=self.timeout, sock_connect=10)
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+
+    async def _request(self, url, read, method="GET", **kwargs):
+        """Performs a request and returns read(response). Retries transient failures."""
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.session.request(method, url, **kwargs) as response:
+                    if response.status >= 500 and attempt < self.retries:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history, status=response.status
+                        )
+                    response.raise_for_status()
+                    return await read(response)
+            except (aiohttp.ClientConnectionError, aiohttp.ClientResponseError, asyncio.TimeoutError) as e:
+                is_client_error = isinstance(e, aiohttp.ClientResponseError) and e.status < 500
+                if is_client_error or attempt >= self.retries:
+                    raise
+                await asyncio.sleep(1 + attempt)
+
+    async def get_text(self, url, encoding=None, **kwargs):
+        return await self._request(url, lambda r: r.text(encoding=encoding), **kwargs)
+
+    async def post_text(self, url, data=None, encoding=None, **kwargs):
+        return await self._request(url, lambda r: r.text(encoding=encoding), method="POST", data=data, **kwargs)
+
+    async def get_bytes(self, url, **kwargs):
+        return await self._request(url, lambda r: r.read(), **kwargs)
+
+    async def download(self, url, path, chunk_size=64 * 1024, **kwargs):
+        """Streams a response body to a file on disk. Returns the path."""
+        async def write(response):
+            tmp_path = path + ".part"
+            with open(tmp_path, 'wb') as f:
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+            return path
+        return await self._request(url, write, **kwargs)
+
+    async def stream(self, url, consume, chunk_size=64 * 1024, **kwargs):
+        """
+        Hands the response body to a blocking consumer (e.g. scraper_utils.stream_to_wasabi)
+        in a worker thread, as an iterator of bytes chunks read from the socket on demand.
+        Returns what consume(chunks) returned.
+        """
+        loop = asyncio.get_running_loop()
+
+        async def read(response):
+            def chunks():
+                while True:
+                    chunk = asyncio.run_coroutine_threadsafe(response.content.read(chunk_size), loop).result()
+                    if not chunk:
+                        return
+                    yield chunk
+            return await asyncio.to_thread(consume, chunks())
+        return await self._request(url, read, **kwargs)
+
+    @staticmethod
+    async def gather(coros):
+        """Runs coroutines concurrently. Results keep their order; failures come back as exceptions."""
+        return await asyncio.gather(*coros, return_exceptions=True)
+
+
+def run(coro):
+    """Runs an async entry point from the synchronous scraper scripts."""
+    return asyncio.run(coro)
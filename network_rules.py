@@ -0,0 +1,117 @@
+import os
+
+# --- CONFIGURATION ---
+# Set RESOURCE_BLOCKING=off to let the browsers load everything again (e.g. when a PDF looks wrong)
+BLOCKING_ENABLED = os.environ.get("RESOURCE_BLOCKING", "on").lower() not in ("off", "0", "false", "no")
+
+# URL patterns for CDP Network.setBlockedURLs, grouped by what they load.
+# '*' matches anything; a pattern has to match the whole URL.
+BLOCK_GROUPS = {
+    # Analytics, heatmaps and ad pixels
+    "trackers": [
+        "*google-analytics.com/*",
+        "*googletagmanager.com/*",
+        "*doubleclick.net/*",
+        "*connect.facebook.net/*",
+        "*facebook.com/tr*",
+        "*hotjar.com/*",
+        "*siteimprove.com/*",
+        "*siteimproveanalytics.com/*",
+        "*siteimproveanalytics.io/*",
+        "*monsido.com/*",
+        "*clarity.ms/*",
+        "*snap.licdn.com/*",
+        "*matomo.js*",
+        "*piwik.js*",
+    ],
+    # Cookie banners. The print scrapers strip the banner from the DOM anyway; this stops it loading at all.
+    "consent": [
+        "*consent.cookiebot.com/*",
+        "*consentcdn.cookiebot.com/*",
+        "*cookieinformation.com/*",
+        "*cdn.cookielaw.org/*",
+        "*app.usercentrics.eu/*",
+    ],
+    # Audio/video and embedded players
+    "media": [
+        "*.mp4", "*.mp4?*",
+        "*.webm", "*.webm?*",
+        "*.mp3", "*.mp3?*",
+        "*.m3u8", "*.m3u8?*",
+        "*youtube.com/embed/*",
+        "*youtube-nocookie.com/*",
+        "*player.vimeo.com/*",
+        "*video.twentythree.net/*",
+    ],
+    "images": [
+        "*.png", "*.png?*",
+        "*.jpg", "*.jpg?*",
+        "*.jpeg", "*.jpeg?*",
+        "*.gif", "*.gif?*",
+        "*.webp", "*.webp?*",
+        "*.avif", "*.avif?*",
+        "*.svg", "*.svg?*",
+        "*.ico", "*.ico?*",
+    ],
+    "fonts": [
+        "*.woff", "*.woff?*",
+        "*.woff2", "*.woff2?*",
+        "*.ttf", "*.ttf?*",
+        "*.otf", "*.otf?*",
+        "*.eot", "*.eot?*",
+        "*fonts.googleapis.com/*",
+        "*fonts.gstatic.com/*",
+        "*use.typekit.net/*",
+    ],
+}
+
+# What each scraper blocks.
+#   block: groups from BLOCK_GROUPS
+#   allow: patterns to take back out of those groups (setBlockedURLs has no allow-list of its own)
+#   extra: site-specific patterns to block on top
+# Pages we print keep their images and fonts: they end up in the PDF.
+SITE_RULES = {
+    "default": {"block": ["trackers", "media"]},
+    # Listing and downloading only; nothing is rendered for keeps
+    "firstagenda": {"block": ["trackers", "consent", "media", "images", "fonts"]},
+    "svendborg": {"block": ["trackers", "consent", "media"]},
+    # The Cloudflare challenge (challenges.cloudflare.com) is not in any group and must stay that way
+    "ishoej": {"block": ["trackers", "consent", "media"]},
+    "roedovre": {"block": ["trackers", "consent", "media"]},
+    "middelfart": {
+        "block": ["trackers", "consent", "media"],
+        # Drupal's EU cookie banner is served from the site itself
+        "extra": ["*/eu_cookie_compliance/*"],
+    },
+}
+
+
+def blocked_patterns(site=None):
+    """The URL patterns to block for a site (SITE_RULES key); unknown sites get the default rules."""
+    rules = SITE_RULES.get(site) or SITE_RULES["default"]
+    allowed = set(rules.get("allow", []))
+
+    patterns = []
+    for group in rules.get("block", []):
+        patterns.extend(BLOCK_GROUPS[group])
+    patterns.extend(rules.get("extra", []))
+    # Keep the order stable and drop duplicates/allowed patterns
+    return [p for p in dict.fromkeys(patterns) if p not in allowed]
+
+
+def apply(driver, site=None):
+    """
+    Blocks the site's unwanted resources in the driver's current tab. The rules survive
+    navigation, so call it once after the browser starts. Never fails the scrape.
+    """
+    if not BLOCKING_ENABLED:
+        return False
+    patterns = blocked_patterns(site)
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        print(f"   > Blocking {len(patterns)} resource patterns ({site or 'default'} rules).")
+        return True
+    except Exception as e:
+        print(f"   > Resource blocking unavailable: {e}")
+        return False
@@ -0,0 +1,315 @@
+import os
+import time
+import threading
+import weakref
+from contextlib import contextmanager
+
+from cdp_client import CdpConnection
+
+# --- CONFIGURATION ---
+# WAIT_LOG=on prints every wait with its duration (the per-run summary is always printed)
+WAIT_LOG = os.environ.get("WAIT_LOG", "off").lower() in ("on", "1", "true", "yes")
+POLL_INTERVAL = 0.1
+
+# Page titles of bot checks (Cloudflare in English and Danish)
+CHALLENGE_TITLES = ("just a moment", "øjeblik", "attention required", "checking your browser", "please wait")
+
+# Long-lived connections never "finish"; they must not keep a page from counting as idle
+IGNORED_TYPES = ("EventSource", "WebSocket")
+
+# Fallback when there is no DevTools websocket: count finished resources instead of watching requests
+RESOURCE_STATE_JS = """
+return [document.readyState, performance.getEntriesByType('resource').length];
+"""
+
+# Installs a MutationObserver once per document and returns ms since the last DOM change
+DOM_QUIET_JS = """
+if (!window.__lastMutation) {
+    window.__lastMutation = performance.now();
+    new MutationObserver(function () { window.__lastMutation = performance.now(); })
+        .observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+return performance.now() - window.__lastMutation;
+"""
+
+COUNT_JS = "return document.querySelectorAll(arguments[0]).length;"
+
+
+# --- TIMING ---
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _record(name, seconds, ok):
+    with _stats_lock:
+        entry = _stats.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0, 'timeouts': 0})
+        entry['count'] += 1
+        entry['total'] += seconds
+        entry['max'] = max(entry['max'], seconds)
+        if not ok:
+            entry['timeouts'] += 1
+    if WAIT_LOG:
+        print(f"   > wait {name}: {seconds:.2f}s{'' if ok else ' (timed out)'}")
+
+
+@contextmanager
+def timed(name):
+    """
+    Times a wait that is not one of ours (e.g. a WebDriverWait) into the same stats.
+
+        with page_waits.timed("meeting list"):
+            WebDriverWait(driver, 10).until(...)
+    """
+    started = time.time()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        _record(name, time.time() - started, ok)
+
+
+def stats():
+    """{wait name: {'count', 'total', 'max', 'timeouts'}} for this process."""
+    with _stats_lock:
+        return {name: dict(entry) for name, entry in _stats.items()}
+
+
+def print_stats():
+    """One line per kind of wait: how often, how long in total and at worst."""
+    summary = stats()
+    if not summary:
+        return
+    print("--- Wait times ---")
+    for name, entry in sorted(summary.items(), key=lambda item: -item[1]['total']):
+        average = entry['total'] / entry['count']
+        line = f"   {name}: {entry['count']}x, total {entry['total']:.1f}s, avg {average:.2f}s, max {entry['max']:.2f}s"
+        if entry['timeouts']:
+            line += f", {entry['timeouts']} timed out"
+        print(line)
+
+
+class NetworkMonitor:
+    """
+    Counts the requests in flight in one tab from CDP Network events.
+
+    Selenium's execute_cdp_cmd() cannot receive events, so for a driver this attaches its
+    own CdpConnection to the tab (chromedriver's window handle is the CDP target id).
+    tab_renderer passes the connection and session of a tab it opened itself.
+    """
+
+    def __init__(self, conn, session_id):
+        self._in_flight = set()
+        self._last_activity = time.time()
+        self._cond = threading.Condition()
+
+        self.conn = conn
+        self.session_id = session_id
+        self.conn.on(self._on_event)
+        self.conn.send("Network.enable", session_id=session_id)
+
+    @classmethod
+    def for_driver(cls, driver):
+        conn = CdpConnection.for_driver(driver)
+        try:
+            target_id = driver.current_window_handle.replace("CDwindow-", "")
+            session_id = conn.send("Target.attachToTarget", {
+                "targetId": target_id,
+                "flatten": True
+            })['sessionId']
+            return cls(conn, session_id)
+        except Exception:
+            conn.close()
+            raise
+
+    def _on_event(self, method, params, session_id):
+        if session_id != self.session_id or not method or not method.startswith("Network."):
+            return
+        with self._cond:
+            if method == "Network.requestWillBeSent":
+                if params.get('type') not in IGNORED_TYPES:
+                    self._in_flight.add(params['requestId'])
+            elif method in ("Network.loadingFinished", "Network.loadingFailed"):
+                self._in_flight.discard(params['requestId'])
+            # Any network event (headers, data chunks) means the page is still busy
+            self._last_activity = time.time()
+            self._cond.notify_all()
+
+    def wait_idle(self, idle=0.5, timeout=10):
+        """
+        Blocks until nothing is in flight and no network event arrived for `idle` seconds.
+        Returns True when idle, False on timeout.
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                now = time.time()
+                quiet_for = now - self._last_activity
+                if not self._in_flight and quiet_for >= idle:
+                    return True
+                if now >= deadline:
+                    return False
+                # Requests we never saw start (before the monitor attached) only count through _last_activity
+                wake_in = idle - quiet_for if not self._in_flight else idle
+                self._cond.wait(max(0.05, min(wake_in, deadline - now)))
+
+    def close(self):
+        if self.conn:
+            self.conn.off(self._on_event)
+            self.conn.close()
+            self.conn = None
+
+
+_monitors = weakref.WeakKeyDictionary()
+_monitors_lock = threading.Lock()
+
+
+def monitor_for(driver):
+    """Returns the (cached) NetworkMonitor of a driver, or None if the DevTools websocket is unavailable."""
+    with _monitors_lock:
+        if driver not in _monitors:
+            try:
+                _monitors[driver] = NetworkMonitor.for_driver(driver)
+            except Exception as e:
+                print(f"   > Network events unavailable ({e}). Falling back to resource polling.")
+                _monitors[driver] = None
+        return _monitors[driver]
+
+
+def _poll_resources(driver, idle, timeout):
+    """No events: idle once the document is loaded and no resource finished for `idle` seconds."""
+    deadline = time.time() + timeout
+    last_count, stable_since = None, time.time()
+    while time.time() < deadline:
+        try:
+            ready_state, count = driver.execute_script(RESOURCE_STATE_JS)
+        except Exception:
+            return False
+        now = time.time()
+        if count != last_count:
+            last_count, stable_since = count, now
+        elif ready_state == "complete" and now - stable_since >= idle:
+            return True
+        time.sleep(POLL_INTERVAL)
+    return False
+
+
+def _network_idle(driver, idle, timeout):
+    monitor = monitor_for(driver)
+    if monitor is None:
+        return _poll_resources(driver, idle, timeout)
+
+    deadline = time.time() + timeout
+    while monitor.wait_idle(idle, max(0, deadline - time.time())):
+        # The monitor can miss a page whose requests all started before it attached
+        try:
+            if driver.execute_script("return document.readyState") == "complete":
+                return True
+        except Exception:
+            return False
+        if time.time() >= deadline:
+            return False
+        time.sleep(POLL_INTERVAL)
+    return False
+
+
+# --- CONDITIONS ---
+# Every wait returns True/False (or the value it waited for) instead of raising, and records its duration.
+# Callers carry on after a timeout, like they did after the old fixed sleeps.
+
+def wait_for_network_idle(driver, idle=0.5, timeout=10):
+    """Until the current page stops loading things: nothing in flight for `idle` seconds."""
+    started = time.time()
+    ok = _network_idle(driver, idle, timeout)
+    _record("network idle", time.time() - started, ok)
+    return ok
+
+
+def wait_for_dom_quiet(driver, quiet=0.3, timeout=5):
+    """Until no DOM mutation happened for `quiet` seconds (after a click, an injected style, ...)."""
+    started = time.time()
+    deadline = started + timeout
+    ok = False
+    while True:
+        try:
+            if driver.execute_script(DOM_QUIET_JS) >= quiet * 1000:
+                ok = True
+                break
+        except Exception:
+            break
+        if time.time() >= deadline:
+            break
+        time.sleep(POLL_INTERVAL)
+    _record("dom quiet", time.time() - started, ok)
+    return ok
+
+
+def wait_for_count_stable(driver, selector, stable=0.5, timeout=10, min_count=1):
+    """
+    Until at least min_count nodes match selector and the number stops changing for `stable` seconds.
+    Returns the final count (0 if nothing ever matched).
+    """
+    started = time.time()
+    deadline = started + timeout
+    last_count, stable_since = None, started
+    ok = False
+    while True:
+        try:
+            count = driver.execute_script(COUNT_JS, selector)
+        except Exception:
+            break
+        now = time.time()
+        if count != last_count:
+            last_count, stable_since = count, now
+        elif count >= min_count and now - stable_since >= stable:
+            ok = True
+            break
+        if now >= deadline:
+            break
+        time.sleep(POLL_INTERVAL)
+    _record("element count stable", time.time() - started, ok)
+    return last_count or 0
+
+
+def wait_for_count_above(driver, selector, count, timeout=2.5):
+    """Until more than `count` nodes match selector (e.g. after scrolling an infinite list). Returns the new count."""
+    started = time.time()
+    deadline = started + timeout
+    current = count
+    ok = False
+    while time.time() < deadline:
+        time.sleep(POLL_INTERVAL)
+        try:
+            current = driver.execute_script(COUNT_JS, selector)
+        except Exception:
+            break
+        if current > count:
+            ok = True
+            break
+    _record("element count grows", time.time() - started, ok)
+    return current
+
+
+def is_challenge(title):
+    title = (title or "").lower()
+    return any(marker in title for marker in CHALLENGE_TITLES)
+
+
+def wait_for_no_challenge(driver, timeout=30):
+    """Until the page title is no longer a bot check (Cloudflare 'Just a moment...') and the page has loaded."""
+    started = time.time()
+    deadline = started + timeout
+    ok = False
+    while True:
+        try:
+            title, ready_state = driver.execute_script("return [document.title, document.readyState];")
+        except Exception:
+            title, ready_state = "", None
+        if not is_challenge(title) and ready_state == "complete":
+            ok = True
+            break
+        if time.time() >= deadline:
+            break
+        time.sleep(0.25)
+    _record("challenge cleared", time.time() - started, ok)
+    return ok
@@ -0,0 +1,113 @@
+import os
+import queue
+import threading
+
+import weasy_pool
+
+# --- CONFIGURATION ---
+# HTML -> PDF is CPU-bound; render on every core (capped) instead of one layout at a time
+RENDER_WORKERS = int(os.environ.get("PDF_RENDER_WORKERS", "0") or 0) or min(4, os.cpu_count() or 1)
+# Bytes handed on per chunk by stream_pdf()
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+# --- WORKER PROCESS ---
+def _render(html, pdf_path, css):
+    weasy_pool.write_pdf(html, pdf_path, css)
+    return pdf_path
+
+
+# --- POOL ---
+_pool = weasy_pool.WorkerPool(RENDER_WORKERS)
+
+
+async def render_html(html, pdf_path, css=None):
+    """Renders an HTML document to pdf_path with WeasyPrint in a worker process."""
+    return await _pool.run(_render, html, pdf_path, css)
+
+
+def merge_pdfs(part_paths, output_path):
+    """Concatenates PDF files in order into output_path (pages are copied part by part)."""
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    try:
+        for path in part_paths:
+            writer.append(path)
+        with open(output_path, "wb") as f:
+            writer.write(f)
+    finally:
+        writer.close()
+
+
+class _Pipe:
+    """Write end for PdfWriter.write(), which only needs write(), tell() and flush()."""
+
+    def __init__(self, chunk_size):
+        self.chunk_size = chunk_size
+        self.queue = queue.Queue(maxsize=4)
+        self.buffer = bytearray()
+        self.position = 0
+        self.abandoned = threading.Event()
+
+    def write(self, data):
+        self.buffer.extend(data)
+        self.position += len(data)
+        while len(self.buffer) >= self.chunk_size:
+            self.put(bytes(self.buffer[:self.chunk_size]))
+            del self.buffer[:self.chunk_size]
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def put(self, item):
+        # Gives up once the reader is gone, instead of blocking the writer thread forever
+        while not self.abandoned.is_set():
+            try:
+                self.queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+        raise RuntimeError("PDF stream abandoned by its reader")
+
+
+def stream_pdf(writer, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yields the bytes of a pypdf PdfWriter as it writes them (e.g. into scraper_utils.stream_to_wasabi),
+    so a merged PDF never has to be a file on disk. The writer runs in a helper thread.
+    """
+    pipe = _Pipe(chunk_size)
+
+    def produce():
+        try:
+            writer.write(pipe)
+            if pipe.buffer:
+                pipe.put(bytes(pipe.buffer))
+            pipe.put(None)
+        except Exception as e:
+            try:
+                pipe.put(e)
+            except RuntimeError:
+                pass
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = pipe.queue.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        pipe.abandoned.set()
+        thread.join()
+
+
+def shutdown():
+    _pool.shutdown()
@@ -0,0 +1,147 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+# --- CONFIGURATION ---
+# One SQLite file shared by every scraper (and every process run_scrapers.py starts)
+LEDGER_PATH = os.environ.get("RUN_LEDGER_PATH", "run_ledger.sqlite3")
+# Set RUN_LEDGER=off to ignore the ledger (e.g. to force a full re-check against Wasabi)
+LEDGER_ENABLED = os.environ.get("RUN_LEDGER", "on").lower() not in ("off", "0", "false", "no")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meetings (
+    scraper      TEXT NOT NULL,
+    url          TEXT NOT NULL,
+    filename     TEXT,
+    bucket       TEXT,
+    content_hash TEXT,
+    size         INTEGER,
+    status       TEXT NOT NULL,
+    first_seen   REAL NOT NULL,
+    updated_at   REAL NOT NULL,
+    PRIMARY KEY (scraper, url)
+)
+"""
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _connection():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(LEDGER_PATH, timeout=30, check_same_thread=False)
+        # WAL lets several scraper processes read while one writes
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(SCHEMA)
+        _conn.commit()
+    return _conn
+
+
+def get(scraper, url):
+    """Returns the ledger row of a meeting as a dict, or None."""
+    if not LEDGER_ENABLED:
+        return None
+    with _lock:
+        cursor = _connection().execute(
+            "SELECT scraper, url, filename, bucket, content_hash, size, status, first_seen, updated_at "
+            "FROM meetings WHERE scraper = ? AND url = ?", (scraper, url)
+        )
+        row = cursor.fetchone()
+    if not row:
+        return None
+    keys = ("scraper", "url", "filename", "bucket", "content_hash", "size", "status", "first_seen", "updated_at")
+    return dict(zip(keys, row))
+
+
+def is_done(scraper, url):
+    """True if this meeting URL was stored successfully by an earlier run."""
+    row = get(scraper, url)
+    return bool(row) and row['status'] == 'done'
+
+
+def done_urls(scraper):
+    """Every meeting URL a scraper has finished, for bulk checks while listing."""
+    if not LEDGER_ENABLED:
+        return set()
+    with _lock:
+        rows = _connection().execute(
+            "SELECT url FROM meetings WHERE scraper = ? AND status = 'done'", (scraper,)
+        ).fetchall()
+    return {row[0] for row in rows}
+
+
+def record(scraper, url, filename=None, bucket=None, status='done', content_hash=None, size=None):
+    """Inserts or updates a meeting. Fields passed as None keep their previous value."""
+    if not LEDGER_ENABLED:
+        return
+    now = time.time()
+    try:
+        with _lock:
+            conn = _connection()
+            conn.execute(
+                """
+                INSERT INTO meetings (scraper, url, filename, bucket, content_hash, size, status, first_seen, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (scraper, url) DO UPDATE SET
+                    filename = COALESCE(excluded.filename, filename),
+                    bucket = COALESCE(excluded.bucket, bucket),
+                    content_hash = COALESCE(excluded.content_hash, content_hash),
+                    size = COALESCE(excluded.size, size),
+                    status = excluded.status,
+                    updated_at = excluded.updated_at
+                """,
+                (scraper, url, filename, bucket, content_hash, size, status, now, now)
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        # The ledger is an optimization; never fail a scrape because of it
+        print(f"   > Ledger write failed: {e}")
+
+
+def file_digest(path):
+    """Returns (sha256 hex, size) of a local file."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def record_file(scraper, url, path, bucket=None, filename=None):
+    """Marks a meeting done and stores the hash and size of the file we produced (call before deleting it)."""
+    content_hash, size = None, None
+    try:
+        content_hash, size = file_digest(path)
+    except OSError:
+        pass
+    record(scraper, url, filename=filename or os.path.basename(path), bucket=bucket,
+           content_hash=content_hash, size=size)
+
+
+class HashingStream:
+    """
+    Wraps a chunk iterator (e.g. for stream_to_wasabi) and hashes the bytes as they pass.
+
+        stream = run_ledger.HashingStream(response.iter_content(64 * 1024))
+        scraper_utils.stream_to_wasabi(stream, bucket, key)
+        run_ledger.record(name, url, key, bucket, content_hash=stream.hexdigest(), size=stream.size)
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.digest.update(chunk)
+            self.size += len(chunk)
+            yield chunk
+
+    def hexdigest(self):
+        return self.digest.hexdigest()
@@ -3,8 +3,152 @@ import glob
 import subprocess
 import time
 import sys
+import queue
+import threading
+import importlib
+import concurrent.futures
 import scraper
 
+# --- CONCURRENCY ---
+# MAX_PARALLEL_SCRAPERS=1 keeps the classic one-after-another run with live output.
+MAX_PARALLEL_SCRAPERS = int(os.environ.get("MAX_PARALLEL_SCRAPERS", "1") or 1)
+# Chromium is the memory hog, so browser scripts get their own (smaller) cap.
+MAX_BROWSER_SCRAPERS = int(os.environ.get("MAX_BROWSER_SCRAPERS", "2") or 2)
+# Each concurrently running browser script gets its own block of DevTools ports
+# (base + slot * 10), leaving room for a BrowserPool of up to 10 browsers per script.
+CHROME_DEBUG_PORT_BASE = int(os.environ.get("CHROME_DEBUG_PORT", "9222"))
+PORTS_PER_BROWSER_SLOT = 10
+
+# Scrapers that cover several municipalities from a MUNICIPALITIES table of {'name': ...} rows
+TABLE_DRIVEN_SCRAPERS = ["scraper_meetingsplus.py", "scraper_aabendagsorden.py"]
+
+# Scrapers that always run Chromium; they count against MAX_BROWSER_SCRAPERS and get a DevTools port block.
+# HTTP scrapers that only start a browser as a rare fallback (meetingsplus, aabendagsorden) are not listed.
+BROWSER_SCRAPERS = {
+    "scraper.py",
+    "scraper_aalborg.py",
+    "scraper_hedensted.py",
+    "scraper_ishoej.py",
+    "scraper_middelfart.py",
+    "scraper_roedovre.py",
+    "scraper_svendborg.py",
+}
+
+# Not run by the pipeline. scraper_hedenstad.py is the old Hedensted prototype: it writes to the same
+# raw_files_hedensted folder as scraper_hedensted.py and renames its new PDFs, so the two must not run together.
+EXCLUDED_SCRIPTS = {"scraper_utils.py", "scraper_hedenstad.py"}
+
+print_lock = threading.Lock()
+
+
+def uses_browser(script):
+    """True if the script drives Chromium through Selenium on every run (see BROWSER_SCRAPERS)."""
+    return os.path.basename(script) in BROWSER_SCRAPERS
+
+
+def run_script_sequential(script):
+    """Runs a scraper with its output flowing straight to our stdout. Returns (returncode, duration)."""
+    script_start = time.time()
+    # Run as a separate process to ensure full isolation (memory, Selenium instance, etc.)
+    # Pass current environment variables (important for RENDER, WASABI keys)
+    result = subprocess.run(
+        [sys.executable, script],
+        capture_output=False, # Let stdout flow to the logs so we see progress in real-time
+        text=True,
+        env=os.environ.copy()
+    )
+    return result.returncode, time.time() - script_start
+
+
+def run_script_captured(script, env):
+    """Runs a scraper with its output captured line by line and prefixed with its name."""
+    script_start = time.time()
+    prefix = f"[{os.path.splitext(script)[0]}]"
+
+    process = subprocess.Popen(
+        [sys.executable, script],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        encoding='utf-8',
+        errors='replace',
+        bufsize=1,
+        env=env
+    )
+    for line in process.stdout:
+        with print_lock:
+            print(f"{prefix} {line.rstrip()}", flush=True)
+    process.wait()
+
+    return process.returncode, time.time() - script_start
+
+
+def run_scripts_parallel(scrapers):
+    """
+    Runs up to MAX_PARALLEL_SCRAPERS scrapers at once, of which at most
+    MAX_BROWSER_SCRAPERS may be Chromium-based. Returns {script: (returncode, duration)}.
+    """
+    browser_cap = max(1, min(MAX_BROWSER_SCRAPERS, MAX_PARALLEL_SCRAPERS))
+    running = threading.Semaphore(MAX_PARALLEL_SCRAPERS)
+    # Free browser slots; the browser executor never has more workers than slots
+    browser_slots = queue.Queue()
+    for slot in range(browser_cap):
+        browser_slots.put(slot)
+    results = {}
+
+    def launch(script, needs_browser):
+        env = os.environ.copy()
+        env["PYTHONUNBUFFERED"] = "1"
+        slot = browser_slots.get() if needs_browser else None
+        if needs_browser:
+            # Two Chromiums on the same fixed port would kill each other
+            env["CHROME_DEBUG_PORT"] = str(CHROME_DEBUG_PORT_BASE + slot * PORTS_PER_BROWSER_SLOT)
+        else:
+            # A fallback browser (if one is ever started) gets its own block after the browser slots
+            block = browser_cap + 1 + scrapers.index(script)
+            env["CHROME_DEBUG_PORT"] = str(CHROME_DEBUG_PORT_BASE + block * PORTS_PER_BROWSER_SLOT)
+
+        try:
+            with running:
+                with print_lock:
+                    print(f">>> LAUNCHING: {script}" + (f" (browser slot {slot})" if needs_browser else ""), flush=True)
+                return run_script_captured(script, env)
+        finally:
+            if needs_browser:
+                browser_slots.put(slot)
+
+    # Browser scripts get their own (smaller) executor so they can't starve the request-only ones
+    with concurrent.futures.ThreadPoolExecutor(max_workers=browser_cap) as browser_executor, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=MAX_PARALLEL_SCRAPERS) as plain_executor:
+        future_to_script = {}
+        for script in scrapers:
+            needs_browser = uses_browser(script)
+            executor = browser_executor if needs_browser else plain_executor
+            future_to_script[executor.submit(launch, script, needs_browser)] = script
+
+        for future in concurrent.futures.as_completed(future_to_script):
+            script = future_to_script[future]
+            try:
+                results[script] = future.result()
+            except Exception as e:
+                results[script] = e
+
+    return results
+
+
+def report_result(script, outcome):
+    """Prints the per-script SUCCESS/FAILURE line. outcome is (returncode, duration) or an exception."""
+    if isinstance(outcome, Exception):
+        print(f"!!! CRITICAL ERROR executing {script}: {outcome}\n")
+        return
+
+    returncode, duration = outcome
+    if returncode == 0:
+        print(f">>> SUCCESS: {script} (Time: {duration:.2f}s)\n")
+    else:
+        print(f"!!! FAILURE: {script} exited with code {returncode} (Time: {duration:.2f}s)\n")
+
+
 def main():
     print("=========================================")
     print("STARTING DATA PIPELINE")
@@ -14,8 +158,8 @@ def main():
     all_files = glob.glob("scraper*.py")
     
     # Exclude utilities and this script if it were named scraper_something (it's run_scrapers.py)
-    # Exclude scraper_utils.py
-    scrapers = [f for f in all_files if f != "scraper_utils.py"]
+    # Exclude scraper_utils.py and the prototypes (see EXCLUDED_SCRIPTS)
+    scrapers = [f for f in all_files if os.path.basename(f) not in EXCLUDED_SCRIPTS]
     
     # Sort to ensure consistent order (optional, but good for logs)
     scrapers.sort()
@@ -43,8 +187,19 @@ def main():
             print(f"Error checking generic scraper: {e}")
             pass
 
+        # Table-driven engines run if any of their municipalities match (case-insensitive)
+        table_matches = []
+        for engine in TABLE_DRIVEN_SCRAPERS:
+            try:
+                municipalities = importlib.import_module(engine[:-3]).MUNICIPALITIES
+                if any(target_filter.lower() in m['name'].lower() for m in municipalities):
+                    table_matches.append(engine)
+            except Exception as e:
+                print(f"Error checking {engine}: {e}")
+
         # Case-insensitive match on filenames for specific scrapers
         scrapers = [s for s in scrapers if target_filter.lower() in s.lower()]
+        scrapers += [s for s in table_matches if s not in scrapers]
 
         # If CSV matched, ensure generic scraper runs
         if has_generic_match and "scraper.py" not in scrapers:
@@ -60,31 +215,26 @@ def main():
     success_count = 0
     fail_count = 0
 
-    for script in scrapers:
-        print(f">>> LAUNCHING: {script}")
-        script_start = time.time()
-        
-        try:
-            # Run as a separate process to ensure full isolation (memory, Selenium instance, etc.)
-            # Pass current environment variables (important for RENDER, WASABI keys)
-            result = subprocess.run(
-                [sys.executable, script],
-                capture_output=False, # Let stdout flow to the logs so we see progress in real-time
-                text=True,
-                env=os.environ.copy()
-            )
-            
-            duration = time.time() - script_start
-            
-            if result.returncode == 0:
-                print(f">>> SUCCESS: {script} (Time: {duration:.2f}s)\n")
-                success_count += 1
-            else:
-                print(f"!!! FAILURE: {script} exited with code {result.returncode} (Time: {duration:.2f}s)\n")
-                fail_count += 1
-                
-        except Exception as e:
-            print(f"!!! CRITICAL ERROR executing {script}: {e}\n")
+    if MAX_PARALLEL_SCRAPERS > 1:
+        print(f"Concurrent mode: {MAX_PARALLEL_SCRAPERS} scrapers at once (max {MAX_BROWSER_SCRAPERS} with Chromium)\n")
+        results = run_scripts_parallel(scrapers)
+        # Keep the summary in a stable order regardless of completion order
+        for script in scrapers:
+            report_result(script, results[script])
+    else:
+        results = {}
+        for script in scrapers:
+            print(f">>> LAUNCHING: {script}")
+            try:
+                results[script] = run_script_sequential(script)
+            except Exception as e:
+                results[script] = e
+            report_result(script, results[script])
+
+    for outcome in results.values():
+        if isinstance(outcome, tuple) and outcome[0] == 0:
+            success_count += 1
+        else:
             fail_count += 1
 
     total_duration = time.time() - start_time_total
@@ -1,20 +1,23 @@
 import os
 import re
-import time
 import csv
+import shutil
 import pandas as pd
 import datetime
-from glob import glob
-from urllib.parse import urlparse
+import itertools
+import concurrent.futures
+from urllib.parse import urlparse, parse_qs
 
 # Import shared utils
 import scraper_utils
+import browser_pool
+import download_tracker
+import firstagenda_listing
+import page_waits
+import run_ledger
 
 # Import Selenium
 try:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.service import Service
-    from selenium.webdriver.chrome.options import Options
     from selenium.webdriver.common.by import By
     from selenium.webdriver.support.ui import WebDriverWait
     from selenium.webdriver.support import expected_conditions as EC
@@ -23,13 +26,6 @@ except ImportError:
     print("Error: Selenium library not found. Run: pip install selenium")
     exit()
 
-# Import BeautifulSoup
-try:
-    from bs4 import BeautifulSoup
-except ImportError:
-    print("Error: BeautifulSoup library not found. Run: pip install beautifulsoup4")
-    exit()
-
 # --- CONFIGURATION ---
 
 COMMITTEE_CONFIGS = {
@@ -45,65 +41,32 @@ BASE_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 }
 IS_RENDER = os.environ.get('RENDER') == 'true'
+# Committee sources can share a listing (same meetings, different buckets), so the ledger is kept per bucket
+LEDGER_NAME = "firstagenda"
+# 'http': the browser only lists meetings and lends its cookies; PDFs are fetched directly in parallel
+# 'browser': every PDF is downloaded through Chrome (the old behaviour)
+DOWNLOAD_MODE = os.environ.get("FIRSTAGENDA_DOWNLOAD_MODE", "http").lower()
+HTTP_DOWNLOAD_WORKERS = int(os.environ.get("FIRSTAGENDA_DOWNLOAD_WORKERS", "6") or 6)
 
 def get_driver(download_dir):
     """
-    Initializes a new driver for each municipality to ensure
-    downloads go to the correct specific folder.
+    Starts a standalone driver whose downloads go to download_dir.
+    run_scraper() borrows warm browsers from a BrowserPool instead.
     """
-    chrome_options = Options()
-    
-    # Render Specific
-    if IS_RENDER:
-        chrome_options.add_argument("--headless=new")
-        chrome_options.binary_location = "/usr/bin/chromium"
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--remote-debugging-port=9222")
-    else:
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
-
-    # Configure download folder dynamically
-    prefs = {
-        "download.default_directory": download_dir,
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "plugins.always_open_pdf_externally": True
-    }
-    chrome_options.add_experimental_option("prefs", prefs)
-
-    if IS_RENDER:
-         print(f"   Binary: /usr/bin/chromium")
-         # Selenium Manager finds driver automatically on Render if installed via apt
-         driver = webdriver.Chrome(options=chrome_options)
-    else:
-        driver_path = os.path.join(os.getcwd(), 'chromedriver.exe')
-        if not os.path.exists(driver_path):
-            driver_path = 'chromedriver'  # Fallback
-        
-        service = Service(executable_path=driver_path)
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        
-    return driver
+    return browser_pool.create_driver(download_dir=download_dir, block_rules="firstagenda")
 
 
-def get_meeting_links(driver, start_url, base_url):
+def get_meeting_links(driver, start_url, base_url, is_stored=None):
     """
-    Scrapes meeting links using infinite scroll.
-    Respects the global MAX_DOWNLOADS limit to stop scrolling early if possible.
+    Lists meeting links for one committee.
+    Prefers the portal's own paging endpoint over HTTP (firstagenda_listing) and only
+    falls back to infinite scroll if no usable endpoint is found.
+    Respects the global MAX_DOWNLOADS limit to stop early if possible.
+    is_stored(link): lets SCRAPE_MODE=NEW stop at the first meetings we already have.
     """
     print(f"   > Finding Meeting Pages on {start_url}...")
     driver.get(start_url)
     
-    # ... (rest of the logic remains same until we implement better filtering logic here if possible)
-    # Actually, we can't filter by date effectively here without visiting the link or parsing text if available.
-    # The current logic collects all links then processes them.
-    # We will filter in process_download to save bandwidth/time on PDF downloads, 
-    # but we still have to find the links.
-    
     try:
         # Wait for the first link to ensure page loaded
         WebDriverWait(driver, 10).until(
@@ -113,42 +76,124 @@ def get_meeting_links(driver, start_url, base_url):
         print("   > Warning: Page loaded but no meeting links found (or timed out).")
         return []
 
-    seen_links = set()
+    # Newest first: in SCRAPE_MODE=NEW the listing stops at the first old/already stored meetings
+    session = browser_pool.session_from_driver(driver)
     ordered_links = []
-    last_total_count = 0
+    try:
+        pages = firstagenda_listing.iter_link_pages(driver, session, base_url)
+        date_of = lambda link: firstagenda_listing.parse_meeting_link(link)['date']
+        for link in scraper_utils.iter_listing(pages, date_of, is_stored=is_stored):
+            ordered_links.append(link)
+
+            # Optimization: If we have a limit, stop collecting once we reach it
+            if MAX_DOWNLOADS and len(ordered_links) >= MAX_DOWNLOADS:
+                print(f"   > Reached limit of {MAX_DOWNLOADS} meetings.")
+                break
+    finally:
+        session.close()
 
-    while True:
-        # Parse current page state
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        links = soup.find_all('a', href=lambda h: h and h.startswith('/vis?Referat-'))
+    return ordered_links
 
-        for link in links:
-            href = link.get('href')
-            # Ensure we construct the full URL using the correct Base URL
-            full_url = base_url.rstrip('/') + href if href.startswith('/') else base_url + '/' + href
 
-            if full_url not in seen_links:
-                seen_links.add(full_url)
-                ordered_links.append(full_url)
+def ledger_name(bucket_name):
+    """Ledger scope of one destination bucket, e.g. 'firstagenda:raw-files-roskilde-byraad'."""
+    return f"{LEDGER_NAME}:{bucket_name}"
 
-                # Optimization: If we have a limit, stop collecting once we reach it
-                if MAX_DOWNLOADS and len(ordered_links) >= MAX_DOWNLOADS:
-                    print(f"   > Reached limit of {MAX_DOWNLOADS} meetings.")
-                    return ordered_links
 
-        print(f"   > Found {len(ordered_links)} unique links so far...")
+def describe_download(meeting_url, base_url, download_dir, muni_name, committee_source):
+    """
+    Works out file names, bucket and the direct download URL for one meeting.
+    Returns None if the URL has no meeting UUID.
+    """
+    # Extract UUID
+    uuid_match = re.search(r"id=([a-f0-9\-]{36})", meeting_url)
+    if not uuid_match:
+        print(f"     Skipping (No UUID found): {meeting_url}")
+        return None
+    uuid = uuid_match.group(1)
+
+    # Determine Date for filename
+    date_match = re.search(r'd\.(\d{2}-\d{2}-\d{4})', meeting_url)
+    date_obj = None
+    if date_match:
+        d_str, m_str, y_str = date_match.group(1).split('-')
+        filename = f"{y_str}-{m_str}-{d_str}_{muni_name}_oekonomiudvalget.pdf"
+        try:
+            date_obj = datetime.date(int(y_str), int(m_str), int(d_str))
+        except:
+            pass
+    else:
+        filename = f"{muni_name}_oekonomiudvalget_{uuid}.pdf"
 
-        if len(ordered_links) == last_total_count:
-            print("   > No new links loaded. Finished scrolling.")
-            break
+    # Determine Paths
+    local_path = os.path.join(download_dir, filename)
+    
+    # Modify bucket name based on committee source
+    bucket_suffix = ""
+    if committee_source == "Teknik":
+        bucket_suffix = "-teknikmiljoe"
+    elif committee_source == "Byraad":
+        bucket_suffix = "-byraad"
+    elif committee_source == "Plan":
+        bucket_suffix = "-plan"
+        
+    bucket_name = f"raw-files-{muni_name}{bucket_suffix}".replace('_', '-') # S3 buckets usually dash, not underscore
+
+    # Construct Direct Download Link
+    direct_download_url = f"{base_url.rstrip('/')}/pdf/GetDagsorden/{uuid}"
+    
+    # S3 Remote Filename: Insert source URL before extension
+    # e.g., "my_file&&https://.../foo.pdf" instead of "my_file.pdf&&https://..."
+    name_root, name_ext = os.path.splitext(filename)
+    # Sanitize URL: Replace '/' with '@' to avoid S3 folder creation
+    sanitized_url = direct_download_url.replace('/', '@')
+    remote_filename = f"{name_root}&&{sanitized_url}{name_ext}"
+
+    return {
+        'meeting_url': meeting_url,
+        'filename': filename,
+        'date_obj': date_obj,
+        'local_path': local_path,
+        'bucket_name': bucket_name,
+        'remote_filename': remote_filename,
+        'url': direct_download_url,
+        'ledger': ledger_name(bucket_name)
+    }
 
-        last_total_count = len(ordered_links)
 
-        # Scroll down
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(2.5)
+def is_stored(job, verbose=False):
+    """Checks the run ledger, then Wasabi (on Render) or the local folder, for a download described by describe_download()."""
+    if run_ledger.is_done(job['ledger'], job['meeting_url']):
+        return True
 
-    return ordered_links
+    # --- CHECK EXISTENCE (Cloud or Local) ---
+    if IS_RENDER:
+         # Check Wasabi first (for the remote filename, which includes the URL)
+         if scraper_utils.object_exists(job['bucket_name'], job['remote_filename']):
+             if verbose:
+                 print(f"     Skipping {job['remote_filename']} (Already in Wasabi)")
+             run_ledger.record(job['ledger'], job['meeting_url'], job['remote_filename'], job['bucket_name'])
+             return True
+    elif os.path.exists(job['local_path']):
+         # print(f"     Skipping (Exists): {job['filename']}")
+         return True
+    return False
+
+
+def plan_download(meeting_url, base_url, download_dir, muni_name, committee_source):
+    """Returns the download job for one meeting, or None if it should be skipped (no UUID, filtered date, already stored)."""
+    job = describe_download(meeting_url, base_url, download_dir, muni_name, committee_source)
+    if not job:
+        return None
+
+    # --- DATE FILTERING ---
+    if job['date_obj'] and not scraper_utils.should_scrape(job['date_obj']):
+         # print(f"     Skipping (Old/Filtered Date): {job['filename']}")
+         return None
+
+    if is_stored(job, verbose=True):
+        return None
+    return job
 
 
 def process_download(driver, meeting_url, base_url, download_dir, muni_name, committee_source):
@@ -157,122 +202,103 @@ def process_download(driver, meeting_url, base_url, download_dir, muni_name, com
     Uses the dynamic base_url to construct the download link.
     """
     try:
-        # Extract UUID
-        uuid_match = re.search(r"id=([a-f0-9\-]{36})", meeting_url)
-        if not uuid_match:
-            print(f"     Skipping (No UUID found): {meeting_url}")
-            return
-        uuid = uuid_match.group(1)
-
-        # Determine Date for filename
-        date_match = re.search(r'd\.(\d{2}-\d{2}-\d{4})', meeting_url)
-        date_obj = None
-        if date_match:
-            d_str, m_str, y_str = date_match.group(1).split('-')
-            filename = f"{y_str}-{m_str}-{d_str}_{muni_name}_oekonomiudvalget.pdf"
-            try:
-                date_obj = datetime.date(int(y_str), int(m_str), int(d_str))
-            except:
-                pass
-        else:
-            filename = f"{muni_name}_oekonomiudvalget_{uuid}.pdf"
+        job = plan_download(meeting_url, base_url, download_dir, muni_name, committee_source)
+        if job:
+            download_with_browser(driver, job, download_dir)
+    except Exception as e:
+        print(f"     Error processing URL: {e}")
 
-        # --- DATE FILTERING ---
-        if date_obj and not scraper_utils.should_scrape(date_obj):
-             # print(f"     Skipping (Old/Filtered Date): {filename}")
-             return
 
-        # Determine Paths
-        local_path = os.path.join(download_dir, filename)
-        
-        # Modify bucket name based on committee source
-        bucket_suffix = ""
-        if committee_source == "Teknik":
-            bucket_suffix = "-teknikmiljoe"
-        elif committee_source == "Byraad":
-            bucket_suffix = "-byraad"
-        elif committee_source == "Plan":
-            bucket_suffix = "-plan"
-            
-        bucket_name = f"raw-files-{muni_name}{bucket_suffix}".replace('_', '-') # S3 buckets usually dash, not underscore
+def download_with_browser(driver, job, download_dir):
+    """Sends Chrome to the PDF URL and waits for the download to finish. Returns True on success."""
+    print(f"     Downloading: {job['filename']} ...")
+    
+    # Chrome tells us when the file is done (CDP download events)
+    tracker = download_tracker.tracker_for(driver, download_dir)
+    token = tracker.expect()
+    
+    try:
+        driver.get(job['url'])
+    except Exception as e:
+        print(f"     > Browser error: {e}")
+        return False
 
-        # Construct Direct Download Link
-        direct_download_url = f"{base_url.rstrip('/')}/pdf/GetDagsorden/{uuid}"
-        
-        # S3 Remote Filename: Insert source URL before extension
-        # e.g., "my_file&&https://.../foo.pdf" instead of "my_file.pdf&&https://..."
-        name_root, name_ext = os.path.splitext(filename)
-        # Sanitize URL: Replace '/' with '@' to avoid S3 folder creation
-        sanitized_url = direct_download_url.replace('/', '@')
-        remote_filename = f"{name_root}&&{sanitized_url}{name_ext}"
-
-        # --- CHECK EXISTENCE (Cloud or Local) ---
-        if IS_RENDER:
-             # Check Wasabi first
-             s3 = scraper_utils.get_s3_client()
-             try:
-                 # Check for the remote filename (which includes the URL)
-                 s3.head_object(Bucket=bucket_name, Key=remote_filename)
-                 print(f"     Skipping {remote_filename} (Already in Wasabi)")
-                 return
-             except:
-                 pass
-        elif os.path.exists(local_path):
-             # print(f"     Skipping (Exists): {filename}")
-             return
+    # Wait for file
+    downloaded_file = tracker.wait(token, url=job['url'], timeout=60)
 
+    # Rename & Upload
+    if not downloaded_file:
+        print("     > Timeout waiting for file.")
+        return False
 
-        print(f"     Downloading: {filename} ...")
-        
-        # Snapshot for detection
-        files_before = set(glob(os.path.join(download_dir, "*.pdf")))
+    try:
+        # Move to final name (overwrites an older local copy)
+        os.replace(downloaded_file, job['local_path'])
         
-        try:
-            driver.get(direct_download_url)
-        except Exception as e:
-            print(f"     > Browser error: {e}")
-            return
-
-        # Wait for file
-        timeout = time.time() + 60
-        downloaded_file = None
-
-        while time.time() < timeout:
-            files_now = set(glob(os.path.join(download_dir, "*.pdf")))
-            new_files = files_now - files_before
-
-            if new_files:
-                potential_file = new_files.pop()
-                if not potential_file.endswith(".crdownload"):
-                    downloaded_file = potential_file
-                    break
-            time.sleep(0.5)
-
-        # Rename & Upload
-        if downloaded_file:
-            try:
-                time.sleep(1)  # Release handle
-                # Move to final name
-                if os.path.exists(local_path):
-                    os.remove(local_path) # Overwrite if exists (locally)
-                os.rename(downloaded_file, local_path)
-                
-                # --- UPLOAD IF ON RENDER ---
-                if IS_RENDER:
-                    # Upload using the new remote_filename
-                    scraper_utils.upload_to_wasabi(local_path, bucket_name, remote_filename)
-                    if os.path.exists(local_path):
-                        os.remove(local_path)
-                else:
-                    print(f"     > Success!")
-                    
-            except Exception as e:
-                print(f"     > Error renaming/uploading: {e}")
+        # --- UPLOAD IF ON RENDER ---
+        if IS_RENDER:
+            # Upload using the new remote_filename
+            if scraper_utils.upload_to_wasabi(job['local_path'], job['bucket_name'], job['remote_filename']):
+                run_ledger.record_file(job['ledger'], job['meeting_url'], job['local_path'],
+                                       job['bucket_name'], job['remote_filename'])
+            if os.path.exists(job['local_path']):
+                os.remove(job['local_path'])
         else:
-            print("     > Timeout waiting for file.")
+            run_ledger.record_file(job['ledger'], job['meeting_url'], job['local_path'])
+            print(f"     > Success!")
+        return True
+            
+    except Exception as e:
+        print(f"     > Error renaming/uploading: {e}")
+        return False
+
+
+def download_with_session(session, job):
+    """
+    Downloads one PDF directly over HTTP with the browser's cookies.
+    Returns False if the portal answered with something that is not a PDF
+    (e.g. a login or consent page), so the caller can fall back to the browser.
+    """
+    try:
+        with session.get(job['url'], stream=True, timeout=60) as response:
+            response.raise_for_status()
+            chunks = response.iter_content(chunk_size=64 * 1024)
+            first_chunk = next(chunks, b"")
+            if not first_chunk.startswith(b"%PDF"):
+                print(f"     > {job['filename']}: not a PDF over HTTP, retrying in browser.")
+                return False
+
+            # --- STREAM TO WASABI IF ON RENDER ---
+            if IS_RENDER:
+                stream = run_ledger.HashingStream(itertools.chain([first_chunk], chunks))
+                result = scraper_utils.stream_to_wasabi(stream, job['bucket_name'], job['remote_filename'])
+                if result is True:
+                    run_ledger.record(job['ledger'], job['meeting_url'], job['remote_filename'], job['bucket_name'],
+                                      content_hash=stream.hexdigest(), size=stream.size)
+                elif result == "EXISTS":
+                    run_ledger.record(job['ledger'], job['meeting_url'], job['remote_filename'], job['bucket_name'])
+                return bool(result)
+
+            tmp_path = job['local_path'] + ".part"
+            with open(tmp_path, 'wb') as f:
+                f.write(first_chunk)
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, job['local_path'])
+            run_ledger.record_file(job['ledger'], job['meeting_url'], job['local_path'])
+            print(f"     > Saved: {job['filename']}")
+            return True
 
     except Exception as e:
-        print(f"     Error processing URL: {e}")
+        print(f"     > HTTP download failed for {job['filename']}: {e}")
+        return False
+
+
+def download_all_with_session(session, jobs):
+    """Downloads jobs in parallel over one pooled session. Returns the jobs that failed."""
+    with concurrent.futures.ThreadPoolExecutor(max_workers=HTTP_DOWNLOAD_WORKERS) as executor:
+        results = list(executor.map(lambda job: download_with_session(session, job), jobs))
+    return [job for job, ok in zip(jobs, results) if not ok]
 
 
 def get_municipalities_from_file(input_file):
@@ -308,6 +334,182 @@ def extract_name_from_url(url):
     return name
 
 
+def download_over_http(pool, session, meeting_links, base_url, download_dir, muni_name, source_name):
+    """Hybrid mode: PDFs are fetched directly over HTTP in parallel; only failures go through a browser."""
+    jobs = []
+    for link in meeting_links:
+        try:
+            job = plan_download(link, base_url, download_dir, muni_name, source_name)
+        except Exception as e:
+            print(f"     Error processing URL: {e}")
+            continue
+        if job:
+            jobs.append(job)
+
+    print(f"    Downloading {len(jobs)} new files over HTTP...")
+    failed = download_all_with_session(session, jobs)
+    session.close()
+
+    # 3. Whatever the portal refused over plain HTTP goes through a browser
+    if failed:
+        print(f"    Retrying {len(failed)} files in the browser...")
+        with pool.lease(download_dir) as driver:
+            for job in failed:
+                download_with_browser(driver, job, download_dir)
+
+
+def download_dir_for(muni_name, source_name):
+    """Local folder of one committee source (e.g. raw_files_esbjerg, raw_files_esbjerg_byraad)."""
+    # Modify local folder name based on committee source
+    dir_suffix = ""
+    if source_name == "Teknik":
+        dir_suffix = "_teknikmiljoe"
+    elif source_name == "Byraad":
+        dir_suffix = "_byraad"
+    elif source_name == "Plan":
+        dir_suffix = "_plan"
+
+    return os.path.abspath(f"raw_files_{muni_name}{dir_suffix}")
+
+
+def copy_download(job, copy_job):
+    """Copies a stored PDF to another committee's bucket (server-side) or folder. Returns True on success."""
+    if IS_RENDER:
+        result = scraper_utils.copy_within_wasabi(job['bucket_name'], job['remote_filename'],
+                                                  copy_job['bucket_name'], copy_job['remote_filename'])
+        if result:
+            # Same bytes as the source object: keep its hash and size
+            source = run_ledger.get(job['ledger'], job['meeting_url']) or {}
+            run_ledger.record(copy_job['ledger'], copy_job['meeting_url'], copy_job['remote_filename'],
+                              copy_job['bucket_name'], content_hash=source.get('content_hash'), size=source.get('size'))
+        return bool(result)
+    if not os.path.exists(job['local_path']):
+        return False
+    tmp_path = copy_job['local_path'] + ".part"
+    shutil.copyfile(job['local_path'], tmp_path)
+    os.replace(tmp_path, copy_job['local_path'])
+    run_ledger.record_file(copy_job['ledger'], copy_job['meeting_url'], copy_job['local_path'])
+    return True
+
+
+def fan_out(meeting_links, base_url, muni_name, source_name, download_dir, other_sources):
+    """
+    Gives every other committee source that maps to the same listing the PDFs the first
+    source just stored, without listing or downloading the meetings again.
+    """
+    for other_source in other_sources:
+        other_dir = download_dir_for(muni_name, other_source)
+        os.makedirs(other_dir, exist_ok=True)
+
+        pairs = []
+        for link in meeting_links:
+            job = describe_download(link, base_url, download_dir, muni_name, source_name)
+            copy_job = describe_download(link, base_url, other_dir, muni_name, other_source)
+            if not job or not copy_job:
+                continue
+            if copy_job['date_obj'] and not scraper_utils.should_scrape(copy_job['date_obj']):
+                continue
+            if not is_stored(copy_job):
+                pairs.append((job, copy_job))
+
+        if not pairs:
+            continue
+        print(f"    Copying {len(pairs)} files to {other_source}...")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=HTTP_DOWNLOAD_WORKERS) as executor:
+            results = list(executor.map(lambda pair: copy_download(*pair), pairs))
+        print(f"    Copied {sum(1 for ok in results if ok)}/{len(pairs)} files to {other_source}.")
+
+
+def process_municipality(pool, target):
+    """
+    Lists and downloads every meeting for one listing using a browser borrowed from the pool.
+    target['sources']: the committee sources that map to this listing; the first one downloads,
+    the others get copies.
+    """
+    base_url = target['base_url']
+    start_url = target['start_url']
+    source_name, other_sources = target['sources'][0], target['sources'][1:]
+
+    # Generate a folder name based on the URL (e.g., raw_files_esbjerg)
+    muni_name = extract_name_from_url(base_url)
+
+    download_dir = download_dir_for(muni_name, source_name)
+    os.makedirs(download_dir, exist_ok=True)
+
+    print(f"[*] Processing: {muni_name.upper()} ({', '.join(target['sources'])})")
+    print(f"    Folder: {download_dir}")
+
+    try:
+        # Borrow a warm browser; its download folder is switched via CDP instead of a relaunch
+        with pool.lease(download_dir) as driver:
+            # 1. Get Links
+            def link_is_stored(link):
+                # Stored only once every source sharing this listing has it in its own bucket
+                # (is_stored asks the ledger first and storage only if the ledger doesn't know)
+                for source in target['sources']:
+                    job = describe_download(link, base_url, download_dir_for(muni_name, source), muni_name, source)
+                    if not job or not is_stored(job):
+                        return False
+                return True
+
+            meeting_links = get_meeting_links(driver, start_url, base_url, is_stored=link_is_stored)
+
+            if not meeting_links:
+                print("    No links found. Skipping.")
+                return
+
+            # Apply limit if set
+            if MAX_DOWNLOADS:
+                meeting_links = meeting_links[:MAX_DOWNLOADS]
+
+            print(f"    Processing {len(meeting_links)} files...")
+
+            session = None
+            if DOWNLOAD_MODE == "http":
+                # The browser has been on the portal, so its cookies are all we need from it
+                session = browser_pool.session_from_driver(driver, pool_size=HTTP_DOWNLOAD_WORKERS)
+            else:
+                # 2. Download Loop (every PDF through the browser)
+                for i, link in enumerate(meeting_links):
+                    print(f"    [{i + 1}/{len(meeting_links)}]", end="")
+                    process_download(driver, link, base_url, download_dir, muni_name, source_name)
+
+        if session:
+            download_over_http(pool, session, meeting_links, base_url, download_dir, muni_name, source_name)
+
+        if other_sources:
+            fan_out(meeting_links, base_url, muni_name, source_name, download_dir, other_sources)
+
+    except Exception as e:
+        print(f"    Critical error for {muni_name}: {e}")
+
+    print(f"    Finished {muni_name} ({', '.join(target['sources'])}).\n")
+
+
+def listing_key(target):
+    """(base_url, udvalgId): two committee sources with the same key list the same meetings."""
+    query = parse_qs(urlparse(target['start_url']).query)
+    committee = query.get('request.kriterie.udvalgId', [target['start_url']])[0]
+    return target['base_url'].rstrip('/').lower(), committee.lower()
+
+
+def plan_listings(sources_to_run):
+    """
+    Reads every source's CSV and merges rows that point at the same listing.
+    Returns [{'base_url', 'start_url', 'sources': [source names]}], in file order.
+    """
+    plan = {}
+    for source_name, input_file in sources_to_run.items():
+        print(f"Reading {source_name} from: {input_file}")
+        for target in get_municipalities_from_file(input_file):
+            key = listing_key(target)
+            if key not in plan:
+                plan[key] = dict(target, sources=[])
+            if source_name not in plan[key]['sources']:
+                plan[key]['sources'].append(source_name)
+    return list(plan.values())
+
+
 # --- MAIN ORCHESTRATOR ---
 def run_scraper():
     print(f"--- Starting Multi-Municipality Scraper ---")
@@ -327,72 +529,33 @@ def run_scraper():
 
     print(f"Sources to run: {list(sources_to_run.keys())}")
     print(f"Download Limit: {MAX_DOWNLOADS if MAX_DOWNLOADS else 'Unlimited'}")
+    print(f"Download Mode: {DOWNLOAD_MODE}")
 
-    for source_name, input_file in sources_to_run.items():
-        print(f"\n=== Processing Source: {source_name} ===")
-        print(f"Reading from: {input_file}")
-
-        targets = get_municipalities_from_file(input_file)
-        print(f"Found {len(targets)} municipalities to process.\n")
-
-        for target in targets:
-            base_url = target['base_url']
-            start_url = target['start_url']
-
-            # Generate a folder name based on the URL (e.g., raw_files_esbjerg)
-            muni_name = extract_name_from_url(base_url)
-            
-            # --- APPLY FILTER IF SET ---
-            municipality_filter = os.environ.get("MUNICIPALITY_FILTER")
-            if municipality_filter:
-                # Check if this municipality matches the filter string
-                if municipality_filter.upper() not in muni_name.upper():
-                    # print(f"Skipping {muni_name} (Does not match filter: {municipality_filter})")
-                    continue
-            
-            # Modify local folder name based on committee source
-            dir_suffix = ""
-            if source_name == "Teknik":
-                dir_suffix = "_teknikmiljoe"
-            elif source_name == "Byraad":
-                dir_suffix = "_byraad"
-            elif source_name == "Plan":
-                dir_suffix = "_plan"
-
-            download_dir = os.path.abspath(f"raw_files_{muni_name}{dir_suffix}")
-            os.makedirs(download_dir, exist_ok=True)
+    # Warm browsers are shared by every municipality and committee in this run
+    pool = browser_pool.BrowserPool(block_rules="firstagenda")
+    print(f"Browser Pool Size: {pool.size}")
 
-            print(f"[*] Processing: {muni_name.upper()} ({source_name})")
-            print(f"    Folder: {download_dir}")
-
-            # Start a fresh driver for this municipality to ensure clean download folder
-            driver = get_driver(download_dir)
-
-            try:
-                # 1. Get Links
-                meeting_links = get_meeting_links(driver, start_url, base_url)
-
-                if not meeting_links:
-                    print("    No links found. Skipping.")
-                    continue
-
-                # Apply limit if set
-                if MAX_DOWNLOADS:
-                    meeting_links = meeting_links[:MAX_DOWNLOADS]
-
-                print(f"    Processing {len(meeting_links)} files...")
-
-                # 2. Download Loop
-                for i, link in enumerate(meeting_links):
-                    print(f"    [{i + 1}/{len(meeting_links)}]", end="")
-                    process_download(driver, link, base_url, download_dir, muni_name, source_name)
-
-            except Exception as e:
-                print(f"    Critical error for {muni_name}: {e}")
-            finally:
-                driver.quit()
-
-            print(f"    Finished {muni_name} ({source_name}).\n")
+    try:
+        # Each distinct (portal, committee) listing is crawled once, whatever sources share it
+        targets = plan_listings(sources_to_run)
+        mappings = sum(len(t['sources']) for t in targets)
+        print(f"\n=== {len(targets)} listings to process ({mappings} committee mappings) ===\n")
+
+        # Filter first so the pool only works on municipalities we actually want
+        municipality_filter = os.environ.get("MUNICIPALITY_FILTER")
+        if municipality_filter:
+            targets = [t for t in targets
+                       if municipality_filter.upper() in extract_name_from_url(t['base_url']).upper()]
+
+        if pool.size > 1:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=pool.size) as executor:
+                list(executor.map(lambda t: process_municipality(pool, t), targets))
+        else:
+            for target in targets:
+                process_municipality(pool, target)
+    finally:
+        pool.close()
+        page_waits.print_stats()
 
     print("--- All Jobs Complete ---")
 
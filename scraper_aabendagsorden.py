@@ -0,0 +1,483 @@
+import os
+import re
+import asyncio
+import datetime
+import json
+import itertools
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+
+# --- UTILS ---
+import scraper_utils
+import http_engine
+import run_ledger
+import docx_converter
+import browser_fallback
+
+# --- CONFIGURATION ---
+IS_RENDER = os.environ.get('RENDER') == 'true'
+
+# Every "Åben Dagsorden" site we scrape. Adding a municipality is one row here.
+#   name:         used for the bucket (raw-files-<name>), local folder, filenames and the run ledger
+#   committee:    visible text of the committee in #searchSelect
+#   convert_docx: the site publishes Word files; store .docx as-is or convert them to PDF
+MUNICIPALITIES = [
+    {"name": "glostrup", "base_url": "https://dagsorden.glostrup.dk", "committee": "Økonomiudvalget",
+     "start_date": "01/01/2023", "convert_docx": True},
+    {"name": "syddjurs", "base_url": "https://aabendagsorden.syddjurs.dk", "committee": "Økonomiudvalget (ØK)",
+     "start_date": "01/01/2023", "convert_docx": False},
+]
+
+# How many meeting pages / files are fetched at the same time per site
+FILE_CONCURRENCY = 6
+# Rows per request when a result table is paged server-side
+DATATABLES_PAGE_LENGTH = 100
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+
+
+def site_settings(site):
+    name = site['name']
+    return dict(
+        site,
+        start_url=site['base_url'].rstrip('/') + "/",
+        bucket=f"raw-files-{name}",
+        download_dir="/tmp" if IS_RENDER else os.path.abspath(f"raw_files_{name}")
+    )
+
+
+def selected_sites():
+    """The sites matching MUNICIPALITY_FILTER (all of them if it is not set)."""
+    target_filter = os.environ.get("MUNICIPALITY_FILTER")
+    sites = [site_settings(s) for s in MUNICIPALITIES]
+    if target_filter:
+        sites = [s for s in sites if target_filter.lower() in s['name'].lower()]
+    return sites
+
+
+# --- PARSING ---
+def parse_result_rows(html, base_url):
+    """All meetings in a #resultTable, parsed in one go: [{url, date_str, date_obj}]."""
+    soup = BeautifulSoup(html, 'html.parser')
+    meetings = []
+    for row in soup.select("#resultTable tbody tr"):
+        cols = row.find_all("td")
+        if not cols or "Ingen data" in row.get_text():
+            continue
+
+        date_match = re.search(r"(\d{2})-(\d{2})-(\d{4})", cols[0].get_text(strip=True))
+        link = row.select_one("a.row-link")
+        if not date_match or not link or not link.get('href'):
+            continue
+
+        d, m, y = date_match.groups()
+        try:
+            date_obj = datetime.date(int(y), int(m), int(d))
+        except ValueError:
+            continue
+        meetings.append({
+            "url": urljoin(base_url, link.get('href')),
+            "date_str": f"{y}-{m}-{d}",
+            "date_obj": date_obj
+        })
+    return meetings
+
+
+def build_search_request(html, site):
+    """
+    Fills in the search form from the start page's HTML: committee in #searchSelect and the
+    'from' date. Returns (method, url, fields) or None if the page has no usable form.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    select = soup.find(id="searchSelect")
+    form = select.find_parent("form") if select else None
+    if not form or not select.get('name'):
+        return None
+
+    fields = {}
+    for field in form.find_all("input"):
+        if field.get('name') and field.get('type') not in ("submit", "button", "checkbox", "radio"):
+            fields[field['name']] = field.get('value', "")
+
+    option = next((o for o in select.find_all("option") if o.get_text(strip=True) == site['committee']), None)
+    date_input = form.find(id="from")
+    if not option or not date_input or not date_input.get('name'):
+        return None
+    fields[select['name']] = option.get('value', option.get_text(strip=True))
+    fields[date_input['name']] = site['start_date']
+
+    method = (form.get('method') or "get").upper()
+    return method, urljoin(site['start_url'], form.get('action') or site['start_url']), fields
+
+
+def parse_file_button(html, base_url):
+    """The /meeting/files/{id}/{name} URL behind the download button of a meeting page."""
+    soup = BeautifulSoup(html, 'html.parser')
+    for button in soup.find_all("button", attrs={"data-id": True}):
+        if "download" in (button.get("onclick") or "") and button.get("data-name"):
+            return f"{base_url}/meeting/files/{button['data-id']}/{button['data-name']}", button['data-name']
+    return None, None
+
+
+def find_server_paging(html, base_url):
+    """
+    How the #resultTable of a search response gets its rows: None if they are all in the
+    HTML (client-side DataTables), else the ajax URL DataTables pages through server-side
+    ("" when the table is server-side but the URL cannot be read from the page).
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    table = soup.find(id="resultTable")
+    if table and (table.get("data-server-side") == "true" or table.get("data-ajax")):
+        return urljoin(base_url, table["data-ajax"]) if table.get("data-ajax") else ""
+
+    for script in soup.find_all("script"):
+        code = script.string or ""
+        if "resultTable" not in code or not re.search(r"\b(serverSide|bServerSide)[\"']?\s*:\s*true", code):
+            continue
+        ajax = re.search(r"\b(?:sAjaxSource|ajax)[\"']?\s*:\s*(?:\{[^}]*?\burl[\"']?\s*:\s*)?[\"']([^\"']+)[\"']", code)
+        return urljoin(base_url, ajax.group(1)) if ajax else ""
+    return None
+
+
+def rows_as_table(rows):
+    """DataTables JSON rows (lists of cell HTML) as a #resultTable, for parse_result_rows."""
+    cells = lambda row: "".join(f"<td>{cell}</td>" for cell in row)
+    body = "".join(f"<tr>{cells(row)}</tr>" for row in rows)
+    return f'<table id="resultTable"><tbody>{body}</tbody></table>'
+
+
+# --- STEP 1: SEARCH ---
+async def fetch_server_pages(http, site, ajax_url, fields):
+    """
+    Pages through a server-side DataTables source. Returns every meeting, or None when the
+    rows cannot be read or do not add up to the total the server reports.
+    """
+    meetings = []
+    row_count = 0
+    total = None
+    for draw in itertools.count(1):
+        params = dict(fields, draw=draw, start=row_count, length=DATATABLES_PAGE_LENGTH)
+        data = json.loads(await http.get_text(ajax_url, params=params))
+        rows = data.get("data", data.get("aaData")) or []
+        total = data.get("recordsFiltered", data.get("iTotalDisplayRecords", total))
+        # Object rows need the page's column config to map; leave those to the browser
+        if any(not isinstance(row, list) for row in rows):
+            return None
+        meetings += parse_result_rows(rows_as_table(rows), site['base_url'])
+        row_count += len(rows)
+        if not rows or total is None or row_count >= int(total):
+            break
+
+    if total is None or row_count != int(total):
+        print(f"   > [{site['name']}] Server paging returned {row_count} rows, expected {total}.")
+        return None
+    return meetings
+
+
+async def search_over_http(http, site):
+    """
+    The search without a browser. Returns the meetings, or None when only a browser can
+    get them (no search form in the served page, or a result table we cannot page).
+    """
+    html = await http.get_text(site['start_url'])
+    request = build_search_request(html, site)
+    # No form in the served HTML: the site renders client-side, meeting pages included
+    site['client_rendered'] = request is None
+    if not request:
+        return None
+
+    method, url, fields = request
+    if method == "POST":
+        result_html = await http.post_text(url, data=fields)
+    else:
+        result_html = await http.get_text(url, params=fields)
+
+    ajax_url = find_server_paging(result_html, url)
+    if ajax_url is None:
+        # Client-side DataTables: the response already holds every row
+        return parse_result_rows(result_html, site['base_url'])
+    if not ajax_url:
+        print(f"   > [{site['name']}] Results are paged server-side from an unknown source.")
+        return None
+    return await fetch_server_pages(http, site, ajax_url, fields)
+
+
+# Reads the whole table in one script call (all DataTables pages at once when the API is there)
+ALL_ROWS_JS = """
+var done = arguments[arguments.length - 1];
+var $ = window.jQuery;
+if ($ && $.fn.dataTable && $.fn.dataTable.isDataTable('#resultTable')) {
+    var table = $('#resultTable').DataTable();
+    table.one('draw', function () { done(document.getElementById('resultTable').outerHTML); });
+    table.page.len(-1).draw();
+    setTimeout(function () { done(document.getElementById('resultTable').outerHTML); }, 10000);
+} else {
+    done(null);
+}
+"""
+
+
+def search_with_browser(site):
+    """Fallback: the old Selenium search, but rows are read in bulk instead of cell by cell."""
+    import browser_pool
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait, Select
+    from selenium.webdriver.support import expected_conditions as EC
+
+    driver = browser_pool.create_driver()
+    if not driver:
+        return []
+
+    try:
+        driver.get(site['start_url'])
+        wait = WebDriverWait(driver, 10)
+        Select(wait.until(EC.presence_of_element_located((By.ID, "searchSelect")))).select_by_visible_text(site['committee'])
+
+        date_input = driver.find_element(By.ID, "from")
+        date_input.clear()
+        date_input.send_keys(site['start_date'])
+        driver.find_element(By.TAG_NAME, "body").click()
+        driver.find_element(By.ID, "searchButton").click()
+        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#resultTable tbody tr")))
+
+        driver.set_script_timeout(15)
+        table_html = driver.execute_async_script(ALL_ROWS_JS)
+        if table_html:
+            return parse_result_rows(table_html, site['base_url'])
+
+        # No DataTables API: one page_source parse per page instead of one call per cell
+        meetings = []
+        while True:
+            meetings += parse_result_rows(driver.page_source, site['base_url'])
+            next_li = driver.find_elements(By.ID, "resultTable_next")
+            if not next_li or "disabled" in (next_li[0].get_attribute("class") or ""):
+                break
+            first_row = driver.find_element(By.CSS_SELECTOR, "#resultTable tbody tr")
+            driver.execute_script("arguments[0].click();", next_li[0].find_element(By.TAG_NAME, "a"))
+            WebDriverWait(driver, 10).until(EC.staleness_of(first_row))
+        return meetings
+    finally:
+        driver.quit()
+
+
+async def get_meeting_links(http, site):
+    print(f"--- [{site['name']}] Searching '{site['committee']}' from {site['start_date']} ---")
+    try:
+        meetings = await search_over_http(http, site)
+    except Exception as e:
+        print(f"   > [{site['name']}] HTTP search failed: {e}")
+        meetings = None
+
+    # An empty list is a search without results; only None needs the browser
+    if meetings is None:
+        print(f"   > [{site['name']}] Results not readable over HTTP. Searching in a browser...")
+        try:
+            meetings = await asyncio.to_thread(search_with_browser, site)
+        except Exception as e:
+            print(f"Error during search: {e}")
+            meetings = []
+
+    # Deduplicate, keep table order
+    unique = list({m['url']: m for m in meetings}.values())
+    print(f"   > [{site['name']}] Found {len(unique)} total meetings.")
+    return unique
+
+
+# --- STEP 2: DOWNLOAD ---
+# Only used for meeting pages of sites that render client-side
+BROWSER = browser_fallback.BrowserFallback()
+
+
+async def get_meeting_page(http, site, meeting):
+    if site.get('client_rendered'):
+        return await asyncio.to_thread(BROWSER.html, meeting['url'], "button[data-id]")
+    return await http.get_text(meeting['url'])
+
+
+def is_already_stored(site, meeting):
+    filename_base = f"{meeting['date_str']}_{site['name']}_oekonomiudvalget"
+    # Sites that publish Word files may have stored either extension
+    extensions = (".pdf", ".docx") if site['convert_docx'] else (".pdf",)
+
+    # Finished by an earlier run: no page visit, no storage check
+    if run_ledger.is_done(site['name'], meeting['url']):
+        return True
+
+    if IS_RENDER:
+        for ext in extensions:
+            if scraper_utils.object_exists(site['bucket'], f"{filename_base}{ext}"):
+                print(f"Skipping {filename_base}{ext} (Already in Wasabi)")
+                run_ledger.record(site['name'], meeting['url'], f"{filename_base}{ext}", site['bucket'])
+                return True
+        return False
+    return any(os.path.exists(os.path.join(site['download_dir'], f"{filename_base}{ext}")) for ext in extensions)
+
+
+async def store_document(site, meeting, final_path, final_filename):
+    """Stores a file on disk: uploaded (then removed) on Render, kept locally otherwise. Used for converted Word files."""
+    # --- UPLOAD IF ON RENDER ---
+    if IS_RENDER:
+        if await asyncio.to_thread(scraper_utils.upload_to_wasabi, final_path, site['bucket'], final_filename):
+            run_ledger.record_file(site['name'], meeting['url'], final_path, site['bucket'])
+        if os.path.exists(final_path):
+            os.remove(final_path)
+    else:
+        run_ledger.record_file(site['name'], meeting['url'], final_path)
+        print(f"   > Saved {final_filename}.")
+
+
+def stream_document(site, meeting, chunks, filename_base):
+    """
+    Render: stores a downloaded document as it arrives. PDFs go straight into Wasabi
+    (no temp file); only Word files of convert_docx sites are written to disk, because
+    the converter needs a file. Returns 'stored', 'docx' (written for conversion) or False.
+    """
+    first_chunk = next(chunks, b"")
+    chunks = itertools.chain([first_chunk], chunks)
+
+    if site['convert_docx'] and not first_chunk.startswith(b"%PDF"):
+        docx_path = os.path.join(site['download_dir'], f"{filename_base}.docx")
+        tmp_path = docx_path + ".part"
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, docx_path)
+        return 'docx'
+
+    final_filename = f"{filename_base}.pdf"
+    stream = run_ledger.HashingStream(chunks)
+    result = scraper_utils.stream_to_wasabi(stream, site['bucket'], final_filename)
+    if result is True:
+        run_ledger.record(site['name'], meeting['url'], final_filename, site['bucket'],
+                          content_hash=stream.hexdigest(), size=stream.size)
+    elif result == "EXISTS":
+        run_ledger.record(site['name'], meeting['url'], final_filename, site['bucket'])
+    return 'stored' if result else False
+
+
+async def convert_and_store(site, meeting, docx_path, pdf_path):
+    filename_base = f"{meeting['date_str']}_{site['name']}_oekonomiudvalget"
+    # --- CONVERSION ---
+    if await docx_converter.convert_docx_to_pdf(docx_path, pdf_path):
+        os.remove(docx_path)
+        await store_document(site, meeting, pdf_path, f"{filename_base}.pdf")
+    else:
+        print("   > Keeping original DOCX due to conversion failure.")
+        await store_document(site, meeting, docx_path, f"{filename_base}.docx")
+
+
+async def download_document(http, site, meeting, conversions):
+    """
+    Downloads one meeting's document. Word files that need converting are handed to the
+    converter pool as a task in `conversions`, so the next downloads do not wait for them.
+    """
+    filename_base = f"{meeting['date_str']}_{site['name']}_oekonomiudvalget"
+
+    doc_url, file_name = parse_file_button(await get_meeting_page(http, site, meeting), site['base_url'])
+    if not doc_url:
+        # Nothing published for this meeting yet
+        print(f"   > Skipped: no document yet on {meeting['url']}")
+        return False
+
+    # Determine extension (only sites flagged convert_docx keep Word files apart)
+    final_filename = f"{filename_base}.pdf"
+    final_path = os.path.join(site['download_dir'], final_filename)
+    docx_path = os.path.join(site['download_dir'], f"{filename_base}.docx")
+    print(f"   > Downloading {file_name} for {meeting['date_str']}...")
+
+    # --- STREAM TO WASABI IF ON RENDER ---
+    if IS_RENDER:
+        result = await http.stream(doc_url, lambda chunks: stream_document(site, meeting, chunks, filename_base))
+        if result == 'docx':
+            conversions.append(asyncio.create_task(convert_and_store(site, meeting, docx_path, final_path)))
+        return bool(result)
+
+    await http.download(doc_url, final_path)
+
+    if site['convert_docx']:
+        with open(final_path, 'rb') as f:
+            is_pdf = f.read(4) == b"%PDF"
+        if not is_pdf:
+            os.replace(final_path, docx_path)
+            conversions.append(asyncio.create_task(convert_and_store(site, meeting, docx_path, final_path)))
+            return True
+
+    await store_document(site, meeting, final_path, final_filename)
+    return True
+
+
+async def process_site(http, site, download_limit):
+    os.makedirs(site['download_dir'], exist_ok=True)
+    meetings = await get_meeting_links(http, site)
+
+    # Cheap filters first (date, ledger, storage), then fetch files concurrently
+    processed_count = 0
+    pending = []
+    for meeting in meetings:
+        # --- DATE FILTERING ---
+        if meeting['date_obj'] and not scraper_utils.should_scrape(meeting['date_obj']):
+            continue
+        if await asyncio.to_thread(is_already_stored, site, meeting):
+            processed_count += 1  # Count as processed
+            continue
+        pending.append(meeting)
+
+    print(f"\n--- [{site['name']}] Downloading {len(pending)} Documents ---")
+    conversions = []
+    while pending:
+        if download_limit and processed_count >= download_limit:
+            print(f"[{site['name']}] Reached download limit ({download_limit}). Stopping.")
+            break
+
+        window_size = FILE_CONCURRENCY
+        if download_limit:
+            window_size = min(window_size, download_limit - processed_count)
+        window, pending = pending[:window_size], pending[window_size:]
+
+        results = await http.gather([download_document(http, site, m, conversions) for m in window])
+        for meeting, result in zip(window, results):
+            if isinstance(result, Exception):
+                print(f"   > Error ({meeting['url']}): {result}")
+            elif result:
+                processed_count += 1
+
+    if conversions:
+        print(f"   > [{site['name']}] Waiting for {len(conversions)} DOCX conversions...")
+        for result in await asyncio.gather(*conversions, return_exceptions=True):
+            if isinstance(result, Exception):
+                print(f"   > Conversion/upload error: {result}")
+
+    print(f"--- {site['name'].capitalize()} Scrape Complete! ---")
+
+
+async def process_all(sites, download_limit):
+    async with http_engine.HttpEngine(headers=HEADERS) as http:
+        async def run_site(site):
+            try:
+                await process_site(http, site, download_limit)
+            except Exception as e:
+                print(f"Critical error for {site['name']}: {e}")
+
+        await asyncio.gather(*(run_site(s) for s in sites))
+
+
+# --- MAIN ---
+def run_scraper():
+    if IS_RENDER:
+        print(f"--- RUNNING ON RENDER (CLOUD MODE) ---")
+    else:
+        print(f"--- RUNNING LOCALLY ---")
+
+    sites = selected_sites()
+    print(f"--- aabendagsorden: {', '.join(s['name'] for s in sites) or 'no sites selected'} ---")
+    try:
+        http_engine.run(process_all(sites, scraper_utils.get_download_limit()))
+    finally:
+        BROWSER.close()
+        docx_converter.shutdown()
+
+
+if __name__ == "__main__":
+    run_scraper()
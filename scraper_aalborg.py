@@ -1,23 +1,21 @@
 import os
-import time
 import re
 import html as html_parser
-import requests
-import json
+import asyncio
 import datetime
 from urllib.parse import unquote
 
 # --- UTILS ---
 import scraper_utils
+import http_engine
+import run_ledger
+import browser_pool
+import dom_extract
+import page_waits
 
 # --- LIBRARIES ---
 try:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.service import Service
-    from selenium.webdriver.chrome.options import Options
     from selenium.webdriver.common.by import By
-    from selenium.webdriver.support.ui import WebDriverWait
-    from selenium.webdriver.support import expected_conditions as EC
 except ImportError:
     print("Error: Selenium not installed. Run: pip install selenium")
     exit()
@@ -29,6 +27,9 @@ BASE_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 }
 WASABI_BUCKET = "raw-files-aalborg"
+LEDGER_NAME = "aalborg"
+# How many meeting pages are fetched at the same time
+PAGE_CONCURRENCY = 8
 
 if IS_RENDER:
     DOWNLOAD_DIR = "/tmp"
@@ -39,64 +40,20 @@ else:
 
 
 def get_driver():
-    chrome_options = Options()
-    
-    # 1. BASIC STABILITY OPTIONS
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--remote-debugging-port=9222")
-    
-    # 2. RENDER SPECIFIC
-    if IS_RENDER:
-        chrome_options.add_argument("--headless=new")
-        chrome_options.binary_location = "/usr/bin/chromium"
-    else:
-        chrome_options.add_argument("--headless=new")
-
-    # 3. PRINTING PREFS
-    settings = {
-        "recentDestinations": [{"id": "Save as PDF", "origin": "local", "account": ""}],
-        "selectedDestinationId": "Save as PDF",
-        "version": 2
-    }
-    prefs = {
-        'printing.print_preview_sticky_settings.appState': json.dumps(settings),
-        'savefile.default_directory': DOWNLOAD_DIR
-    }
-    chrome_options.add_experimental_option('prefs', prefs)
-    
-    if IS_RENDER:
-        print(f"   Binary: /usr/bin/chromium")
-
-    driver_path = os.path.join(os.getcwd(), 'chromedriver.exe')
-    if not IS_RENDER and not os.path.exists(driver_path):
-        driver_path = 'chromedriver'
-        
-    service = Service(executable_path=driver_path) if not IS_RENDER else None
-    
-    if service:
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-    else:
-        driver = webdriver.Chrome(options=chrome_options)
-        
-    return driver
+    return browser_pool.create_driver(print_dir=DOWNLOAD_DIR)
 
 
 def get_aalborg_meeting_links(driver):
     print(f"--- Step 1: Finding Meeting Pages on {START_URL} ---")
     driver.get(START_URL)
-    time.sleep(3)
+    page_waits.wait_for_network_idle(driver)
 
-    # 1. Cookie Banner
+    # 1. Cookie Banner (loaded by now if the site shows one)
     try:
-        cookie_btn = WebDriverWait(driver, 5).until(
-            EC.element_to_be_clickable(
-                (By.XPATH, "//*[contains(text(), 'Tillad alle') or contains(text(), 'Accepter')]"))
-        )
-        cookie_btn.click()
-        time.sleep(1)
+        cookie_btns = driver.find_elements(By.XPATH, "//*[contains(text(), 'Tillad alle') or contains(text(), 'Accepter')]")
+        if cookie_btns:
+            cookie_btns[0].click()
+            page_waits.wait_for_dom_quiet(driver)
     except:
         pass
 
@@ -109,31 +66,43 @@ def get_aalborg_meeting_links(driver):
                 item.setAttribute('expanded', '');
             });
         """)
-        time.sleep(2)
+        # Done once the expanded lists stop growing
+        page_waits.wait_for_count_stable(driver, "a[href*='moedetitel=']")
     except Exception as e:
         print(f"   > JS Expansion error: {e}")
 
     # 3. Scrape Meeting Links
     print("   > Scraping links...")
     # Find all links containing 'moedetitel='
-    links = driver.find_elements(By.CSS_SELECTOR, "a[href*='moedetitel=']")
-
-    meeting_urls = set()
-    for link in links:
-        href = link.get_attribute('href')
-        if href:
-            meeting_urls.add(href)
+    # One script call for all hrefs instead of one get_attribute() per link
+    meeting_urls = set(dom_extract.hrefs(driver, "a[href*='moedetitel=']"))
 
     print(f"   > Found {len(meeting_urls)} unique meetings.")
     return list(meeting_urls)
 
 
-def download_pdf(session, meeting_url):
+def store_pdf(meeting_url, filename, chunks):
+    """Render: streams a PDF straight into Wasabi (no temp file). Runs in a worker thread."""
+    stream = run_ledger.HashingStream(chunks)
+    if scraper_utils.stream_to_wasabi(stream, WASABI_BUCKET, filename) is True:
+        run_ledger.record(LEDGER_NAME, meeting_url, filename, WASABI_BUCKET,
+                          content_hash=stream.hexdigest(), size=stream.size)
+
+
+def is_already_stored(meeting_url, filename):
+    # --- CHECK IF EXISTS (Cloud or Local) ---
+    if IS_RENDER:
+        if scraper_utils.object_exists(WASABI_BUCKET, filename):
+            print(f"Skipping {filename} (Already in Wasabi)")
+            run_ledger.record(LEDGER_NAME, meeting_url, filename, WASABI_BUCKET)
+            return True
+        return False
+    return os.path.exists(os.path.join(DOWNLOAD_DIR, filename))
+
+
+async def download_pdf(http, meeting_url, page_html):
+    """page_html: the meeting page, fetched in the same window by process_links()."""
     try:
-        # 1. Get page content using requests (faster)
-        response = session.get(meeting_url)
-        response.raise_for_status()
-        page_html = response.text
 
         # 2. Find the PDF Link using Regex
         match = re.search(r"window\.open\('([^']+)'\)", page_html)
@@ -178,38 +147,17 @@ def download_pdf(session, meeting_url):
              # print(f"Skipping {filename} (Filtered by Date)")
              return False
 
-        local_path = os.path.join(DOWNLOAD_DIR, filename)
+        if await asyncio.to_thread(is_already_stored, meeting_url, filename):
+            return True # Count as processed
 
-        # --- CHECK IF EXISTS (Cloud or Local) ---
-        if IS_RENDER:
-            s3 = scraper_utils.get_s3_client()
-            if s3:
-                try:
-                    s3.head_object(Bucket=WASABI_BUCKET, Key=filename)
-                    print(f"Skipping {filename} (Already in Wasabi)")
-                    return True # Count as processed
-                except:
-                    pass
-        elif os.path.exists(local_path):
-             # print(f"Skipping (Exists): {filename}")
-             return True
-
-        # 5. Download
+        # 5. Download (over the shared aiohttp session, so the other downloads keep running)
         print(f"Downloading: {filename}")
-        pdf_resp = session.get(pdf_url, stream=True)
-        pdf_resp.raise_for_status()
-
-        with open(local_path, 'wb') as f:
-            for chunk in pdf_resp.iter_content(chunk_size=8192):
-                f.write(chunk)
-                
-        # --- UPLOAD IF ON RENDER ---
         if IS_RENDER:
-            scraper_utils.upload_to_wasabi(local_path, WASABI_BUCKET, filename)
-            if os.path.exists(local_path):
-                os.remove(local_path)
+            await http.stream(pdf_url, lambda chunks: store_pdf(meeting_url, filename, chunks))
         else:
-            print("   > Saved locally.")
+            local_path = await http.download(pdf_url, os.path.join(DOWNLOAD_DIR, filename))
+            run_ledger.record_file(LEDGER_NAME, meeting_url, local_path)
+            print(f"   > Saved {filename} locally.")
             
         return True
 
@@ -218,6 +166,49 @@ def download_pdf(session, meeting_url):
         return False
 
 
+async def fetch_and_download(http, number, total, meeting_url):
+    try:
+        page_html = await http.get_text(meeting_url)
+    except Exception as e:
+        print(f"[{number}/{total}] Error downloading from {meeting_url}: {e}")
+        return False
+    return await download_pdf(http, meeting_url, page_html)
+
+
+async def process_links(links, download_limit):
+    """Fetches meeting pages and downloads their PDFs a window at a time, concurrently."""
+    processed_count = 0
+    # Meetings finished by earlier runs are skipped without fetching their page
+    done = run_ledger.done_urls(LEDGER_NAME)
+    async with http_engine.HttpEngine(headers=BASE_HEADERS) as http:
+        position = 0
+        while position < len(links):
+            if download_limit and processed_count >= download_limit:
+                print(f"Reached download limit ({download_limit}). Stopping.")
+                return
+
+            # Ledger hits count straight away; only pages that must be fetched fill the window,
+            # and never more of them than the download limit can still use
+            window = []
+            while position < len(links) and len(window) < PAGE_CONCURRENCY:
+                if download_limit and len(window) >= download_limit - processed_count:
+                    break
+                link = links[position]
+                position += 1
+                if link in done:
+                    print(f"[{position}/{len(links)}] Skipping (already in run ledger)")
+                    processed_count += 1  # Count as processed
+                    continue
+                window.append((position, link))
+
+            results = await http.gather([fetch_and_download(http, n, len(links), link) for n, link in window])
+            for (_, link), result in zip(window, results):
+                if isinstance(result, Exception):
+                    print(f"Error downloading from {link}: {result}")
+                elif result:
+                    processed_count += 1
+
+
 def run_aalborg_scrape():
     os.makedirs(DOWNLOAD_DIR, exist_ok=True)
 
@@ -229,28 +220,17 @@ def run_aalborg_scrape():
         links = get_aalborg_meeting_links(driver)
     finally:
         driver.quit()
+        page_waits.print_stats()
 
     if not links:
         print("No links found.")
         return
 
     # 2. Download Files
-    session = requests.Session()
-    session.headers.update(BASE_HEADERS)
-
     print(f"\n--- Step 2: Downloading {len(links)} PDFs ---")
     
     download_limit = scraper_utils.get_download_limit()
-    processed_count = 0
-    
-    for i, link in enumerate(links):
-        if download_limit and processed_count >= download_limit:
-            print(f"Reached download limit ({download_limit}). Stopping.")
-            break
-            
-        print(f"[{i + 1}/{len(links)}]", end=" ")
-        if download_pdf(session, link):
-            processed_count += 1
+    http_engine.run(process_links(links, download_limit))
 
     print("\n--- Aalborg Scrape Complete! ---")
 
@@ -1,19 +1,25 @@
 import os
 import re
+import shutil
+import asyncio
 import datetime
+import tempfile
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
-from weasyprint import HTML
 
 # --- UTILS ---
 import scraper_utils
+import http_engine
+import run_ledger
+import pdf_render
 
 # --- CONFIGURATION ---
 IS_RENDER = os.environ.get('RENDER') == 'true'
 BASE_DOMAIN = "https://www.kk.dk"
 BASE_PATH = "/dagsordener-og-referater/%C3%98konomiudvalget"
 WASABI_BUCKET = "raw-files-copenhagen"
+LEDGER_NAME = "copenhagen"
 
 if IS_RENDER:
     OUTPUT_DIR = "/tmp"
@@ -25,9 +31,24 @@ else:
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 }
-
-
-def get_all_meeting_urls():
+# How many meetings are fetched at the same time (their agenda items are fetched in parallel too)
+MEETING_CONCURRENCY = 4
+# Agenda items per rendered part; the parts render in parallel and are merged into the meeting PDF
+ITEMS_PER_PART = int(os.environ.get("KK_ITEMS_PER_PART", "5") or 5)
+
+STYLESHEET = """
+@page { size: A4; margin: 2cm; }
+body { font-family: sans-serif; font-size: 12px; line-height: 1.5; }
+h1 { color: #003366; border-bottom: 2px solid #003366; padding-bottom: 10px; }
+h2 { background-color: #eee; padding: 8px; border-left: 5px solid #003366; margin-top: 20px; page-break-after: avoid; }
+.meta { color: #666; margin-bottom: 30px; }
+.agenda-item { page-break-inside: avoid; margin-bottom: 30px; }
+img { max-width: 100%; height: auto; }
+"""
+
+
+def iter_meeting_pages():
+    """Yields the Referat meetings of one listing page at a time (newest first); the next page loads on demand."""
     start_date = "2022-01-01"
     end_date = datetime.date.today().strftime("%Y-%m-%d")
 
@@ -37,7 +58,6 @@ def get_all_meeting_urls():
         f"&agenda_meeting_date_value%5Bmax%5D={end_date}"
     )
 
-    all_meetings = []
     page_num = 1
 
     print(f"--- Step 1: Finding meetings from {start_date} to {end_date} ---")
@@ -50,7 +70,7 @@ def get_all_meeting_urls():
             soup = BeautifulSoup(response.text, 'html.parser')
 
             rows = soup.find_all("tr")
-            found_on_page = 0
+            page = []
 
             for row in rows:
                 # The meeting link is inside the 3rd column (views-field-nothing)
@@ -83,15 +103,15 @@ def get_all_meeting_urls():
 
                         # Only process Referats
                         if "referat" in href.lower():
-                            all_meetings.append({
+                            page.append({
                                 "url": full_url,
                                 "filename": f"{file_date}_kk_oekonomiudvalget.pdf",
                                 "date": file_date,
                                 "date_obj": date_obj
                             })
-                            found_on_page += 1
 
-            print(f"    Found {found_on_page} meetings.")
+            print(f"    Found {len(page)} meetings.")
+            yield page
 
             # Pagination
             next_li = soup.find("li", class_="pager__item--next")
@@ -106,17 +126,20 @@ def get_all_meeting_urls():
             print(f"Error scraping page {page_num}: {e}")
             break
 
-    return all_meetings
+
+def get_all_meeting_urls():
+    # In SCRAPE_MODE=NEW the listing stops at the first old/already stored meetings
+    pages = iter_meeting_pages()
+    return list(scraper_utils.iter_listing(pages, lambda m: m['date_obj'], is_stored=lambda m: is_already_stored(m, quiet=True)))
 
 
-def get_agenda_items(meeting_url):
+async def get_agenda_items(http, meeting_url):
     """
     Visits a meeting page and gets the links for every agenda point.
     Robust strategy: Finds ANY row that contains a 'item-number' cell.
     """
     try:
-        response = requests.get(meeting_url, headers=HEADERS)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = BeautifulSoup(await http.get_text(meeting_url), 'html.parser')
         items = []
 
         # Find ALL table rows on the page
@@ -157,10 +180,9 @@ def get_agenda_items(meeting_url):
         return []
 
 
-def scrape_item_content(item_url):
+async def scrape_item_content(http, item_url):
     try:
-        response = requests.get(item_url, headers=HEADERS)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = BeautifulSoup(await http.get_text(item_url), 'html.parser')
 
         content_div = soup.find("div", class_="node__content")
         if not content_div:
@@ -172,109 +194,171 @@ def scrape_item_content(item_url):
         for appendix in content_div.find_all("div", class_="agenda-element-appendix"): appendix.decompose()
 
         return str(content_div)
-    except:
+    except Exception:
         return ""
 
 
-def create_meeting_pdf(meeting, agenda_items):
+async def fetch_item_contents(http, agenda_items):
+    """Fetches the HTML of every agenda item of a meeting at once (kept in agenda order)."""
+    results = await http.gather([scrape_item_content(http, item['url']) for item in agenda_items])
+    return [r if isinstance(r, str) else "" for r in results]
+
+
+def is_already_stored(meeting, quiet=False):
+    """Checks Wasabi (on Render) or the output folder before we fetch anything."""
     filename = meeting['filename']
     output_path = os.path.join(OUTPUT_DIR, filename)
-    
+
+    # Finished by an earlier run: no storage check
+    if run_ledger.is_done(LEDGER_NAME, meeting['url']):
+        return True
+
     # --- CHECK IF EXISTS (Cloud or Local) ---
     if IS_RENDER:
-        s3 = scraper_utils.get_s3_client()
-        if s3:
-            try:
-                s3.head_object(Bucket=WASABI_BUCKET, Key=filename)
+        if scraper_utils.object_exists(WASABI_BUCKET, filename):
+            if not quiet:
                 print(f"Skipping {filename} (Already in Wasabi)")
-                return True # Count as processed
-            except:
-                pass
+            run_ledger.record(LEDGER_NAME, meeting['url'], filename, WASABI_BUCKET)
+            return True
     elif os.path.exists(output_path):
         # print(f"Skipping {filename} (Exists locally)")
         return True
+    return False
 
-    full_html = f"""
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <style>
-            @page {{ size: A4; margin: 2cm; }}
-            body {{ font-family: sans-serif; font-size: 12px; line-height: 1.5; }}
-            h1 {{ color: #003366; border-bottom: 2px solid #003366; padding-bottom: 10px; }}
-            h2 {{ background-color: #eee; padding: 8px; border-left: 5px solid #003366; margin-top: 20px; page-break-after: avoid; }}
-            .meta {{ color: #666; margin-bottom: 30px; }}
-            .agenda-item {{ page-break-inside: avoid; margin-bottom: 30px; }}
-            img {{ max-width: 100%; height: auto; }}
-        </style>
-    </head>
-    <body>
+
+def build_part_html(meeting, items, contents, first):
+    """One part of the meeting PDF: a group of agenda items (the first part also carries the heading)."""
+    parts = ['<html><head><meta charset="utf-8"></head><body>']
+    if first:
+        parts.append(f"""
         <h1>Referat: Økonomiudvalget</h1>
         <div class="meta">
             <strong>Dato:</strong> {meeting['date']}<br>
             <strong>Original Link:</strong> <a href="{meeting['url']}">{meeting['url']}</a>
         </div>
-    """
-
-    print(f"    > Scraping {len(agenda_items)} items for {filename}...")
-
-    for item in agenda_items:
-        html_content = scrape_item_content(item['url'])
-        full_html += f"""
+        """)
+    for item, html_content in zip(items, contents):
+        parts.append(f"""
         <div class="agenda-item">
             <h2>Punkt {item['number']}: {item['title']}</h2>
             <div>{html_content}</div>
         </div>
-        """
+        """)
+    parts.append("</body></html>")
+    return "".join(parts)
+
 
-    full_html += "</body></html>"
+async def create_meeting_pdf(meeting, agenda_items, item_contents):
+    """
+    Renders the agenda items in groups of ITEMS_PER_PART, each group in its own worker
+    process, and merges the parts in order. No single huge HTML document or layout.
+    """
+    filename = meeting['filename']
+    output_path = os.path.join(OUTPUT_DIR, filename)
+    parts_dir = tempfile.mkdtemp(prefix="kk_parts_", dir=OUTPUT_DIR)
 
     try:
-        HTML(string=full_html).write_pdf(output_path)
-        
+        renders = []
+        for n, start in enumerate(range(0, len(agenda_items), ITEMS_PER_PART)):
+            part_html = build_part_html(
+                meeting, agenda_items[start:start + ITEMS_PER_PART],
+                item_contents[start:start + ITEMS_PER_PART], first=(n == 0)
+            )
+            part_path = os.path.join(parts_dir, f"{n:04d}.pdf")
+            renders.append(pdf_render.render_html(part_html, part_path, STYLESHEET))
+        part_paths = await asyncio.gather(*renders)
+        await asyncio.to_thread(pdf_render.merge_pdfs, part_paths, output_path)
+
         # --- UPLOAD IF ON RENDER ---
         if IS_RENDER:
-            scraper_utils.upload_to_wasabi(output_path, WASABI_BUCKET, filename)
+            if await asyncio.to_thread(scraper_utils.upload_to_wasabi, output_path, WASABI_BUCKET, filename):
+                run_ledger.record_file(LEDGER_NAME, meeting['url'], output_path, WASABI_BUCKET)
             if os.path.exists(output_path):
                 os.remove(output_path)
         else:
+            run_ledger.record_file(LEDGER_NAME, meeting['url'], output_path)
             print(f"    > Saved: {filename}")
             
         return True
     except Exception as e:
         print(f"    ! Error generating PDF: {e}")
         return False
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
 
 
-def run_scraper():
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+async def fetch_meeting(http, meeting):
+    """Returns (agenda_items, item_contents) for one meeting, all items fetched concurrently."""
+    agenda_items = await get_agenda_items(http, meeting['url'])
+    if not agenda_items:
+        return [], []
+    print(f"    > Scraping {len(agenda_items)} items for {meeting['filename']}...")
+    return agenda_items, await fetch_item_contents(http, agenda_items)
 
-    # 1. Get ALL meetings
-    meetings = get_all_meeting_urls()
-    
-    # 2. Process
-    download_limit = scraper_utils.get_download_limit()
-    processed_count = 0
 
+async def process_meetings(meetings, download_limit):
+    # 1. Cheap filtering first: date filter and existing files cost no requests
+    candidates = []
     for i, meeting in enumerate(meetings):
-        if download_limit and processed_count >= download_limit:
-            print(f"Reached download limit ({download_limit}). Stopping.")
-            break
-            
         date_obj = meeting.get('date_obj')
         # --- DATE FILTERING ---
         if date_obj and not scraper_utils.should_scrape(date_obj):
              # print(f"Skipping {meeting['filename']} (Filtered by Date)")
              continue
+        candidates.append((i, meeting))
+
+    # 2. Fetch a window of meetings concurrently, then render them in order
+    processed_count = 0
+    async with http_engine.HttpEngine(headers=HEADERS) as http:
+        while candidates:
+            if download_limit and processed_count >= download_limit:
+                print(f"Reached download limit ({download_limit}). Stopping.")
+                break
+
+            window = []
+            while candidates and len(window) < MEETING_CONCURRENCY:
+                if download_limit and processed_count + len(window) >= download_limit:
+                    break
+                i, meeting = candidates.pop(0)
+                if is_already_stored(meeting):
+                    processed_count += 1  # Count as processed
+                    continue
+                window.append((i, meeting))
+
+            if not window:
+                continue
+
+            fetched = await http.gather([fetch_meeting(http, meeting) for _, meeting in window])
+
+            # Render every meeting of the window at once; their parts share the worker pool
+            renders = []
+            for (i, meeting), result in zip(window, fetched):
+                print(f"[{i + 1}/{len(meetings)}] Processing {meeting['date']}...")
+                if isinstance(result, Exception):
+                    print(f"    ! Error fetching meeting: {result}")
+                    continue
+
+                agenda_items, item_contents = result
+                if agenda_items:
+                    renders.append(create_meeting_pdf(meeting, agenda_items, item_contents))
+                else:
+                    print("    > No agenda items found.")
+
+            processed_count += sum(1 for ok in await asyncio.gather(*renders) if ok)
 
-        print(f"[{i + 1}/{len(meetings)}] Processing {meeting['date']}...")
 
-        agenda_items = get_agenda_items(meeting['url'])
-        if agenda_items:
-            if create_meeting_pdf(meeting, agenda_items):
-                processed_count += 1
-        else:
-            print("    > No agenda items found.")
+def run_scraper():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    # 1. Get ALL meetings
+    meetings = get_all_meeting_urls()
+    
+    # 2. Process (several meetings and all their agenda items in parallel)
+    download_limit = scraper_utils.get_download_limit()
+    try:
+        http_engine.run(process_meetings(meetings, download_limit))
+    finally:
+        pdf_render.shutdown()
 
     print("--- Copenhagen Scrape Complete ---")
 
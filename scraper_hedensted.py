@@ -1,17 +1,17 @@
 import os
-import time
 import re
 import datetime
-from glob import glob
 
 # --- UTILS ---
 import scraper_utils
+import browser_pool
+import download_tracker
+import dom_extract
+import page_waits
+import run_ledger
 
 # --- LIBRARIES ---
 try:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.service import Service
-    from selenium.webdriver.chrome.options import Options
     from selenium.webdriver.common.by import By
     from selenium.webdriver.support.ui import WebDriverWait
     from selenium.webdriver.support import expected_conditions as EC
@@ -26,6 +26,7 @@ DOWNLOAD_DIR = os.path.abspath('raw_files_hedensted')
 START_URL = "https://www.hedensted.dk/politik-og-indflydelse/kommunalbestyrelse-og-udvalg/dagsordener-og-referater/oekonomiudvalget-dagsordener-og-referater#agenda7560"
 BASE_URL = "https://www.hedensted.dk"
 WASABI_BUCKET = "raw-files-hedensted"
+LEDGER_NAME = "hedensted"
 
 if IS_RENDER:
     DOWNLOAD_DIR = "/tmp"
@@ -37,46 +38,14 @@ else:
 
 # --- SETUP SELENIUM ---
 def get_driver():
-    chrome_options = Options()
-    
-    # 1. BASIC STABILITY OPTIONS
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--remote-debugging-port=9222")
-    
-    # 2. RENDER SPECIFIC
-    if IS_RENDER:
-        chrome_options.add_argument("--headless=new")
-        chrome_options.binary_location = "/usr/bin/chromium"
-    else:
-        chrome_options.add_argument("--headless=new")
-
-    prefs = {
-        "download.default_directory": DOWNLOAD_DIR,
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "plugins.always_open_pdf_externally": True
-    }
-    chrome_options.add_experimental_option("prefs", prefs)
-
-    if IS_RENDER:
-        print(f"   Binary: /usr/bin/chromium")
-
-    try:
-        driver = webdriver.Chrome(options=chrome_options)
-        return driver
-    except Exception as e:
-        print(f"Error starting Chrome: {e}")
-        return None
+    return browser_pool.create_driver(download_dir=DOWNLOAD_DIR)
 
 
 # --- STEP 1: FIND MEETING LINKS ---
 def get_meeting_links(driver):
     print(f"--- Step 1: Scraping Meeting List ---")
     driver.get(START_URL)
-    time.sleep(2)  # Wait for initial load
+    page_waits.wait_for_network_idle(driver)  # Wait for initial load (accordion scripts)
 
     # 1. FORCE OPEN THE ACCORDION
     try:
@@ -89,7 +58,7 @@ def get_meeting_links(driver):
         if is_expanded != "true":
             print("   > Accordion is closed. Clicking to open...")
             driver.execute_script("arguments[0].click();", header_btn)
-            time.sleep(2)  # Wait for list to render
+            page_waits.wait_for_count_stable(driver, "#agenda7560 .list__links a.list__link")  # Wait for list to render
         else:
             print("   > Accordion is already open.")
 
@@ -100,16 +69,15 @@ def get_meeting_links(driver):
     try:
         links_selector = "#agenda7560 .list__links a.list__link"
         wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, links_selector)))
-        link_elements = driver.find_elements(By.CSS_SELECTOR, links_selector)
+        # Every href in one script call instead of one get_attribute() per link
+        link_hrefs = dom_extract.hrefs(driver, links_selector)
     except TimeoutException:
         print("Error: No links found inside #agenda7560.")
         return []
 
     meetings = []
 
-    for el in link_elements:
-        href = el.get_attribute('href')
-        if not href: continue
+    for href in link_hrefs:
 
         # Extract date from URL
         # Pattern: .../dagsorden/Oekonomiudvalget_2022/10-11-2025...
@@ -151,16 +119,16 @@ def download_pdf(driver, meeting):
     filename = f"{date_str}_hedensted_oekonomiudvalget.pdf"
     local_path = os.path.join(DOWNLOAD_DIR, filename)
 
+    # Finished by an earlier run: no page visit, no storage check
+    if run_ledger.is_done(LEDGER_NAME, meeting_url):
+        return True # Count as processed
+
     # --- CHECK IF EXISTS (Cloud or Local) ---
     if IS_RENDER:
-        s3 = scraper_utils.get_s3_client()
-        if s3:
-            try:
-                s3.head_object(Bucket=WASABI_BUCKET, Key=filename)
-                print(f"Skipping {filename} (Already in Wasabi)")
-                return True # Count as processed
-            except:
-                pass
+        if scraper_utils.object_exists(WASABI_BUCKET, filename):
+            print(f"Skipping {filename} (Already in Wasabi)")
+            run_ledger.record(LEDGER_NAME, meeting_url, filename, WASABI_BUCKET)
+            return True # Count as processed
     elif os.path.exists(local_path):
         # print(f"Skipping (Exists): {filename}")
         return True
@@ -181,36 +149,29 @@ def download_pdf(driver, meeting):
 
         print(f"Downloading: {filename} ...")
 
-        files_before = set(glob(os.path.join(DOWNLOAD_DIR, "*.pdf")))
+        # Chrome reports the finished file (CDP download events)
+        tracker = download_tracker.tracker_for(driver, DOWNLOAD_DIR)
+        token = tracker.expect()
 
         # downloads the file
         driver.get(pdf_url)
 
-        timeout = time.time() + 30
-        while time.time() < timeout:
-            files_now = set(glob(os.path.join(DOWNLOAD_DIR, "*.pdf")))
-            new_files = files_now - files_before
-
-            if new_files:
-                new_file = new_files.pop()
-                if not new_file.endswith(".crdownload"):
-                    time.sleep(1)
-                    # If local file exists, remove
-                    if os.path.exists(local_path):
-                        os.remove(local_path)
-                        
-                    os.rename(new_file, local_path)
-                    
-                    # --- UPLOAD IF ON RENDER ---
-                    if IS_RENDER:
-                        scraper_utils.upload_to_wasabi(local_path, WASABI_BUCKET, filename)
-                        if os.path.exists(local_path):
-                            os.remove(local_path)
-                    else:
-                        print("  > Success!")
-                        
-                    return True
-            time.sleep(0.5)
+        new_file = tracker.wait(token, url=pdf_url, timeout=30)
+        if new_file:
+            # Rename (overwrites an older local copy)
+            os.replace(new_file, local_path)
+
+            # --- UPLOAD IF ON RENDER ---
+            if IS_RENDER:
+                if scraper_utils.upload_to_wasabi(local_path, WASABI_BUCKET, filename):
+                    run_ledger.record_file(LEDGER_NAME, meeting_url, local_path, WASABI_BUCKET)
+                if os.path.exists(local_path):
+                    os.remove(local_path)
+            else:
+                run_ledger.record_file(LEDGER_NAME, meeting_url, local_path)
+                print("  > Success!")
+
+            return True
 
         print("  > Error: Timeout waiting for file.")
         return False
@@ -248,6 +209,7 @@ def run_hedensted_scraper():
                 
     finally:
         driver.quit()
+        page_waits.print_stats()
         print("\n--- Hedensted Scrape Complete! ---")
 
 
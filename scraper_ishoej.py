@@ -1,19 +1,17 @@
 import os
 import re
-import time
-import base64
-import json
 import platform
 import datetime
 import scraper_utils
+import browser_pool
+import page_waits
+import tab_renderer
+import run_ledger
 from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 
 # --- LIBRARIES ---
 try:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.service import Service
-    from selenium.webdriver.chrome.options import Options
     from selenium.webdriver.common.by import By
     from selenium.webdriver.support.ui import WebDriverWait
     from selenium.webdriver.support import expected_conditions as EC
@@ -24,7 +22,9 @@ except ImportError:
 # --- CONFIGURATION ---
 IS_RENDER = os.environ.get('RENDER') == 'true'
 START_URL = 'https://ishoj.dk/borger/demokrati/dagsordener-og-referater/'
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 WASABI_BUCKET = "raw-files-ishoej" 
+LEDGER_NAME = "ishoej"
 
 if IS_RENDER:
     DOWNLOAD_DIR = "/tmp"
@@ -36,47 +36,8 @@ else:
 
 # --- SETUP SELENIUM (FIXED) ---
 def get_driver():
-    chrome_options = Options()
-
-    # 1. BASIC STABILITY OPTIONS
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    
-    # 2. CRASH FIX: Remote Debugging Port
-    chrome_options.add_argument("--remote-debugging-port=9222")
-    
-    # 3. USER AGENT (Cloudflare Bypassing)
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-
-    # 4. RENDER SPECIFIC
-    if IS_RENDER:
-        chrome_options.add_argument("--headless=new")
-        chrome_options.binary_location = "/usr/bin/chromium"
-
-    # 5. PRINTING PREFS
-    settings = {
-        "recentDestinations": [{"id": "Save as PDF", "origin": "local", "account": ""}],
-        "selectedDestinationId": "Save as PDF",
-        "version": 2
-    }
-    prefs = {
-        'printing.print_preview_sticky_settings.appState': json.dumps(settings),
-        'savefile.default_directory': DOWNLOAD_DIR
-    }
-    chrome_options.add_experimental_option('prefs', prefs)
-
     print(f"Starting Chrome...")
-    if IS_RENDER:
-        print(f"   Binary: /usr/bin/chromium")
-
-    try:
-        driver = webdriver.Chrome(options=chrome_options)
-        return driver
-    except Exception as e:
-        print(f"Error starting Chrome: {e}")
-        return None
+    return browser_pool.create_driver(print_dir=DOWNLOAD_DIR, user_agent=USER_AGENT, headless=False, block_rules="ishoej")
 
 
 def get_meeting_links(driver):
@@ -84,16 +45,14 @@ def get_meeting_links(driver):
     driver.get(START_URL)
 
     # --- 1. WAIT FOR CLOUDFLARE TO CLEAR ---
-    print("Waiting 10s for Cloudflare/Page Load...")
-    time.sleep(10)
+    # Same 30 s budget as the old 10 s + 20 s sleeps, but done as soon as the real page is there
+    print("Waiting for Cloudflare/Page Load...")
+    if not page_waits.wait_for_no_challenge(driver, timeout=30):
+        print("!!! Cloudflare challenge did not clear in 30 seconds.")
+    page_waits.wait_for_network_idle(driver)
 
     print(f"Current Page Title: '{driver.title}'")
 
-    # If we are stuck on Cloudflare, wait longer
-    if "øjeblik" in driver.title.lower() or "just a moment" in driver.title.lower():
-        print("!!! Cloudflare challenge detected. Waiting 20 more seconds for auto-solve...")
-        time.sleep(20)
-
     # --- 2. PARSE HTML ---
     soup = BeautifulSoup(driver.page_source, 'html.parser')
 
@@ -133,96 +92,93 @@ def get_meeting_links(driver):
     return links
 
 
-def process_meeting(driver, url):
-    try:
-        # Extract date for filename (e.g., 18-08-2025)
-        date_match = re.search(r'(\d{2}-\d{2}-\d{4})', url)
-        date_obj = None
-        if date_match:
-            d_str, m_str, y_str = date_match.group(1).split('-')
-            filename = f"{y_str}-{m_str}-{d_str}_ishoj_oekonomiudvalget.pdf"
-            try:
-                date_obj = datetime.date(int(y_str), int(m_str), int(d_str))
-            except:
-                pass
-        else:
-            filename = f"ishoj_{url.split('/')[-1][:20]}.pdf"
-
-        # --- DATE FILTERING ---
-        if date_obj and not scraper_utils.should_scrape(date_obj):
-             # print(f"Skipping {filename} (Filtered by Date)")
-             return
-
-        local_path = os.path.join(DOWNLOAD_DIR, filename)
-
-        # --- CHECK IF EXISTS (Cloud or Local) ---
-        if IS_RENDER:
-            s3 = scraper_utils.get_s3_client()
-            if s3:
-                try:
-                    s3.head_object(Bucket=WASABI_BUCKET, Key=filename)
-                    print(f"Skipping {filename} (Already in Wasabi)")
-                    return
-                except:
-                    pass
-        elif os.path.exists(local_path):
-            print(f"Skipping {filename} (Exists locally)")
-            return
-
-        print(f"Processing: {filename} ...")
-        driver.get(url)
-        time.sleep(3)  # Wait for load
-
-        # 4. FORCE OPEN ACCORDIONS (CSS INJECTION)
-        # We inject CSS to force everything visible, bypassing clicks entirely.
-        driver.execute_script("""
-            // Force display block on all hidden accordions
-            var style = document.createElement('style');
-            style.innerHTML = `
-                .accordion-item-content { 
-                    display: block !important; 
-                    height: auto !important; 
-                    opacity: 1 !important; 
-                    visibility: visible !important; 
-                }
-                .main-nav, .main-header, .search-panel, .main-footer, #CookieConsent, .mobile-nav { 
-                    display: none !important; 
-                } 
-                .main { width: 100% !important; max-width: 100% !important; }
-            `;
-            document.head.appendChild(style);
-
-            // Nuke cookie banner elements by ID just in case
-            var badIds = ['CookieConsent', 'Cookiebot', 'cookie-consent-banner'];
-            badIds.forEach(id => { var el = document.getElementById(id); if(el) el.remove(); });
-        """)
-        time.sleep(1)
-
-        # 5. PRINT TO PDF
+def describe_meeting(url):
+    """Filename and date of a meeting link."""
+    # Extract date for filename (e.g., 18-08-2025)
+    date_match = re.search(r'(\d{2}-\d{2}-\d{4})', url)
+    date_obj = None
+    if date_match:
+        d_str, m_str, y_str = date_match.group(1).split('-')
+        filename = f"{y_str}-{m_str}-{d_str}_ishoj_oekonomiudvalget.pdf"
         try:
-            result = driver.execute_cdp_cmd("Page.printToPDF", {
-                "landscape": False,
-                "displayHeaderFooter": False,
-                "printBackground": True,
-                "preferCSSPageSize": True,
-            })
-            
-            with open(local_path, 'wb') as f:
-                f.write(base64.b64decode(result['data']))
-            
-            # --- UPLOAD IF ON RENDER ---
-            if IS_RENDER:
-                scraper_utils.upload_to_wasabi(local_path, WASABI_BUCKET, filename)
-                if os.path.exists(local_path):
-                    os.remove(local_path)
-            else:
-                print("   > Saved locally.")
-
-        except Exception as e:
-            print(f"   > Error printing/saving PDF: {e}")
+            date_obj = datetime.date(int(y_str), int(m_str), int(d_str))
+        except:
+            pass
+    else:
+        filename = f"ishoj_{url.split('/')[-1][:20]}.pdf"
+    return {"url": url, "filename": filename, "date_obj": date_obj}
+
+
+# 4. FORCE OPEN ACCORDIONS (CSS INJECTION)
+# We inject CSS to force everything visible, bypassing clicks entirely.
+CLEANUP_JS = """
+    // Force display block on all hidden accordions
+    var style = document.createElement('style');
+    style.innerHTML = `
+        .accordion-item-content { 
+            display: block !important; 
+            height: auto !important; 
+            opacity: 1 !important; 
+            visibility: visible !important; 
+        }
+        .main-nav, .main-header, .search-panel, .main-footer, #CookieConsent, .mobile-nav { 
+            display: none !important; 
+        } 
+        .main { width: 100% !important; max-width: 100% !important; }
+    `;
+    document.head.appendChild(style);
+
+    // Nuke cookie banner elements by ID just in case
+    var badIds = ['CookieConsent', 'Cookiebot', 'cookie-consent-banner'];
+    badIds.forEach(id => { var el = document.getElementById(id); if(el) el.remove(); });
+"""
+
+PRINT_OPTIONS = {
+    "landscape": False,
+    "displayHeaderFooter": False,
+    "printBackground": True,
+    "preferCSSPageSize": True,
+}
+
+
+def check_meeting(meeting):
+    """Cheap checks before any page load: 'skip', 'stored' or 'render'."""
+    filename = meeting['filename']
+    url = meeting['url']
+
+    # --- DATE FILTERING ---
+    if meeting['date_obj'] and not scraper_utils.should_scrape(meeting['date_obj']):
+         # print(f"Skipping {filename} (Filtered by Date)")
+         return 'skip'
+
+    local_path = os.path.join(DOWNLOAD_DIR, filename)
+
+    # Finished by an earlier run: no page visit, no storage check
+    if run_ledger.is_done(LEDGER_NAME, url):
+        return 'stored'
+
+    # --- CHECK IF EXISTS (Cloud or Local) ---
+    if IS_RENDER:
+        if scraper_utils.object_exists(WASABI_BUCKET, filename):
+            print(f"Skipping {filename} (Already in Wasabi)")
+            run_ledger.record(LEDGER_NAME, url, filename, WASABI_BUCKET)
+            return 'stored'
+    elif os.path.exists(local_path):
+        print(f"Skipping {filename} (Exists locally)")
+        return 'stored'
+
+    print(f"Processing: {filename} ...")
+    return 'render'
 
+
+def save_pdf(meeting, chunks):
+    """Streams the printed PDF to Wasabi (Render) or the download folder."""
+    local_path = os.path.join(DOWNLOAD_DIR, meeting['filename'])
+    try:
+        return tab_renderer.save_stream(chunks, LEDGER_NAME, meeting['url'], local_path, WASABI_BUCKET)
     except Exception as e:
-        print(f"Error processing meeting: {e}")
+        print(f"   > Error saving PDF: {e}")
+        return False
 
 
 def run_ishoej_scraper():
@@ -235,9 +191,12 @@ def run_ishoej_scraper():
 
         if links:
             print(f"Starting download of {len(links)} files...")
-            for i, link in enumerate(links):
-                print(f"[{i + 1}/{len(links)}]", end=" ")
-                process_meeting(driver, link)
+            # The tabs share the Cloudflare clearance this browser earned on the listing page
+            with tab_renderer.TabRenderer(driver, block_rules="ishoej") as renderer:
+                tab_renderer.render_meetings(
+                    renderer, [describe_meeting(link) for link in links],
+                    check_meeting, save_pdf, CLEANUP_JS, PRINT_OPTIONS
+                )
         else:
             print("No links found. Check debug_failure.html.")
 
@@ -245,6 +204,7 @@ def run_ishoej_scraper():
         print(f"Critical Error: {e}")
     finally:
         driver.quit()
+        page_waits.print_stats()
         print("\n--- Done ---")
 
 
@@ -0,0 +1,292 @@
+import os
+import re
+import asyncio
+import datetime
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+
+# --- UTILS ---
+import scraper_utils
+import http_engine
+import run_ledger
+import browser_fallback
+
+# --- CONFIGURATION ---
+IS_RENDER = os.environ.get('RENDER') == 'true'
+
+# Every meetingsplus.dk tenant we scrape. Adding a municipality is one row here.
+#   name:      used for the bucket (raw-files-<name>), local folder, filenames and the run ledger
+#   committee: the committee slug in /committees/<slug>
+MUNICIPALITIES = [
+    {"name": "billund", "base_url": "https://billund.meetingsplus.dk", "committee": "okonomiudvalget"},
+    {"name": "furesoe", "base_url": "https://furesoe.meetingsplus.dk", "committee": "okonomiudvalget"},
+    {"name": "norddjurs", "base_url": "https://norddjurs.meetingsplus.dk", "committee": "okonomiudvalget"},
+]
+
+# How many tenants run at the same time, and how many meetings per tenant
+TENANT_CONCURRENCY = int(os.environ.get("MEETINGSPLUS_TENANTS", "4") or 4)
+MEETING_CONCURRENCY = 4
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+
+
+def tenant_settings(tenant):
+    """Everything the old per-municipality scripts had as module constants."""
+    name = tenant['name']
+    if IS_RENDER:
+        download_dir = "/tmp"
+    else:
+        download_dir = os.path.abspath(f"raw_files_{name}")
+    return dict(
+        tenant,
+        start_url=f"{tenant['base_url']}/committees/{tenant['committee']}",
+        bucket=f"raw-files-{name}",
+        download_dir=download_dir
+    )
+
+
+def selected_tenants():
+    """The tenants matching MUNICIPALITY_FILTER (all of them if it is not set)."""
+    target_filter = os.environ.get("MUNICIPALITY_FILTER")
+    tenants = [tenant_settings(t) for t in MUNICIPALITIES]
+    if target_filter:
+        tenants = [t for t in tenants if target_filter.lower() in t['name'].lower()]
+    return tenants
+
+
+# --- BROWSER FALLBACK ---
+# Only used for portals that render their pages client-side, or a PDF refused over HTTP
+BROWSER = browser_fallback.BrowserFallback()
+
+
+async def browser_html(url, element_id):
+    return await asyncio.to_thread(BROWSER.html, url, f"#{element_id}")
+
+
+async def browser_download(url, download_dir):
+    return await asyncio.to_thread(BROWSER.download, url, download_dir)
+
+
+# --- PARSING ---
+def parse_meeting_list(html, base_url):
+    """Meetings in #committeesRecentContent as dicts: {url, date_str, date_obj}."""
+    soup = BeautifulSoup(html, 'html.parser')
+    container = soup.find(id="committeesRecentContent")
+    if not container:
+        return None
+
+    meetings = []
+    seen_urls = set()
+    for link in container.select("a.accessible-table-cell"):
+        href = link.get('href')
+        # Skip duplicates or invalid links
+        if not href:
+            continue
+        url = urljoin(base_url, href)
+        if url in seen_urls:
+            continue
+
+        # Extract Date from text (e.g., "2025-11-04"), fall back to the aria-label
+        date_match = re.search(r"(\d{4}-\d{2}-\d{2})", link.get_text(" ", strip=True))
+        if not date_match:
+            date_match = re.search(r"(\d{4}-\d{2}-\d{2})", link.get("aria-label") or "")
+        if not date_match:
+            continue
+
+        date_str = date_match.group(1)
+        try:
+            y, m, d = map(int, date_str.split('-'))
+            date_obj = datetime.date(y, m, d)
+        except ValueError:
+            continue
+
+        meetings.append({"url": url, "date_str": date_str, "date_obj": date_obj})
+        seen_urls.add(url)
+
+    return meetings
+
+
+def parse_protocol_url(html, base_url):
+    """The 'Vis referat' (#openProtocol) link of a meeting page, or None."""
+    button = BeautifulSoup(html, 'html.parser').find(id="openProtocol")
+    if not button or not button.get('href'):
+        return None
+    pdf_url = urljoin(base_url, button.get('href'))
+    # Ask for a download instead of the inline viewer
+    return pdf_url.replace("downloadMode=open", "downloadMode=download")
+
+
+# --- STEP 1: FIND MEETING LINKS AND DATES ---
+async def get_meeting_info(http, tenant):
+    print(f"--- [{tenant['name']}] Scraping Meeting List from {tenant['start_url']} ---")
+    try:
+        meetings = parse_meeting_list(await http.get_text(tenant['start_url']), tenant['base_url'])
+    except Exception as e:
+        # A portal that is down is not a client-rendered one; no browser for this
+        print(f"Error: [{tenant['name']}] Could not load meeting list: {e}")
+        return []
+
+    # None: the served HTML has no #committeesRecentContent at all, so the portal renders it client-side.
+    # An empty list is a rendered list without meetings, and needs no browser.
+    tenant['client_rendered'] = meetings is None
+    if meetings is None:
+        print(f"   > [{tenant['name']}] Meeting list is rendered client-side. Loading it in a browser...")
+        try:
+            meetings = parse_meeting_list(
+                await browser_html(tenant['start_url'], "committeesRecentContent"), tenant['base_url']
+            )
+        except Exception as e:
+            print(f"Error: [{tenant['name']}] Could not load meeting list: {e}")
+            return []
+
+    meetings = meetings or []
+    print(f"  > [{tenant['name']}] Found {len(meetings)} unique meetings with dates.")
+    return meetings
+
+
+# --- STEP 2: DOWNLOAD PDF ---
+def is_already_stored(tenant, meeting, filename):
+    local_path = os.path.join(tenant['download_dir'], filename)
+
+    # Finished by an earlier run: no page visit, no storage check
+    if run_ledger.is_done(tenant['name'], meeting['url']):
+        return True
+
+    # --- CHECK IF EXISTS (Cloud or Local) ---
+    if IS_RENDER:
+        if scraper_utils.object_exists(tenant['bucket'], filename):
+            print(f"Skipping {filename} (Already in Wasabi)")
+            run_ledger.record(tenant['name'], meeting['url'], filename, tenant['bucket'])
+            return True
+    elif os.path.exists(local_path):
+        return True
+    return False
+
+
+async def download_meeting_pdf(http, tenant, meeting):
+    """Returns True when the referat is stored (or already was)."""
+    filename = f"{meeting['date_str']}_{tenant['name']}_oekonomiudvalget.pdf"
+    local_path = os.path.join(tenant['download_dir'], filename)
+
+    # 1. Visit Meeting Page and find 'Vis referat'
+    # Only a portal whose meeting list needed a browser renders its meeting pages client-side too
+    if tenant.get('client_rendered'):
+        page_html = await browser_html(meeting['url'], "openProtocol")
+    else:
+        page_html = await http.get_text(meeting['url'])
+    pdf_url = parse_protocol_url(page_html, tenant['base_url'])
+    if not pdf_url:
+        # Agenda only (typical for recent meetings): the referat is published later
+        print(f"  > Skipped: no referat yet on {meeting['url']}")
+        return False
+
+    # 2. Download straight over HTTP (no Chrome download)
+    print(f"Downloading: {filename} ...")
+    is_pdf = False
+    try:
+        await http.download(pdf_url, local_path)
+        with open(local_path, 'rb') as f:
+            is_pdf = f.read(4) == b"%PDF"
+    except Exception as e:
+        print(f"  > HTTP download failed ({pdf_url}): {e}")
+
+    if not is_pdf:
+        # Not a PDF over plain HTTP (consent page, session cookie, ...): download it through Chrome
+        print(f"  > {filename}: not a PDF over HTTP, retrying in browser.")
+        if os.path.exists(local_path):
+            os.remove(local_path)
+        new_file = await browser_download(pdf_url, tenant['download_dir'])
+        if not new_file:
+            print("  > Error: Timeout waiting for file.")
+            return False
+        # Rename (overwrites an older local copy)
+        os.replace(new_file, local_path)
+
+    # --- UPLOAD IF ON RENDER ---
+    if IS_RENDER:
+        if await asyncio.to_thread(scraper_utils.upload_to_wasabi, local_path, tenant['bucket'], filename):
+            run_ledger.record_file(tenant['name'], meeting['url'], local_path, tenant['bucket'])
+        if os.path.exists(local_path):
+            os.remove(local_path)
+    else:
+        run_ledger.record_file(tenant['name'], meeting['url'], local_path)
+        print("  > Success!")
+
+    return True
+
+
+async def process_tenant(http, tenant, download_limit):
+    os.makedirs(tenant['download_dir'], exist_ok=True)
+
+    # 1. Get list of meetings + dates
+    meetings = await get_meeting_info(http, tenant)
+
+    # 2. Cheap filters first (date, ledger, storage), then download in windows
+    processed_count = 0
+    pending = []
+    for meeting in meetings:
+        # --- DATE FILTERING ---
+        if meeting['date_obj'] and not scraper_utils.should_scrape(meeting['date_obj']):
+            continue
+        filename = f"{meeting['date_str']}_{tenant['name']}_oekonomiudvalget.pdf"
+        if await asyncio.to_thread(is_already_stored, tenant, meeting, filename):
+            processed_count += 1  # Count as processed
+            continue
+        pending.append(meeting)
+
+    print(f"\n--- [{tenant['name']}] Downloading {len(pending)} PDFs ---")
+    while pending:
+        if download_limit and processed_count >= download_limit:
+            print(f"[{tenant['name']}] Reached download limit ({download_limit}). Stopping.")
+            break
+
+        window_size = MEETING_CONCURRENCY
+        if download_limit:
+            window_size = min(window_size, download_limit - processed_count)
+        window, pending = pending[:window_size], pending[window_size:]
+
+        results = await http.gather([download_meeting_pdf(http, tenant, m) for m in window])
+        for meeting, result in zip(window, results):
+            if isinstance(result, Exception):
+                print(f"  > Error ({meeting['url']}): {result}")
+            elif result:
+                processed_count += 1
+
+    print(f"--- {tenant['name'].capitalize()} Scrape Complete! ---")
+
+
+async def process_all(tenants, download_limit):
+    # One connection pool for every tenant; the per-host limit keeps each site polite
+    async with http_engine.HttpEngine(headers=HEADERS) as http:
+        semaphore = asyncio.Semaphore(max(1, TENANT_CONCURRENCY))
+
+        async def run_tenant(tenant):
+            async with semaphore:
+                try:
+                    await process_tenant(http, tenant, download_limit)
+                except Exception as e:
+                    print(f"Critical error for {tenant['name']}: {e}")
+
+        await asyncio.gather(*(run_tenant(t) for t in tenants))
+
+
+# --- MAIN ---
+def run_scraper():
+    if IS_RENDER:
+        print(f"--- RUNNING ON RENDER (CLOUD MODE) ---")
+    else:
+        print(f"--- RUNNING LOCALLY ---")
+
+    tenants = selected_tenants()
+    print(f"--- meetingsplus: {', '.join(t['name'] for t in tenants) or 'no tenants selected'} ---")
+
+    try:
+        http_engine.run(process_all(tenants, scraper_utils.get_download_limit()))
+    finally:
+        BROWSER.close()
+
+
+if __name__ == "__main__":
+    run_scraper()
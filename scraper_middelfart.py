@@ -1,20 +1,18 @@
 import os
 import re
-import time
-import base64
-import json
 import datetime
 from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 
 # --- UTILS ---
 import scraper_utils
+import browser_pool
+import page_waits
+import tab_renderer
+import run_ledger
 
 # --- LIBRARIES ---
 try:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.service import Service
-    from selenium.webdriver.chrome.options import Options
     from selenium.webdriver.common.by import By
     from selenium.webdriver.support.ui import WebDriverWait
     from selenium.webdriver.support import expected_conditions as EC
@@ -25,7 +23,9 @@ except ImportError:
 # --- CONFIGURATION ---
 IS_RENDER = os.environ.get('RENDER') == 'true'
 BASE_URL = "https://middelfart.bcdagsorden.dk"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 WASABI_BUCKET = "raw-files-middelfart"
+LEDGER_NAME = "middelfart"
 
 if IS_RENDER:
     DOWNLOAD_DIR = "/tmp"
@@ -37,46 +37,7 @@ else:
 
 def get_driver():
     print("Initializing Headless Browser...")
-    chrome_options = Options()
-    
-    # 1. BASIC STABILITY OPTIONS
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--remote-debugging-port=9222")
-    
-    # 2. USER AGENT (Cloudflare Bypassing)
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-    
-    # 3. RENDER SPECIFIC
-    if IS_RENDER:
-        chrome_options.add_argument("--headless=new")
-        chrome_options.binary_location = "/usr/bin/chromium"
-    else:
-        chrome_options.add_argument("--headless=new")
-
-    # 4. PRINTING PREFS
-    settings = {
-        "recentDestinations": [{"id": "Save as PDF", "origin": "local", "account": ""}],
-        "selectedDestinationId": "Save as PDF",
-        "version": 2
-    }
-    prefs = {
-        'printing.print_preview_sticky_settings.appState': json.dumps(settings),
-        'savefile.default_directory': DOWNLOAD_DIR
-    }
-    chrome_options.add_experimental_option('prefs', prefs)
-
-    if IS_RENDER:
-        print(f"   Binary: /usr/bin/chromium")
-
-    try:
-        driver = webdriver.Chrome(options=chrome_options)
-        return driver
-    except Exception as e:
-        print(f"Error starting Chrome: {e}")
-        return None
+    return browser_pool.create_driver(print_dir=DOWNLOAD_DIR, user_agent=USER_AGENT, block_rules="middelfart")
 
 
 def get_meeting_links(driver):
@@ -157,7 +118,53 @@ def get_meeting_links(driver):
     return meetings
 
 
-def save_page_as_pdf(driver, meeting):
+# --- CLEANUP HTML (Remove Headers/Footers) ---
+CLEANUP_JS = """
+    // 1. Remove Cookie Banners
+    var badIds = ['sliding-popup', 'eu-cookie-withdraw-wrapper', 'cookie-consent-banner'];
+    badIds.forEach(id => { var el = document.getElementById(id); if(el) el.remove(); });
+
+    // 2. Open all Details/Accordions (if any exist)
+    var details = document.querySelectorAll('details');
+    details.forEach(d => d.setAttribute('open', 'true'));
+
+    // 3. Hide Site Navigation & Footer
+    var classesToHide = [
+        'custom-header',      // Top Logo/Menu
+        'section--breadcrumb-bar', // Breadcrumbs & Print Button row
+        'footer',             // Bottom footer
+        'action-buttons',     // Floating buttons
+        'back-to-top'
+    ];
+
+    classesToHide.forEach(cls => {
+        var els = document.getElementsByClassName(cls);
+        for(var i=0; i<els.length; i++) els[i].style.display = 'none';
+    });
+
+    // 4. Force Content Width
+    var main = document.querySelector('.region-content');
+    if(main) {
+        main.style.width = '100%';
+        main.style.margin = '0';
+        main.style.padding = '0';
+    }
+"""
+
+PRINT_OPTIONS = {
+    "landscape": False,
+    "displayHeaderFooter": False,
+    "printBackground": True,
+    "preferCSSPageSize": True,
+    "marginTop": 0.4,  # Inches
+    "marginBottom": 0.4,
+    "marginLeft": 0.4,
+    "marginRight": 0.4
+}
+
+
+def check_meeting(meeting):
+    """Cheap checks before any page load: 'skip', 'stored' or 'render'."""
     filename = meeting['filename']
     url = meeting['url']
     date_obj = meeting['date_obj']
@@ -165,92 +172,35 @@ def save_page_as_pdf(driver, meeting):
     # --- DATE FILTERING ---
     if date_obj and not scraper_utils.should_scrape(date_obj):
          # print(f"Skipping {filename} (Filtered by Date)")
-         return False
+         return 'skip'
 
     local_path = os.path.join(DOWNLOAD_DIR, filename)
 
+    # Finished by an earlier run: no page visit, no storage check
+    if run_ledger.is_done(LEDGER_NAME, url):
+        return 'stored' # Count as processed
+
     # --- CHECK IF EXISTS (Cloud or Local) ---
     if IS_RENDER:
-        s3 = scraper_utils.get_s3_client()
-        if s3:
-            try:
-                s3.head_object(Bucket=WASABI_BUCKET, Key=filename)
-                print(f"Skipping {filename} (Already in Wasabi)")
-                return True # Count as processed
-            except:
-                pass
+        if scraper_utils.object_exists(WASABI_BUCKET, filename):
+            print(f"Skipping {filename} (Already in Wasabi)")
+            run_ledger.record(LEDGER_NAME, url, filename, WASABI_BUCKET)
+            return 'stored' # Count as processed
     elif os.path.exists(local_path):
         # print(f"Skipping {filename} (Exists locally)")
-        return True
+        return 'stored'
 
     print(f"Processing: {filename}")
+    return 'render'
 
-    try:
-        driver.get(url)
-        time.sleep(3)  # Wait for content
-
-        # --- CLEANUP HTML (Remove Headers/Footers) ---
-        driver.execute_script("""
-            // 1. Remove Cookie Banners
-            var badIds = ['sliding-popup', 'eu-cookie-withdraw-wrapper', 'cookie-consent-banner'];
-            badIds.forEach(id => { var el = document.getElementById(id); if(el) el.remove(); });
-
-            // 2. Open all Details/Accordions (if any exist)
-            var details = document.querySelectorAll('details');
-            details.forEach(d => d.setAttribute('open', 'true'));
-
-            // 3. Hide Site Navigation & Footer
-            var classesToHide = [
-                'custom-header',      // Top Logo/Menu
-                'section--breadcrumb-bar', // Breadcrumbs & Print Button row
-                'footer',             // Bottom footer
-                'action-buttons',     // Floating buttons
-                'back-to-top'
-            ];
-
-            classesToHide.forEach(cls => {
-                var els = document.getElementsByClassName(cls);
-                for(var i=0; i<els.length; i++) els[i].style.display = 'none';
-            });
-
-            // 4. Force Content Width
-            var main = document.querySelector('.region-content');
-            if(main) {
-                main.style.width = '100%';
-                main.style.margin = '0';
-                main.style.padding = '0';
-            }
-        """)
-
-        time.sleep(1)
-
-        # --- GENERATE PDF ---
-        result = driver.execute_cdp_cmd("Page.printToPDF", {
-            "landscape": False,
-            "displayHeaderFooter": False,
-            "printBackground": True,
-            "preferCSSPageSize": True,
-            "marginTop": 0.4,  # Inches
-            "marginBottom": 0.4,
-            "marginLeft": 0.4,
-            "marginRight": 0.4
-        })
-
-        with open(local_path, 'wb') as f:
-            f.write(base64.b64decode(result['data']))
-
-        # --- UPLOAD IF ON RENDER ---
-        if IS_RENDER:
-            scraper_utils.upload_to_wasabi(local_path, WASABI_BUCKET, filename)
-            if os.path.exists(local_path):
-                os.remove(local_path)
-        else:
-            print("  > Saved.")
-            
-        return True
 
+def save_pdf(meeting, chunks):
+    """Streams the printed PDF to Wasabi (Render) or the download folder."""
+    local_path = os.path.join(DOWNLOAD_DIR, meeting['filename'])
+    try:
+        return tab_renderer.save_stream(chunks, LEDGER_NAME, meeting['url'], local_path, WASABI_BUCKET)
     except Exception as e:
-        print(f"Error generating PDF: {e}")
+        print(f"Error saving PDF: {e}")
         return False
 
 
@@ -262,20 +212,16 @@ def run_scraper():
     try:
         meetings = get_meeting_links(driver)
 
-        download_limit = scraper_utils.get_download_limit()
-        processed_count = 0
-        
-        for i, meeting in enumerate(meetings):
-            if download_limit and processed_count >= download_limit:
-                print(f"Reached download limit ({download_limit}). Stopping.")
-                break
-                
-            print(f"[{i + 1}/{len(meetings)}]", end=" ")
-            if save_page_as_pdf(driver, meeting):
-                processed_count += 1
-                
+        # Several meeting pages load and print at once, in tabs of this browser
+        with tab_renderer.TabRenderer(driver, block_rules="middelfart") as renderer:
+            tab_renderer.render_meetings(
+                renderer, meetings, check_meeting, save_pdf, CLEANUP_JS, PRINT_OPTIONS,
+                limit=scraper_utils.get_download_limit()
+            )
+
     finally:
         driver.quit()
+        page_waits.print_stats()
         print("\n--- Done! ---")
 
 
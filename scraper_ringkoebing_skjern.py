@@ -1,5 +1,7 @@
 import os
 import re
+import asyncio
+import hashlib
 import requests
 import datetime
 from bs4 import BeautifulSoup
@@ -11,12 +13,16 @@ from reportlab.lib.pagesizes import A4
 
 # --- UTILS ---
 import scraper_utils
+import http_engine
+import run_ledger
+import pdf_render
 
 # --- CONFIGURATION ---
 IS_RENDER = os.environ.get('RENDER') == 'true'
 BASE_URL = "https://www.rksk.dk"
 START_URL = "https://www.rksk.dk/om-kommunen/politiske-udvalg-2022-2025/oekonomiudvalget/dagsordener-referater"
 WASABI_BUCKET = "raw-files-ringkoebing-skjern"
+LEDGER_NAME = "ringkoebing_skjern"
 
 if IS_RENDER:
     OUTPUT_DIR = "/tmp"
@@ -28,6 +34,10 @@ else:
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 }
+# How many meetings are fetched at the same time (their agenda PDFs are fetched in parallel too)
+MEETING_CONCURRENCY = 4
+# Agenda-item PDFs are streamed to disk here, one file per URL, and kept until their meeting is stored
+ITEM_CACHE_DIR = os.environ.get("RKSK_ITEM_CACHE", os.path.join(OUTPUT_DIR, ".item_cache"))
 
 
 def create_cover_page(participants, date_text):
@@ -131,16 +141,14 @@ def get_meeting_links():
     return meetings
 
 
-def get_meeting_data(meeting_url):
+async def get_meeting_data(http, meeting_url):
     """
     Visits meeting page.
     Returns a tuple: (List of PDF items, List of Participant Names)
     """
     try:
-        response = requests.get(meeting_url, headers=HEADERS)
-        response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
-    except:
+        soup = BeautifulSoup(await http.get_text(meeting_url, encoding='utf-8'), 'html.parser')
+    except Exception:
         return [], []
 
     # --- 1. EXTRACT PARTICIPANTS ---
@@ -185,92 +193,168 @@ def get_meeting_data(meeting_url):
     return pdf_items, participants
 
 
-def download_and_merge(pdf_items, participants, output_filename, date_text):
-    merger = PdfWriter()
+def item_cache_path(url):
+    return os.path.join(ITEM_CACHE_DIR, hashlib.sha256(url.encode('utf-8')).hexdigest() + ".pdf")
 
-    # --- 1. ADD COVER PAGE (Participants) ---
-    print("    + Generating Cover Page (Participants)")
-    cover_page_pdf = create_cover_page(participants, date_text)
-    merger.append(cover_page_pdf)
 
-    # --- 2. ADD AGENDA ITEMS ---
-    if not pdf_items:
-        print("    > No agenda items found to merge.")
-    else:
-        count = 0
-        for item in pdf_items:
-            url = item['url']
-            title = item['title']
-            print(f"    + Downloading: {title}")
-
-            try:
-                r = requests.get(url, headers=HEADERS)
-                r.raise_for_status()
-                pdf_file = BytesIO(r.content)
-                merger.append(pdf_file)
-                count += 1
-            except Exception as e:
-                print(f"      x Error downloading part: {e}")
-
-    # --- 3. SAVE FINAL FILE ---
-    output_path = os.path.join(OUTPUT_DIR, output_filename)
-    
+async def fetch_item_pdf(http, item):
+    """Streams one agenda-item PDF to the item cache (unless an earlier try already did). Returns its path."""
+    path = item_cache_path(item['url'])
+    if os.path.exists(path):
+        print(f"    + Cached: {item['title']}")
+        return path
+    print(f"    + Downloading: {item['title']}")
+    # download() writes a .part file and renames it, so the cache never holds half a PDF
+    return await http.download(item['url'], path)
+
+
+async def fetch_item_pdfs(http, pdf_items):
+    """Downloads every agenda-item PDF of a meeting at once. Returns a path (or an exception) per item, in order."""
+    os.makedirs(ITEM_CACHE_DIR, exist_ok=True)
+    return await http.gather([fetch_item_pdf(http, item) for item in pdf_items])
+
+
+def is_already_stored(meeting):
+    """Checks the run ledger, then Wasabi (on Render) or the output folder, before anything is fetched."""
+    output_filename = meeting['filename']
+
+    # Finished by an earlier run: nothing to fetch
+    if run_ledger.is_done(LEDGER_NAME, meeting['url']):
+        return True
+
     # --- CHECK IF EXISTS (Cloud or Local) ---
     if IS_RENDER:
-        s3 = scraper_utils.get_s3_client()
-        if s3:
-            try:
-                s3.head_object(Bucket=WASABI_BUCKET, Key=output_filename)
-                print(f"Skipping {output_filename} (Already in Wasabi)")
-                return True
-            except:
-                pass
-    elif os.path.exists(output_path):
+        if scraper_utils.object_exists(WASABI_BUCKET, output_filename):
+            print(f"Skipping {output_filename} (Already in Wasabi)")
+            run_ledger.record(LEDGER_NAME, meeting['url'], output_filename, WASABI_BUCKET)
+            return True
+    elif os.path.exists(os.path.join(OUTPUT_DIR, output_filename)):
         # print(f"Skipping {output_filename} (Exists locally)")
         return True
+    return False
 
-    with open(output_path, "wb") as fout:
-        merger.write(fout)
-    
-    # --- UPLOAD IF ON RENDER ---
-    if IS_RENDER:
-        scraper_utils.upload_to_wasabi(output_path, WASABI_BUCKET, output_filename)
-        if os.path.exists(output_path):
-            os.remove(output_path)
-    else:
-        print(f"  > SUCCESS: Saved {output_filename}")
-        
-    return True
 
+def merge_and_store(pdf_items, item_paths, participants, output_filename, date_text, meeting_url):
+    """
+    Merges the cover page and the cached agenda-item files into the meeting PDF and stores it:
+    streamed straight into Wasabi on Render, written to the output folder otherwise.
+    Returns True when stored.
+    """
+    merger = PdfWriter()
+    output_path = os.path.join(OUTPUT_DIR, output_filename)
+    chunks = None
 
-def run_scraper():
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-    print("--- Starting Ringkøbing-Skjern Scraper ---")
-    meetings = get_meeting_links()
-    
-    download_limit = scraper_utils.get_download_limit()
+    try:
+        # --- 1. ADD COVER PAGE (Participants) ---
+        print("    + Generating Cover Page (Participants)")
+        cover_page_pdf = create_cover_page(participants, date_text)
+        merger.append(cover_page_pdf)
+
+        # --- 2. ADD AGENDA ITEMS ---
+        if not pdf_items:
+            print("    > No agenda items found to merge.")
+        else:
+            for item, path in zip(pdf_items, item_paths):
+                try:
+                    if isinstance(path, Exception):
+                        raise path
+                    merger.append(path)
+                except Exception as e:
+                    print(f"      x Error downloading part ({item['title']}): {e}")
+
+        # --- 3. STREAM TO WASABI IF ON RENDER (no merged file on disk) ---
+        if IS_RENDER:
+            chunks = pdf_render.stream_pdf(merger)
+            stream = run_ledger.HashingStream(chunks)
+            stored = scraper_utils.stream_to_wasabi(stream, WASABI_BUCKET, output_filename)
+            if stored is True:
+                run_ledger.record(LEDGER_NAME, meeting_url, output_filename, WASABI_BUCKET,
+                                  content_hash=stream.hexdigest(), size=stream.size)
+            elif stored == "EXISTS":
+                run_ledger.record(LEDGER_NAME, meeting_url, output_filename, WASABI_BUCKET)
+        else:
+            tmp_path = output_path + ".part"
+            with open(tmp_path, "wb") as fout:
+                merger.write(fout)
+            os.replace(tmp_path, output_path)
+            stored = True
+            run_ledger.record_file(LEDGER_NAME, meeting_url, output_path)
+            print(f"  > SUCCESS: Saved {output_filename}")
+    finally:
+        if chunks is not None:
+            # Stops the writer thread if the upload gave up half-way
+            chunks.close()
+        merger.close()
+
+    if stored:
+        # Stored for good: the cached parts are no longer needed (a failed meeting keeps them for the retry)
+        for path in item_paths:
+            if isinstance(path, str) and os.path.exists(path):
+                os.remove(path)
+    return bool(stored)
+
+
+async def fetch_meeting(http, meeting):
+    """Returns (pdf_items, item_paths, participants) with all agenda PDFs streamed to disk concurrently."""
+    # Get both PDF links AND Participant names
+    pdf_items, participants = await get_meeting_data(http, meeting['url'])
+    item_paths = await fetch_item_pdfs(http, pdf_items)
+    return pdf_items, item_paths, participants
+
+
+async def process_meetings(meetings, download_limit):
+    candidates = []
     processed_count = 0
-
     for i, meeting in enumerate(meetings):
-        if download_limit and processed_count >= download_limit:
-            print(f"Reached download limit ({download_limit}). Stopping.")
-            break
-            
         date_obj = meeting.get('date_obj')
         # --- DATE FILTERING ---
         if date_obj and not scraper_utils.should_scrape(date_obj):
              # print(f"Skipping {meeting['filename']} (Filtered by Date)")
              continue
+        # Stored by an earlier run: no meeting page, no agenda PDFs
+        if is_already_stored(meeting):
+            processed_count += 1  # Count as processed
+            continue
+        candidates.append((i, meeting))
+
+    # Fetch a window of meetings concurrently, then merge them in order
+    async with http_engine.HttpEngine(headers=HEADERS) as http:
+        while candidates:
+            if download_limit and processed_count >= download_limit:
+                print(f"Reached download limit ({download_limit}). Stopping.")
+                break
+
+            window_size = MEETING_CONCURRENCY
+            if download_limit:
+                window_size = min(window_size, download_limit - processed_count)
+            window, candidates = candidates[:window_size], candidates[window_size:]
+
+            fetched = await http.gather([fetch_meeting(http, meeting) for _, meeting in window])
+
+            for (i, meeting), result in zip(window, fetched):
+                print(f"\n[{i + 1}/{len(meetings)}] Processing: {meeting['date']}")
+                if isinstance(result, Exception):
+                    print(f"    x Error fetching meeting: {result}")
+                    continue
+
+                pdf_items, item_paths, participants = result
+                # Pass everything to the merger (one meeting in memory at a time, off the event loop)
+                try:
+                    if await asyncio.to_thread(merge_and_store, pdf_items, item_paths, participants,
+                                               meeting['filename'], meeting['date'], meeting['url']):
+                        processed_count += 1
+                except Exception as e:
+                    print(f"    x Error merging meeting: {e}")
 
-        print(f"\n[{i + 1}/{len(meetings)}] Processing: {meeting['date']}")
 
-        # Get both PDF links AND Participant names
-        pdf_items, participants = get_meeting_data(meeting['url'])
+def run_scraper():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-        # Pass everything to the merger
-        if download_and_merge(pdf_items, participants, meeting['filename'], meeting['date']):
-            processed_count += 1
+    print("--- Starting Ringkøbing-Skjern Scraper ---")
+    meetings = get_meeting_links()
+    
+    download_limit = scraper_utils.get_download_limit()
+    http_engine.run(process_meetings(meetings, download_limit))
 
     print("--- Job Complete ---")
 
@@ -1,17 +1,16 @@
 import os
-import time
 import re
-import base64
-import json
 import platform
 import datetime
 import scraper_utils
+import browser_pool
+import page_waits
+import tab_renderer
+import dom_extract
+import run_ledger
 
 # --- LIBRARIES ---
 try:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.service import Service
-    from selenium.webdriver.chrome.options import Options
     from selenium.webdriver.common.by import By
     from selenium.webdriver.support.ui import WebDriverWait
     from selenium.webdriver.support import expected_conditions as EC
@@ -24,6 +23,7 @@ IS_RENDER = os.environ.get('RENDER') == 'true'
 BASE_URL = "https://www.rk.dk"
 START_URL = "https://www.rk.dk/politik/politiske-udvalg/oekonomiudvalget"
 WASABI_BUCKET = "raw-files-roedovre"
+LEDGER_NAME = "roedovre"
 
 if IS_RENDER:
     DOWNLOAD_DIR = "/tmp"
@@ -34,79 +34,40 @@ else:
 
 # --- SETUP SELENIUM (FIXED) ---
 def get_driver():
-    chrome_options = Options()
-
-    # 1. BASIC STABILITY OPTIONS
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-
-    # 2. CRASH FIX: Remote Debugging Port
-    # This is often required to stop the "Chrome exited" error in Docker
-    chrome_options.add_argument("--remote-debugging-port=9222")
-
-    # 3. RENDER SPECIFIC
-    if IS_RENDER:
-        chrome_options.add_argument("--headless=new")
-        # Explicitly point to the chromium binary installed by apt-get
-        chrome_options.binary_location = "/usr/bin/chromium"
-
-    # 4. PRINTING PREFS
-    settings = {
-        "recentDestinations": [{"id": "Save as PDF", "origin": "local", "account": ""}],
-        "selectedDestinationId": "Save as PDF",
-        "version": 2
-    }
-    prefs = {
-        'printing.print_preview_sticky_settings.appState': json.dumps(settings),
-        'savefile.default_directory': DOWNLOAD_DIR
-    }
-    chrome_options.add_experimental_option('prefs', prefs)
-
     print(f"Starting Chrome...")
-    if IS_RENDER:
-        print(f"   Binary: /usr/bin/chromium")
-
-    try:
-        # We do NOT pass 'executable_path' manually.
-        # Since we installed 'chromium-driver' via apt, it is on the system PATH.
-        # Selenium Manager will find it automatically.
-        driver = webdriver.Chrome(options=chrome_options)
-        return driver
-    except Exception as e:
-        print(f"Error starting Chrome: {e}")
-        return None
+    return browser_pool.create_driver(print_dir=DOWNLOAD_DIR, headless=False, block_rules="roedovre")
 
 
 # --- COOKIES ---
 def handle_cookies(driver):
+    # Let the page (and a banner, unless network_rules blocked it) finish loading, then
+    # click it if it is there instead of waiting 3 s for a button that never comes
+    page_waits.wait_for_network_idle(driver)
     try:
-        wait = WebDriverWait(driver, 3)
         xpath = "//button[contains(text(), 'Afvis alle') or contains(text(), 'Accepter alle') or contains(text(), 'Tillad alle')]"
-        button = wait.until(EC.element_to_be_clickable((By.XPATH, xpath)))
-        if button:
-            driver.execute_script("arguments[0].click();", button)
-            time.sleep(1)
+        buttons = driver.find_elements(By.XPATH, xpath)
+        if buttons:
+            driver.execute_script("arguments[0].click();", buttons[0])
+            page_waits.wait_for_dom_quiet(driver)
     except:
         pass
 
 
 # --- PRINT TO PDF ---
-def print_page_to_pdf(driver, output_path):
-    try:
-        pdf_data = driver.execute_cdp_cmd("Page.printToPDF", {
-            "printBackground": True,
-            "paperWidth": 8.27,
-            "paperHeight": 11.69,
-            "displayHeaderFooter": False
-        })
-        with open(output_path, "wb") as f:
-            f.write(base64.b64decode(pdf_data['data']))
-        return True
-    except Exception as e:
-        print(f"   > Error printing PDF: {e}")
-        return False
+PRINT_OPTIONS = {
+    "printBackground": True,
+    "paperWidth": 8.27,
+    "paperHeight": 11.69,
+    "displayHeaderFooter": False
+}
+
+# What handle_cookies() does, for pages printed in a tab the driver does not control
+COOKIE_JS = """
+    var buttons = Array.from(document.querySelectorAll('button')).filter(function (b) {
+        return /Afvis alle|Accepter alle|Tillad alle/.test(b.textContent);
+    });
+    if (buttons.length) buttons[0].click();
+"""
 
 
 # --- LOGIC ---
@@ -120,11 +81,12 @@ def get_meeting_links(driver):
     except:
         return []
 
-    links = driver.find_elements(By.CSS_SELECTOR, "section.section-box .link a")
+    # href + text of every link in one script call
+    links = dom_extract.extract(driver, "section.section-box .link a", {"href": "href", "text": "text"})
     meetings = []
     for link in links:
-        href = link.get_attribute('href')
-        text = link.get_attribute("textContent")
+        href = link['href']
+        text = link['text']
         if text and href:
             match = re.search(r"(\d{2})-(\d{2})-(\d{4})", text.strip())
             if match:
@@ -138,42 +100,43 @@ def get_meeting_links(driver):
     return meetings
 
 
-def process_meeting(driver, meeting_url, date_str):
-    filename = f"{date_str}_roedovre_oekonomiudvalget.pdf"
+def check_meeting(meeting):
+    """Cheap checks before any page load: 'skip', 'stored' or 'render'."""
+    filename = meeting['filename']
+    meeting_url = meeting['url']
     local_path = os.path.join(DOWNLOAD_DIR, filename)
 
+    # Check Date Filter
+    if not scraper_utils.should_scrape(meeting['date_obj']):
+        # print(f"Skipping {meeting['date_str']} (Filtered by Date)")
+        return 'skip'
+
+    # Finished by an earlier run: no page visit, no storage check
+    if run_ledger.is_done(LEDGER_NAME, meeting_url):
+        return 'stored'
+
     if IS_RENDER:
-        s3 = scraper_utils.get_s3_client()
-        if s3:
-            try:
-                s3.head_object(Bucket=WASABI_BUCKET, Key=filename)
-                print(f"Skipping {filename} (Already in Wasabi)")
-                return
-            except:
-                pass
+        if scraper_utils.object_exists(WASABI_BUCKET, filename):
+            print(f"Skipping {filename} (Already in Wasabi)")
+            run_ledger.record(LEDGER_NAME, meeting_url, filename, WASABI_BUCKET)
+            return 'stored'
 
     elif os.path.exists(local_path):
         print(f"Skipping {filename} (Exists locally)")
-        return
+        return 'stored'
 
     print(f"Processing: {filename} ...")
-    try:
-        driver.get(meeting_url)
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "h1")))
-        handle_cookies(driver)
-
-        if print_page_to_pdf(driver, local_path):
-            if IS_RENDER:
-                scraper_utils.upload_to_wasabi(local_path, WASABI_BUCKET, filename)
-                if os.path.exists(local_path):
-                    os.remove(local_path)
-            else:
-                print("   > Saved locally.")
-        else:
-            print("   > Failed to print.")
+    return 'render'
 
+
+def save_pdf(meeting, chunks):
+    """Streams the printed PDF to Wasabi (Render) or the download folder."""
+    local_path = os.path.join(DOWNLOAD_DIR, meeting['filename'])
+    try:
+        return tab_renderer.save_stream(chunks, LEDGER_NAME, meeting['url'], local_path, WASABI_BUCKET)
     except Exception as e:
         print(f"   > Error: {e}")
+        return False
 
 
 def run_roedovre_scraper():
@@ -183,17 +146,19 @@ def run_roedovre_scraper():
     try:
         meetings = get_meeting_links(driver)
         print(f"Found {len(meetings)} meetings.")
-        
-        for i, (url, date_str, date_obj) in enumerate(meetings):
-            # Check Date Filter
-            if not scraper_utils.should_scrape(date_obj):
-                # print(f"Skipping {date_str} (Filtered by Date)")
-                continue
-                
-            process_meeting(driver, url, date_str)
+
+        meetings = [
+            {"url": url, "date_str": date_str, "date_obj": date_obj,
+             "filename": f"{date_str}_roedovre_oekonomiudvalget.pdf"}
+            for url, date_str, date_obj in meetings
+        ]
+        # Several meeting pages load and print at once, in tabs of this browser
+        with tab_renderer.TabRenderer(driver, block_rules="roedovre") as renderer:
+            tab_renderer.render_meetings(renderer, meetings, check_meeting, save_pdf, COOKIE_JS, PRINT_OPTIONS)
             
     finally:
         driver.quit()
+        page_waits.print_stats()
         print("\n--- Complete! ---")
 
 
@@ -1,19 +1,18 @@
 import os
 import re
-import time
-import base64
-import json
 import datetime
 from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 
 # --- UTILS ---
 import scraper_utils
+import browser_pool
+import page_waits
+import tab_renderer
+import run_ledger
 
 # --- LIBRARIES ---
 try:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.options import Options
     from selenium.webdriver.common.by import By
     from selenium.webdriver.support.ui import WebDriverWait
     from selenium.webdriver.support import expected_conditions as EC
@@ -26,6 +25,7 @@ IS_RENDER = os.environ.get('RENDER') == 'true'
 BASE_URL = "https://www.svendborg.dk/dagsordener-og-referater/?committees=8968"
 DOMAIN = "https://www.svendborg.dk"
 WASABI_BUCKET = "raw-files-svendborg"
+LEDGER_NAME = "svendborg"
 
 if IS_RENDER:
     DOWNLOAD_DIR = "/tmp"
@@ -37,57 +37,14 @@ else:
 
 def get_driver():
     print("Initializing Browser...")
-    chrome_options = Options()
-    
-    # 1. BASIC STABILITY OPTIONS
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--remote-debugging-port=9222")
-    
-    # 2. RENDER SPECIFIC
-    if IS_RENDER:
-        chrome_options.add_argument("--headless=new")
-        chrome_options.binary_location = "/usr/bin/chromium"
-    else:
-        # Local Headless? Or visible? Let's default to headless to match 'scraper.py' logic
-        # but the original script had 'headless=new' commented out or conditional.
-        # User wants consistent behavior.
-        chrome_options.add_argument("--headless=new")
-
-    # 3. PRINTING PREFS
-    settings = {
-        "recentDestinations": [{"id": "Save as PDF", "origin": "local", "account": ""}],
-        "selectedDestinationId": "Save as PDF",
-        "version": 2
-    }
-    prefs = {
-        'printing.print_preview_sticky_settings.appState': json.dumps(settings),
-        'savefile.default_directory': DOWNLOAD_DIR
-    }
-    chrome_options.add_experimental_option('prefs', prefs)
-
-    if IS_RENDER:
-        print(f"   Binary: /usr/bin/chromium")
-        
-    try:
-        driver = webdriver.Chrome(options=chrome_options)
-        return driver
-    except Exception as e:
-        print(f"Error starting Chrome: {e}")
-        return None
-
+    return browser_pool.create_driver(print_dir=DOWNLOAD_DIR, block_rules="svendborg")
 
-def get_all_meeting_links(driver):
-    print(f"--- Step 1: Finding meetings from {BASE_URL} ---")
 
-    all_meetings = []
+def iter_meeting_pages(driver):
+    """Yields the referater of one listing offset at a time (newest first); the next offset loads on demand."""
     offset = 0
     page_size = 12  # Svendborg loads 12 items per "Vis flere"
-    
-    # Limit Logic
-    download_limit = scraper_utils.get_download_limit()
+    seen_urls = set()
     
     while True:
         # Construct paginated URL
@@ -112,9 +69,9 @@ def get_all_meeting_links(driver):
 
             if not items:
                 print("    No items found on this page. Stopping.")
-                break
+                return
 
-            found_new = 0
+            page = []
             for item in items:
                 # 1. Check Type (Dagsorden vs Referat)
                 type_span = item.find("span", class_="text-caption-md-regular")
@@ -152,50 +109,101 @@ def get_all_meeting_links(driver):
                     filename = f"svendborg_referat_{offset}.pdf"
 
                 # Deduplication check
-                if not any(m['url'] == full_url for m in all_meetings):
-                    all_meetings.append({
+                if full_url not in seen_urls:
+                    seen_urls.add(full_url)
+                    page.append({
                         "url": full_url,
                         "filename": filename,
                         "date_obj": date_obj
                     })
-                    found_new += 1
             
-            print(f"    Found {found_new} referater on this page.")
+            print(f"    Found {len(page)} referater on this page.")
+            yield page
 
-            if found_new == 0 and offset > 36:
+            if not page and offset > 36:
                 print("    End of content reached.")
-                break
+                return
 
             offset += page_size
-            
-            # Optimization: If we have limit, and we found enough meetings (ignoring date filter for now or precise filtering?)
-            # The user says "limit overrides date filter" -> "not matter the date filter if Limit is 1 it only takes one file".
-            # This implies we can stop collecting links if we have enough CANDIDATES.
-            # But wait, we might need to filter by date first? 
-            # "Also i would not only like to filter by date but also set a limit"
-            # Logic: Collect, then Filter, then Limit.
-            # BUT efficient scraping means we should stop if we have enough VALID files.
-            # Since we have dates, we can check date filter here.
-            
-            if download_limit:
-                 # Count valid meetings so far
-                 valid_count = 0
-                 for m in all_meetings:
-                     if m['date_obj'] and scraper_utils.should_scrape(m['date_obj']):
-                         valid_count += 1
-                 
-                 if valid_count >= download_limit:
-                     print(f"    Reached limit of {download_limit} valid files.")
-                     break
 
         except Exception as e:
             print(f"    Error on offset {offset}: {e}")
-            break
+            return
+
+
+def get_all_meeting_links(driver):
+    print(f"--- Step 1: Finding meetings from {BASE_URL} ---")
+
+    all_meetings = []
+    
+    # Limit Logic
+    download_limit = scraper_utils.get_download_limit()
+    valid_count = 0
+
+    # In SCRAPE_MODE=NEW the listing stops at the first old/already stored meetings
+    pages = iter_meeting_pages(driver)
+    for meeting in scraper_utils.iter_listing(pages, lambda m: m['date_obj'], is_stored=is_already_stored):
+        all_meetings.append(meeting)
+
+        # "limit overrides date filter": stop collecting once we have enough VALID files
+        if download_limit:
+            if meeting['date_obj'] and scraper_utils.should_scrape(meeting['date_obj']):
+                valid_count += 1
+            if valid_count >= download_limit:
+                print(f"    Reached limit of {download_limit} valid files.")
+                break
 
     return all_meetings
 
 
-def process_meeting(driver, meeting):
+def is_already_stored(meeting):
+    """Checks the run ledger, then Wasabi (on Render) or the download folder."""
+    if run_ledger.is_done(LEDGER_NAME, meeting['url']):
+        return True
+    if IS_RENDER:
+        return scraper_utils.object_exists(WASABI_BUCKET, meeting['filename'])
+    return os.path.exists(os.path.join(DOWNLOAD_DIR, meeting['filename']))
+
+
+# --- CLEANUP DOM FOR PDF ---
+# Hides header, footer, buttons, cookie banner
+CLEANUP_JS = """
+    var ids = ['CookieConsent', 'coiOverlay', 'cookie-information-template-wrapper'];
+    ids.forEach(id => { var el = document.getElementById(id); if(el) el.remove(); });
+
+    var classesToHide = [
+        'c-site-header',      // Top menu
+        'c-site-footer',      // Footer
+        'c-page-module-bar',  // Bottom floating bar
+        'c-floating-sidebar', // Right sidebar
+        'c-skip-to-content',  // Skip links
+        'c-base-button',      // Hide ALL buttons (including Print)
+        'c-horizontal-collapser' // Breadcrumbs
+    ];
+
+    classesToHide.forEach(cls => {
+        var els = document.getElementsByClassName(cls);
+        for(var i=0; i<els.length; i++) els[i].style.display = 'none';
+    });
+
+    var main = document.getElementById('main');
+    if(main) {
+        main.style.maxWidth = '100%';
+        main.style.margin = '0';
+        main.style.padding = '20px';
+    }
+"""
+
+PRINT_OPTIONS = {
+    "landscape": False,
+    "displayHeaderFooter": False,
+    "printBackground": True,
+    "preferCSSPageSize": True,
+}
+
+
+def check_meeting(meeting):
+    """Cheap checks before any page load: 'skip', 'stored' or 'render'."""
     filename = meeting['filename']
     url = meeting['url']
     date_obj = meeting.get('date_obj')
@@ -203,80 +211,33 @@ def process_meeting(driver, meeting):
     # --- DATE FILTERING ---
     if date_obj and not scraper_utils.should_scrape(date_obj):
         # print(f"Skipping {filename} (Filtered by Date)")
-        return False # Did not process
+        return 'skip' # Did not process
 
     local_path = os.path.join(DOWNLOAD_DIR, filename)
 
+    # Finished by an earlier run: no page visit, no storage check
+    if run_ledger.is_done(LEDGER_NAME, url):
+        return 'stored' # Count as processed/success
+
     # --- CHECK IF EXISTS (Cloud or Local) ---
     if IS_RENDER:
-        s3 = scraper_utils.get_s3_client()
-        if s3:
-            try:
-                s3.head_object(Bucket=WASABI_BUCKET, Key=filename)
-                print(f"Skipping {filename} (Already in Wasabi)")
-                return True # Count as processed/success
-            except:
-                pass
+        if scraper_utils.object_exists(WASABI_BUCKET, filename):
+            print(f"Skipping {filename} (Already in Wasabi)")
+            run_ledger.record(LEDGER_NAME, url, filename, WASABI_BUCKET)
+            return 'stored' # Count as processed/success
     elif os.path.exists(local_path):
         print(f"Skipping {filename} (Exists locally)")
-        return True
+        return 'stored'
 
     print(f"Processing: {filename} ...")
-    try:
-        driver.get(url)
-        time.sleep(3)  # Wait for content to load
-
-        # --- CLEANUP DOM FOR PDF ---
-        # Hides header, footer, buttons, cookie banner
-        driver.execute_script("""
-            var ids = ['CookieConsent', 'coiOverlay', 'cookie-information-template-wrapper'];
-            ids.forEach(id => { var el = document.getElementById(id); if(el) el.remove(); });
-
-            var classesToHide = [
-                'c-site-header',      // Top menu
-                'c-site-footer',      // Footer
-                'c-page-module-bar',  // Bottom floating bar
-                'c-floating-sidebar', // Right sidebar
-                'c-skip-to-content',  // Skip links
-                'c-base-button',      // Hide ALL buttons (including Print)
-                'c-horizontal-collapser' // Breadcrumbs
-            ];
-
-            classesToHide.forEach(cls => {
-                var els = document.getElementsByClassName(cls);
-                for(var i=0; i<els.length; i++) els[i].style.display = 'none';
-            });
-
-            var main = document.getElementById('main');
-            if(main) {
-                main.style.maxWidth = '100%';
-                main.style.margin = '0';
-                main.style.padding = '20px';
-            }
-        """)
-        time.sleep(1)
-
-        # --- PRINT TO PDF ---
-        result = driver.execute_cdp_cmd("Page.printToPDF", {
-            "landscape": False,
-            "displayHeaderFooter": False,
-            "printBackground": True,
-            "preferCSSPageSize": True,
-        })
-
-        with open(local_path, 'wb') as f:
-            f.write(base64.b64decode(result['data']))
-
-        # --- UPLOAD IF ON RENDER ---
-        if IS_RENDER:
-            scraper_utils.upload_to_wasabi(local_path, WASABI_BUCKET, filename)
-            if os.path.exists(local_path):
-                os.remove(local_path)
-        else:
-            print("   > Saved locally.")
-            
-        return True # Processed successfully
+    return 'render'
 
+
+def save_pdf(meeting, chunks):
+    """Streams the printed PDF to Wasabi (Render) or the download folder."""
+    local_path = os.path.join(DOWNLOAD_DIR, meeting['filename'])
+    try:
+        return tab_renderer.save_stream(chunks, LEDGER_NAME, meeting['url'], local_path, WASABI_BUCKET)
     except Exception as e:
         print(f"Error saving PDF: {e}")
         return False
@@ -291,21 +252,16 @@ def run_scraper():
         meetings = get_all_meeting_links(driver)
         print(f"Total meetings found: {len(meetings)}")
         
-        # Apply Limit Logic Here as well
-        download_limit = scraper_utils.get_download_limit()
-        processed_count = 0
-
-        for i, meeting in enumerate(meetings):
-            if download_limit and processed_count >= download_limit:
-                print(f"Reached download limit ({download_limit}). Stopping.")
-                break
-                
-            print(f"[{i + 1}/{len(meetings)}]", end=" ")
-            if process_meeting(driver, meeting):
-                processed_count += 1
+        # Apply Limit Logic Here as well; several meeting pages load and print at once
+        with tab_renderer.TabRenderer(driver, block_rules="svendborg") as renderer:
+            tab_renderer.render_meetings(
+                renderer, meetings, check_meeting, save_pdf, CLEANUP_JS, PRINT_OPTIONS,
+                limit=scraper_utils.get_download_limit()
+            )
 
     finally:
         driver.quit()
+        page_waits.print_stats()
         print("\n--- Done! ---")
 
 
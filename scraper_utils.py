@@ -1,6 +1,12 @@
 import os
+import json
+import time
+import atexit
+import threading
 import boto3
 import datetime
+import concurrent.futures
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 # --- CONFIGURATION ---
@@ -9,26 +15,56 @@ WASABI_ACCESS_KEY = os.environ.get("WASABI_ACCESS_KEY")
 WASABI_SECRET_KEY = os.environ.get("WASABI_SECRET_KEY")
 WASABI_ENDPOINT = os.environ.get("WASABI_ENDPOINT", "https://s3.eu-central-1.wasabisys.com")
 SCRAPE_MODE = os.environ.get("SCRAPE_MODE", "ALL")  # 'ALL' or 'NEW'
+# In NEW mode a newest-first listing stops after this many old/already stored meetings in a row
+LISTING_STOP_AFTER = max(1, int(os.environ.get("LISTING_STOP_AFTER", "3") or 3))
+# Size of the shared client's HTTP connection pool (also caps upload_many concurrency)
+S3_MAX_POOL_CONNECTIONS = int(os.environ.get("S3_MAX_POOL_CONNECTIONS", "32") or 32)
+# Part size for streamed multipart uploads (S3 minimum is 5 MB); also the max bytes buffered per stream
+S3_STREAM_PART_SIZE = max(5 * 1024 * 1024, int(os.environ.get("S3_STREAM_PART_SIZE", str(8 * 1024 * 1024))))
+# Bucket listings are cached on disk for this many seconds (0 disables the snapshot)
+S3_INVENTORY_TTL = int(os.environ.get("S3_INVENTORY_TTL", "3600") or 0)
+S3_INVENTORY_DIR = os.environ.get("S3_INVENTORY_DIR", ".s3_inventory")
+# run_scrapers.py hands out a distinct port per concurrently running browser
+CHROME_DEBUG_PORT = os.environ.get("CHROME_DEBUG_PORT", "9222")
+
+# One long-lived client per process: boto3 clients are thread-safe, and reusing it
+# keeps TLS connections to Wasabi open instead of a new handshake per file.
+_s3_client = None
+_s3_client_lock = threading.Lock()
+# Buckets we have already confirmed (or created) during this run
+_confirmed_buckets = set()
+
 
 def get_s3_client():
+    global _s3_client
     if not WASABI_ACCESS_KEY or not WASABI_SECRET_KEY:
         print("   > Error: Wasabi credentials missing.")
         return None
-    
-    return boto3.client(
-        's3',
-        endpoint_url=WASABI_ENDPOINT,
-        aws_access_key_id=WASABI_ACCESS_KEY,
-        aws_secret_access_key=WASABI_SECRET_KEY
-    )
+
+    with _s3_client_lock:
+        if _s3_client is None:
+            _s3_client = boto3.client(
+                's3',
+                endpoint_url=WASABI_ENDPOINT,
+                aws_access_key_id=WASABI_ACCESS_KEY,
+                aws_secret_access_key=WASABI_SECRET_KEY,
+                config=Config(
+                    max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                    tcp_keepalive=True,
+                    retries={'max_attempts': 5, 'mode': 'standard'}
+                )
+            )
+        return _s3_client
 
 def ensure_bucket_exists(s3_client, bucket_name):
-    """Creates the bucket if it does not exist."""
+    """Creates the bucket if it does not exist. Each bucket is only checked once per run."""
     if not s3_client: return False
+    if bucket_name in _confirmed_buckets: return True
     
     try:
         s3_client.head_bucket(Bucket=bucket_name)
         # print(f"   > Bucket '{bucket_name}' exists.")
+        _confirmed_buckets.add(bucket_name)
         return True
     except ClientError as e:
         error_code = int(e.response['Error']['Code'])
@@ -37,6 +73,7 @@ def ensure_bucket_exists(s3_client, bucket_name):
             try:
                 s3_client.create_bucket(Bucket=bucket_name)
                 print(f"   > Bucket '{bucket_name}' created successfully.")
+                _confirmed_buckets.add(bucket_name)
                 return True
             except Exception as create_err:
                 print(f"   > Failed to create bucket '{bucket_name}': {create_err}")
@@ -45,6 +82,130 @@ def ensure_bucket_exists(s3_client, bucket_name):
             print(f"   > Error checking bucket '{bucket_name}': {e}")
             return False
 
+# --- S3 INVENTORY ---
+# One paginated ListObjectsV2 per bucket replaces a HEAD request per document.
+# bucket -> set of keys, or None if the bucket could not be listed (we then fall back to HEAD)
+_inventory = {}
+_inventory_dirty = set()
+_inventory_lock = threading.Lock()
+
+
+def _inventory_snapshot_path(bucket_name):
+    return os.path.join(S3_INVENTORY_DIR, f"{bucket_name}.json")
+
+
+def _read_inventory_snapshot(bucket_name):
+    """Returns the cached key set if a snapshot younger than S3_INVENTORY_TTL exists."""
+    if S3_INVENTORY_TTL <= 0:
+        return None
+    try:
+        with open(_inventory_snapshot_path(bucket_name), 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        if time.time() - snapshot['listed_at'] > S3_INVENTORY_TTL:
+            return None
+        return set(snapshot['keys'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_inventory_snapshot(bucket_name, keys, listed_at=None):
+    if S3_INVENTORY_TTL <= 0:
+        return
+    try:
+        os.makedirs(S3_INVENTORY_DIR, exist_ok=True)
+        path = _inventory_snapshot_path(bucket_name)
+        if listed_at is None:
+            # Keep the original listing time so newly added keys don't extend the TTL
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    listed_at = json.load(f)['listed_at']
+            except (OSError, ValueError, KeyError):
+                listed_at = time.time()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'listed_at': listed_at, 'keys': sorted(keys)}, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"   > Could not save inventory snapshot for '{bucket_name}': {e}")
+
+
+def _list_bucket_keys(bucket_name):
+    """Lists every key in a bucket. Returns a set, or None if the listing failed."""
+    s3 = get_s3_client()
+    if not s3: return None
+
+    keys = set()
+    try:
+        paginator = s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket_name):
+            for obj in page.get('Contents', []):
+                keys.add(obj['Key'])
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchBucket', '404'):
+            return set()
+        print(f"   > Could not list bucket '{bucket_name}': {e}")
+        return None
+    except Exception as e:
+        print(f"   > Could not list bucket '{bucket_name}': {e}")
+        return None
+    return keys
+
+
+def load_bucket_inventory(bucket_name, refresh=False):
+    """
+    Returns the set of keys stored in a bucket (None if it can't be listed).
+    Loaded once per process, from a fresh on-disk snapshot if there is one.
+    """
+    with _inventory_lock:
+        if not refresh and bucket_name in _inventory:
+            return _inventory[bucket_name]
+
+        keys = None if refresh else _read_inventory_snapshot(bucket_name)
+        if keys is None:
+            print(f"   > Listing bucket '{bucket_name}'...")
+            keys = _list_bucket_keys(bucket_name)
+            if keys is not None:
+                print(f"   > {len(keys)} objects in '{bucket_name}'.")
+                _write_inventory_snapshot(bucket_name, keys, listed_at=time.time())
+
+        _inventory[bucket_name] = keys
+        return keys
+
+
+def object_exists(bucket_name, key):
+    """True if the key is already stored in the bucket. O(1) after the first call per bucket."""
+    keys = load_bucket_inventory(bucket_name)
+    if keys is not None:
+        return key in keys
+
+    # Listing failed (permissions, network): fall back to a single HEAD request
+    s3 = get_s3_client()
+    if not s3: return False
+    try:
+        s3.head_object(Bucket=bucket_name, Key=key)
+        return True
+    except Exception:
+        return False
+
+
+def remember_object(bucket_name, key):
+    """Records a freshly uploaded key so later checks in this run (and the snapshot) see it."""
+    with _inventory_lock:
+        keys = _inventory.get(bucket_name)
+        if keys is not None:
+            keys.add(key)
+            _inventory_dirty.add(bucket_name)
+
+
+@atexit.register
+def _flush_inventory_snapshots():
+    with _inventory_lock:
+        for bucket_name in _inventory_dirty:
+            if _inventory.get(bucket_name) is not None:
+                _write_inventory_snapshot(bucket_name, _inventory[bucket_name])
+        _inventory_dirty.clear()
+
+
 def upload_to_wasabi(local_file_path, bucket_name, remote_filename):
     s3 = get_s3_client()
     if not s3: return False
@@ -53,22 +214,148 @@ def upload_to_wasabi(local_file_path, bucket_name, remote_filename):
     ensure_bucket_exists(s3, bucket_name)
 
     try:
-        try:
-            s3.head_object(Bucket=bucket_name, Key=remote_filename)
+        if object_exists(bucket_name, remote_filename):
             print(f"   > Skipping: {remote_filename} already exists in cloud.")
             return "EXISTS"
-        except:
-            pass
 
         print(f"   > Uploading to {bucket_name}...")
         with open(local_file_path, "rb") as f:
             s3.put_object(Bucket=bucket_name, Key=remote_filename, Body=f)
+        remember_object(bucket_name, remote_filename)
         print(f"   > Upload Success!")
         return True
     except Exception as e:
         print(f"   > Wasabi Upload Error: {e}")
         return False
 
+def stream_to_wasabi(chunks, bucket_name, remote_filename, part_size=None):
+    """
+    Uploads a stream of bytes chunks (e.g. response.iter_content()) without a local temp file.
+    At most one part (S3_STREAM_PART_SIZE) is held in memory at a time. Small bodies go up
+    as a single put_object, bigger ones as an S3 multipart upload that is aborted on failure.
+    Returns True, "EXISTS" or False like upload_to_wasabi.
+    """
+    part_size = part_size or S3_STREAM_PART_SIZE
+    s3 = get_s3_client()
+    if not s3: return False
+
+    ensure_bucket_exists(s3, bucket_name)
+
+    if object_exists(bucket_name, remote_filename):
+        print(f"   > Skipping: {remote_filename} already exists in cloud.")
+        return "EXISTS"
+
+    print(f"   > Streaming to {bucket_name}...")
+    upload_id = None
+    parts = []
+    buffer = bytearray()
+
+    def flush_part():
+        part_number = len(parts) + 1
+        response = s3.upload_part(
+            Bucket=bucket_name, Key=remote_filename, UploadId=upload_id,
+            PartNumber=part_number, Body=bytes(buffer[:part_size])
+        )
+        parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        del buffer[:part_size]
+
+    try:
+        for chunk in chunks:
+            if not chunk: continue
+            buffer.extend(chunk)
+            while len(buffer) >= part_size:
+                if upload_id is None:
+                    upload_id = s3.create_multipart_upload(Bucket=bucket_name, Key=remote_filename)['UploadId']
+                flush_part()
+
+        if upload_id is None:
+            # Everything fit in one part: a plain PUT is one request instead of three
+            s3.put_object(Bucket=bucket_name, Key=remote_filename, Body=bytes(buffer))
+        else:
+            if buffer:
+                flush_part()
+            s3.complete_multipart_upload(
+                Bucket=bucket_name, Key=remote_filename, UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+
+        remember_object(bucket_name, remote_filename)
+        print(f"   > Upload Success!")
+        return True
+    except Exception as e:
+        print(f"   > Wasabi Stream Error: {e}")
+        if upload_id:
+            try:
+                s3.abort_multipart_upload(Bucket=bucket_name, Key=remote_filename, UploadId=upload_id)
+            except Exception:
+                pass
+        return False
+
+def copy_within_wasabi(source_bucket, source_key, bucket_name, remote_filename):
+    """
+    Server-side copy of an object we already stored (no download, no re-upload).
+    Returns True, "EXISTS" or False, like upload_to_wasabi.
+    """
+    s3 = get_s3_client()
+    if not s3: return False
+
+    ensure_bucket_exists(s3, bucket_name)
+
+    try:
+        if object_exists(bucket_name, remote_filename):
+            return "EXISTS"
+        s3.copy_object(
+            Bucket=bucket_name,
+            Key=remote_filename,
+            CopySource={"Bucket": source_bucket, "Key": source_key}
+        )
+        remember_object(bucket_name, remote_filename)
+        return True
+    except Exception as e:
+        print(f"   > Wasabi Copy Error ({source_bucket}/{source_key} -> {bucket_name}): {e}")
+        return False
+
+def upload_many(files, bucket_name, max_workers=8):
+    """
+    Uploads many files to one bucket with overlapping transfers.
+    files: iterable of (local_file_path, remote_filename).
+    Returns {remote_filename: True | "EXISTS" | False}, like upload_to_wasabi per file.
+    """
+    files = list(files)
+    results = {}
+    if not files: return results
+
+    s3 = get_s3_client()
+    if not s3:
+        return {remote: False for _, remote in files}
+    ensure_bucket_exists(s3, bucket_name)
+
+    def upload_one(local_file_path, remote_filename):
+        if object_exists(bucket_name, remote_filename):
+            return "EXISTS"
+        # upload_file goes through s3transfer, which also splits big files into parallel parts
+        s3.upload_file(local_file_path, bucket_name, remote_filename)
+        remember_object(bucket_name, remote_filename)
+        return True
+
+    print(f"   > Uploading {len(files)} files to {bucket_name}...")
+    workers = max(1, min(max_workers, S3_MAX_POOL_CONNECTIONS, len(files)))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        future_to_remote = {
+            executor.submit(upload_one, local, remote): remote for local, remote in files
+        }
+        for future in concurrent.futures.as_completed(future_to_remote):
+            remote = future_to_remote[future]
+            try:
+                results[remote] = future.result()
+            except Exception as e:
+                print(f"   > Wasabi Upload Error ({remote}): {e}")
+                results[remote] = False
+
+    uploaded = sum(1 for r in results.values() if r is True)
+    print(f"   > Batch upload done: {uploaded} uploaded, {len(results) - uploaded} skipped/failed.")
+    return results
+
 def should_scrape(date_obj):
     """
     Returns True if we should scrape based on SCRAPE_MODE.
@@ -86,6 +373,34 @@ def should_scrape(date_obj):
     
     return True
 
+def iter_listing(pages, date_of, is_stored=None, stop_after=None):
+    """
+    Walks a newest-first meeting listing and yields its meetings.
+    pages: an iterable of lists of meetings, ideally a generator that only fetches
+           (scrolls, clicks 'show more', requests the next offset) when asked for the next page.
+    date_of(meeting): returns a datetime.date or None.
+    is_stored(meeting): optional, True if the meeting is already in Wasabi / on disk.
+
+    In SCRAPE_MODE=NEW old and already stored meetings are dropped, and the listing stops after
+    `stop_after` of them in a row, so older pages are never loaded. In ALL mode everything is yielded.
+    """
+    stop_after = stop_after or LISTING_STOP_AFTER
+    streak = 0
+
+    for page in pages:
+        for meeting in page:
+            if SCRAPE_MODE == "NEW":
+                date_obj = date_of(meeting)
+                is_old = date_obj is not None and not should_scrape(date_obj)
+                if is_old or (is_stored and is_stored(meeting)):
+                    streak += 1
+                    if streak >= stop_after:
+                        print(f"   > Reached older/known meetings. Stopping listing early (SCRAPE_MODE=NEW).")
+                        return
+                    continue
+                streak = 0
+            yield meeting
+
 def get_download_limit():
     """Returns integer limit or None if no limit."""
     limit = os.environ.get("DOWNLOAD_LIMIT")
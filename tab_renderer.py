@@ -0,0 +1,288 @@
+import os
+import time
+import queue
+import base64
+import threading
+import concurrent.futures
+
+# --- UTILS ---
+import scraper_utils
+import run_ledger
+import network_rules
+import page_waits
+from cdp_client import CdpConnection, CdpError
+
+# --- CONFIGURATION ---
+# How many meeting pages one browser loads and prints at the same time
+PRINT_TABS = max(1, int(os.environ.get("PRINT_TABS", "4") or 4))
+LOAD_TIMEOUT = 30
+PRINT_TIMEOUT = 120
+# Bytes asked for per IO.read; the PDF never has to fit in one CDP message (or in memory)
+PRINT_CHUNK_SIZE = 1024 * 1024
+
+
+def read_stream(send, handle, chunk_size=PRINT_CHUNK_SIZE):
+    """
+    Yields the bytes of a CDP stream (e.g. printToPDF with transferMode=ReturnAsStream)
+    one IO.read at a time, and closes the stream when done or abandoned.
+    send(method, params): how to reach the target that owns the stream.
+    """
+    try:
+        while True:
+            result = send("IO.read", {"handle": handle, "size": chunk_size})
+            data = result.get('data', "")
+            if data:
+                yield base64.b64decode(data) if result.get('base64Encoded') else data.encode('utf-8')
+            if result.get('eof'):
+                return
+    finally:
+        try:
+            send("IO.close", {"handle": handle})
+        except Exception:
+            pass
+
+
+def _as_function(script):
+    """Cleanup scripts are written for execute_script() (a function body); Runtime.evaluate needs an expression."""
+    return f"(function () {{\n{script}\n}})()"
+
+
+class _Tab:
+    """One page target we opened ourselves, attached over a flat CDP session."""
+
+    def __init__(self, conn, block_rules):
+        self.conn = conn
+        self.loaded = threading.Event()
+        self.target_id = conn.send("Target.createTarget", {"url": "about:blank"})['targetId']
+        self.session_id = conn.send("Target.attachToTarget", {
+            "targetId": self.target_id,
+            "flatten": True
+        })['sessionId']
+        conn.on(self._on_event)
+
+        self.send("Page.enable")
+        self.network = page_waits.NetworkMonitor(conn, self.session_id)
+        if block_rules and network_rules.BLOCKING_ENABLED:
+            self.send("Network.setBlockedURLs", {"urls": network_rules.blocked_patterns(block_rules)})
+        try:
+            # Tabs that are not in front get their timers throttled; make every tab act focused
+            self.send("Emulation.setFocusEmulationEnabled", {"enabled": True})
+        except CdpError:
+            pass
+
+    def _on_event(self, method, params, session_id):
+        if session_id == self.session_id and method == "Page.loadEventFired":
+            self.loaded.set()
+
+    def send(self, method, params=None, timeout=None):
+        return self.conn.send(method, params, session_id=self.session_id, timeout=timeout)
+
+    def evaluate(self, script):
+        result = self.send("Runtime.evaluate", {"expression": _as_function(script), "returnByValue": True})
+        if 'exceptionDetails' in result:
+            raise CdpError(f"Script failed: {result['exceptionDetails'].get('text')}")
+        return result.get('result', {}).get('value')
+
+    def navigate(self, url, timeout=LOAD_TIMEOUT):
+        self.loaded.clear()
+        result = self.send("Page.navigate", {"url": url})
+        if result.get('errorText'):
+            raise CdpError(f"Navigation to {url} failed: {result['errorText']}")
+        if not self.loaded.wait(timeout):
+            print(f"   > {url} did not finish loading in {timeout}s; printing what is there.")
+
+    def wait_dom_quiet(self, quiet=0.3, timeout=5):
+        with page_waits.timed("dom quiet (tab)"):
+            deadline = time.time() + timeout
+            while time.time() < deadline:
+                if self.evaluate(page_waits.DOM_QUIET_JS) >= quiet * 1000:
+                    return
+                time.sleep(page_waits.POLL_INTERVAL)
+
+    def close(self):
+        self.conn.off(self._on_event)
+        try:
+            self.conn.send("Target.closeTarget", {"targetId": self.target_id}, timeout=5)
+        except CdpError:
+            pass
+
+
+class TabRenderer:
+    """
+    Loads, cleans up and prints several meeting pages at once, each in its own tab of one browser.
+
+        with TabRenderer(driver, block_rules="svendborg") as renderer:
+            for meeting, saved in renderer.render_many(meetings, save_pdf, CLEANUP_JS, PRINT_OPTIONS):
+                ...  # same order as meetings; saved is what save_pdf returned, or an exception
+
+    Page loads are mostly waiting on the network, so a handful of tabs keeps one browser busy
+    instead of it idling through one page at a time. The tabs share the browser's cookies
+    (e.g. a Cloudflare clearance the driver already earned). If the DevTools websocket is not
+    available it renders one page at a time through the driver instead.
+    """
+
+    def __init__(self, driver, tabs=PRINT_TABS, block_rules=None):
+        self.driver = driver
+        self.conn = None
+        self._tabs = []
+        self._free = queue.Queue()
+        self._driver_lock = threading.Lock()
+
+        try:
+            self.conn = CdpConnection.for_driver(driver)
+            for _ in range(max(1, tabs)):
+                tab = _Tab(self.conn, block_rules)
+                self._tabs.append(tab)
+                self._free.put(tab)
+            print(f"   > Rendering in {len(self._tabs)} tabs.")
+        except Exception as e:
+            if not self._tabs:
+                print(f"   > Tabs unavailable ({e}). Rendering through the driver, one page at a time.")
+                if self.conn:
+                    self.conn.close()
+                self.conn = None
+            else:
+                # Fewer tabs than asked for is fine
+                print(f"   > Could only open {len(self._tabs)} tabs ({e}).")
+
+    @property
+    def size(self):
+        return len(self._tabs) or 1
+
+    def _print(self, send, print_options, save):
+        result = send("Page.printToPDF", dict(print_options or {}, transferMode="ReturnAsStream"))
+        chunks = read_stream(send, result['stream'])
+        try:
+            return save(chunks)
+        finally:
+            # Frees the stream in the browser even if save() stopped reading early
+            chunks.close()
+
+    def _render_in_tab(self, tab, url, prepare_js, print_options, save):
+        tab.navigate(url)
+        with page_waits.timed("network idle (tab)"):
+            tab.network.wait_idle()
+        if prepare_js:
+            tab.evaluate(prepare_js)
+            tab.wait_dom_quiet()
+        return self._print(lambda method, params: tab.send(method, params, timeout=PRINT_TIMEOUT), print_options, save)
+
+    def _render_with_driver(self, url, prepare_js, print_options, save):
+        with self._driver_lock:
+            self.driver.get(url)
+            page_waits.wait_for_network_idle(self.driver)
+            if prepare_js:
+                self.driver.execute_script(prepare_js)
+                page_waits.wait_for_dom_quiet(self.driver)
+            return self._print(self.driver.execute_cdp_cmd, print_options, save)
+
+    def render(self, url, save, prepare_js=None, print_options=None):
+        """
+        Loads url in a free tab, runs prepare_js (an execute_script-style body that hides
+        headers, cookie banners, ...) and prints it. save(chunks) gets the PDF as an iterator
+        of bytes chunks, read from the browser as it consumes them; its result is returned.
+        """
+        if not self.conn:
+            return self._render_with_driver(url, prepare_js, print_options, save)
+
+        tab = self._free.get()
+        try:
+            return self._render_in_tab(tab, url, prepare_js, print_options, save)
+        finally:
+            self._free.put(tab)
+
+    def render_many(self, jobs, save, prepare_js=None, print_options=None):
+        """
+        Renders job['url'] for every job, up to one per tab at a time; save(job, chunks) stores each PDF.
+        Yields (job, what save returned or the Exception it failed with) in the order of jobs.
+        """
+        def render_job(job):
+            try:
+                return job, self.render(job['url'], lambda chunks: save(job, chunks), prepare_js, print_options)
+            except Exception as e:
+                return job, e
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.size) as executor:
+            yield from executor.map(render_job, jobs)
+
+    def close(self):
+        for tab in self._tabs:
+            tab.close()
+        self._tabs = []
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def save_stream(chunks, scraper, url, local_path, bucket):
+    """
+    Stores a printed PDF as it streams out of the browser: straight into a Wasabi
+    (multipart) upload on Render, otherwise into local_path. Records it in the run ledger.
+    Returns True when stored.
+    """
+    filename = os.path.basename(local_path)
+
+    # --- STREAM TO WASABI IF ON RENDER ---
+    if scraper_utils.IS_RENDER:
+        stream = run_ledger.HashingStream(chunks)
+        result = scraper_utils.stream_to_wasabi(stream, bucket, filename)
+        if result is True:
+            run_ledger.record(scraper, url, filename, bucket, content_hash=stream.hexdigest(), size=stream.size)
+        elif result == "EXISTS":
+            run_ledger.record(scraper, url, filename, bucket)
+        return bool(result)
+
+    tmp_path = local_path + ".part"
+    with open(tmp_path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, local_path)
+    run_ledger.record_file(scraper, url, local_path)
+    print(f"   > Saved locally: {filename}")
+    return True
+
+
+def render_meetings(renderer, meetings, check, save, prepare_js=None, print_options=None, limit=None):
+    """
+    The loop every print scraper runs, one window of pages (one per tab) at a time.
+    check(meeting): 'render' to print it, 'stored' if an earlier run already has it, anything else skips it.
+    save(meeting, chunks): stores the streamed PDF, returns True on success.
+    Stored and saved meetings count towards limit, like the old one-page-at-a-time loops.
+    Returns that count.
+    """
+    processed_count = 0
+    remaining = iter(meetings)
+    exhausted = False
+
+    while not exhausted:
+        if limit and processed_count >= limit:
+            print(f"Reached download limit ({limit}). Stopping.")
+            break
+
+        # Fill a window with pages that actually need printing
+        window = []
+        for meeting in remaining:
+            state = check(meeting)
+            if state == 'stored':
+                processed_count += 1
+            elif state == 'render':
+                window.append(meeting)
+            room = renderer.size if not limit else min(renderer.size, limit - processed_count)
+            if len(window) >= room:
+                break
+        else:
+            exhausted = True
+
+        for meeting, result in renderer.render_many(window, save, prepare_js, print_options):
+            if isinstance(result, Exception):
+                print(f"Error rendering {meeting['url']}: {result}")
+            elif result:
+                processed_count += 1
+
+    return processed_count
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import multiprocessing
+import concurrent.futures
+
+# --- WORKER PROCESS ---
+# Set once per worker by _init_worker(), reused for every document the worker renders
+HTML = None
+font_config = None
+_CSS = None
+_stylesheets = {}
+
+
+def _init_worker():
+    global HTML, font_config, _CSS
+    from weasyprint import HTML as weasy_html, CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+    HTML = weasy_html
+    _CSS = CSS
+    font_config = FontConfiguration()
+
+
+def stylesheet(css):
+    """The parsed stylesheet for a CSS text; parsed once per worker."""
+    if css not in _stylesheets:
+        _stylesheets[css] = _CSS(string=css, font_config=font_config)
+    return _stylesheets[css]
+
+
+def write_pdf(html, pdf_path, css=None):
+    """Renders an HTML string to pdf_path inside a worker."""
+    stylesheets = [stylesheet(css)] if css else []
+    HTML(string=html).write_pdf(pdf_path, stylesheets=stylesheets, font_config=font_config)
+
+
+# --- POOL ---
+class WorkerPool:
+    """
+    WeasyPrint is CPU-bound; a pool of worker processes renders while the scraper keeps downloading.
+
+        POOL = weasy_pool.WorkerPool(workers=4)
+        await POOL.run(_convert, docx_path, pdf_path)   # _convert: a module-level function
+        POOL.shutdown()
+
+    The processes start on first use, so scrapers that never render never pay for them.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: the workers must not inherit the event loop / thread state of the scraper
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+            return self._executor
+
+    async def run(self, fn, *args):
+        """Runs fn(*args) in a worker process and returns its result."""
+        return await asyncio.get_running_loop().run_in_executor(self.get(), fn, *args)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None